@@ -0,0 +1,213 @@
+"""
+Concurrency limits and load shedding, per class of route.
+
+WHY:
+----
+Sync endpoints run in Starlette's threadpool (40 threads).  When the
+database slows down, requests hold their threads longer, new ones queue
+for a thread with no deadline, and eventually everything times out,
+`/health` included.  This middleware admits requests *before* they reach
+the threadpool:
+
+- Each request is classified by method and path (`ROUTE_CLASSES`):
+  "heavy" (big list and feed reads: the visit lists, `/visits/feed` and
+  `/visits/my`, the stats, calendar feeds, search, sync), "auth"
+  (bcrypt), or "default".
+  `/health` and `/metrics` are never limited.
+- Each class has its own limit on requests in progress, so a pile-up of
+  heavy reads can't take the threads cheap requests need.
+- Over the limit, a request waits in a bounded FIFO queue for at most
+  CONCURRENCY_QUEUE_TIMEOUT.  A full queue or an expired wait is answered
+  at once with `503 Service Unavailable` and `Retry-After`, instead of a
+  timeout much later.
+
+ADAPTIVE LIMIT (AIMD):
+----------------------
+The heavy class's limit moves between CONCURRENCY_HEAVY_MIN and _MAX.
+Every response faster than CONCURRENCY_HEAVY_TARGET_MS adds 1/limit (about
++1 per limit's worth of requests: additive increase); a slower one, or a
+5xx, multiplies it by 0.9 (multiplicative decrease), at most once per
+target interval so one slow burst doesn't collapse it.  When the database
+slows down the limit shrinks and the excess is shed; when it recovers the
+limit climbs back.
+
+Limiters live on the event loop (one per process) and need no locks.
+Current limits, requests in progress and sheds are exported at /metrics.
+"""
+
+import asyncio
+import math
+import re
+import time
+from collections import deque
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.config import settings
+
+_API = re.escape(settings.API_V1_PREFIX)
+
+# (methods or None for any, path pattern, class or None for "never limited").
+# First match wins; anything unmatched is "default".
+ROUTE_CLASSES: list[tuple[frozenset[str] | None, re.Pattern[str], str | None]] = [
+    (None, re.compile(r"^/(health|metrics)$"), None),
+    (frozenset({"POST"}), re.compile(rf"^{_API}/(auth/.*|users/me/change-password|users/?)$"),
+     "auth"),
+    (frozenset({"GET"}), re.compile(
+        rf"^{_API}/(visits/(upcoming-activity|dashboard-stats|feed|my|my\.ics)?"
+        rf"|parks/\d+/calendar\.ics|dogs/search|users/|sync/)$"
+    ), "heavy"),
+    (frozenset({"POST"}), re.compile(rf"^{_API}/(batch/?|users/import)$"), "heavy"),
+]
+
+SHED = metrics.Counter(
+    "http_requests_shed_total",
+    "Requests answered 503 by the concurrency limiter, by route class and reason",
+    ("route_class", "reason"),
+)
+QUEUE_WAIT_SECONDS = metrics.Histogram(
+    "concurrency_queue_wait_seconds",
+    "Time admitted requests waited for a concurrency slot",
+    ("route_class",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0),
+)
+
+_BACKOFF = 0.9
+
+
+def classify(method: str, path: str) -> str | None:
+    for methods, pattern, name in ROUTE_CLASSES:
+        if (methods is None or method in methods) and pattern.match(path):
+            return name
+    return "default"
+
+
+class Shed(Exception):
+    def __init__(self, reason: str) -> None:
+        self.reason = reason
+
+
+class Limiter:
+    """A limit on requests in progress, with a bounded queue of waiters."""
+
+    def __init__(self, name: str, limit: int, *, min_limit: int | None = None,
+                 target: float | None = None) -> None:
+        self.name = name
+        self.max_limit = limit
+        self.min_limit = min_limit or limit
+        self.limit = float(limit)
+        self.target = target  # seconds; None = a fixed limit
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        metrics.gauge_callback("concurrency_limit", "Current concurrency limit per route class",
+                               lambda: math.floor(self.limit), {"route_class": name})
+        metrics.gauge_callback("concurrency_in_flight", "Requests in progress per route class",
+                               lambda: self.in_flight, {"route_class": name})
+        metrics.gauge_callback("concurrency_queued", "Requests waiting per route class",
+                               lambda: len(self._waiters), {"route_class": name})
+
+    async def acquire(self, timeout: float, queue_size: int) -> None:
+        if self.in_flight < math.floor(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= queue_size:
+            raise Shed("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():  # a slot was handed over just as the wait expired
+                return
+            self._waiters.remove(waiter)
+            waiter.cancel()
+            raise Shed("timeout") from None
+        except asyncio.CancelledError:  # the client went away while waiting
+            if waiter.done() and not waiter.cancelled():
+                self.release(None, failed=False)
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, seconds: float | None, failed: bool) -> None:
+        if seconds is not None and self.target is not None:
+            self._adapt(seconds, failed)
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < math.floor(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1  # the slot passes straight to the waiter
+                waiter.set_result(None)
+
+    def _adapt(self, seconds: float, failed: bool) -> None:
+        if failed or seconds > self.target:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.target:
+                self.limit = max(self.min_limit, self.limit * _BACKOFF)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+
+class ConcurrencyLimitMiddleware:
+    """Admits each HTTP request through its route class's `Limiter`, or sheds it."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.limiters = {
+            "default": Limiter("default", settings.CONCURRENCY_DEFAULT_LIMIT),
+            "auth": Limiter("auth", settings.CONCURRENCY_AUTH_LIMIT),
+            "heavy": Limiter(
+                "heavy", settings.CONCURRENCY_HEAVY_MAX,
+                min_limit=settings.CONCURRENCY_HEAVY_MIN,
+                target=settings.CONCURRENCY_HEAVY_TARGET_MS / 1000,
+            ),
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        route_class = classify(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[route_class]
+        queued_at = time.perf_counter()
+        try:
+            await limiter.acquire(settings.CONCURRENCY_QUEUE_TIMEOUT,
+                                  settings.CONCURRENCY_QUEUE_SIZE)
+        except Shed as shed:
+            SHED.inc(route_class, shed.reason)
+            await _service_unavailable(send)
+            return
+
+        start = time.perf_counter()
+        QUEUE_WAIT_SECONDS.observe(start - queued_at, route_class)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            limiter.release(time.perf_counter() - start, failed=status >= 500)
+
+
+async def _service_unavailable(send: Send) -> None:
+    body = b'{"detail":"Server busy, retry shortly"}'
+    retry_after = max(1, math.ceil(settings.CONCURRENCY_QUEUE_TIMEOUT))
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -17,8 +17,90 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24 hours
 
+    PASSWORD_HASH_WORKERS: int = 0  # bulk-import hashing processes; 0 = one per CPU
+
     # --- Database ---
     DATABASE_URL: str = "sqlite:///./dog_park.db"
+    # "version": skip schema setup when the stored schema version matches
+    # (one PRAGMA per boot); "full": always create tables and run migrations.
+    SCHEMA_CHECK: str = "version"
+
+    # --- Admin user directory ---
+    USER_COUNT_CAP: int = 10_000  # filtered totals stop counting here
+    USER_IMPORT_MAX_ROWS: int = 50_000
+    USER_IMPORT_BATCH_SIZE: int = 1_000  # rows per insert transaction
+
+    # --- Friends' visits feed ---
+    # Feeds scan entries that started at most this long ago, so visits
+    # still in progress show up without scanning a user's whole history.
+    FEED_LOOKBACK_HOURS: int = 24
+
+    # --- Dog photos (local media storage) ---
+    MEDIA_ROOT: str = "./media"
+    PHOTO_MAX_BYTES: int = 10 * 1024 * 1024  # 10 MB
+    THUMBNAIL_SIZE: int = 320  # longest edge, in pixels
+
+    # --- Background jobs ---
+    JOB_WORKERS: int = 2  # worker threads started with the API; 0 = use `python worker.py`
+    JOB_POLL_INTERVAL: float = 1.0  # seconds an idle worker waits before polling again
+    JOB_VISIBILITY_TIMEOUT: int = 300  # seconds before a running job is presumed lost
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BASE_DELAY: float = 2.0  # seconds; doubles on each retry
+    JOB_RETRY_MAX_DELAY: float = 3600.0
+    JOB_RETENTION_DAYS: int = 7  # finished jobs are purged after this long
+
+    # --- Calendar feeds (.ics) ---
+    CALENDAR_PAST_DAYS: int = 30  # visits that ended longer ago are left out
+
+    # --- Visit archive / hot-cold partitioning (see services/archive.py) ---
+    VISIT_HOT_DAYS: int = 90  # visits that ended longer ago move to visits_archive
+    VISIT_ARCHIVE_BATCH: int = 1_000  # visits moved per transaction
+
+    # --- Delta sync (GET /sync) ---
+    SYNC_MAX_ROWS: int = 1_000  # changes per response; clients page with the token
+    SYNC_TOMBSTONE_DAYS: int = 30  # older deletions are pruned; older tokens get 410
+
+    # --- Write queue / group commit (see services/write_queue.py) ---
+    WRITE_QUEUE_ENABLED: bool = False
+    WRITE_QUEUE_WINDOW_MS: float = 5.0  # how long a group waits for more writes
+    WRITE_QUEUE_MAX_BATCH: int = 64  # writes per transaction at most
+
+    # --- Concurrency limits / load shedding (see core/concurrency.py) ---
+    # Keep the three limits' sum within the threadpool (40 threads), so a
+    # burst of one class can't take every thread from the others.
+    CONCURRENCY_LIMITS_ENABLED: bool = True
+    CONCURRENCY_DEFAULT_LIMIT: int = 16  # cheap reads and writes
+    CONCURRENCY_AUTH_LIMIT: int = 8  # bcrypt-bound routes
+    CONCURRENCY_HEAVY_MAX: int = 16  # DB-heavy lists; the adaptive limit's ceiling
+    CONCURRENCY_HEAVY_MIN: int = 2
+    CONCURRENCY_HEAVY_TARGET_MS: float = 500.0  # slower responses shrink the heavy limit
+    CONCURRENCY_QUEUE_SIZE: int = 64  # waiting requests per class; more are shed
+    CONCURRENCY_QUEUE_TIMEOUT: float = 2.0  # seconds a request may wait for a slot
+
+    # --- Rate limits (see core/rate_limit.py) ---
+    # "N/second", "N/minute" or "N/hour"; N is also the burst.
+    RATE_LIMITS_ENABLED: bool = True
+    RATE_LIMIT_STORE: str = "memory"  # or a SQLite file path shared by all workers
+    RATE_LIMIT_MAX_KEYS: int = 100_000  # memory store: least recently seen keys evicted
+    RATE_LIMIT_AUTH: str = "10/minute"  # login and register, per client IP
+    RATE_LIMIT_READS: str = "300/minute"  # GETs, per user
+    RATE_LIMIT_WRITES: str = "60/minute"  # everything else, per user
+
+    # --- Idempotency keys (see core/idempotency.py) ---
+    IDEMPOTENCY_TTL_HOURS: int = 24  # how long a key's response is replayed
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0  # a duplicate waits this long for the first, then 409
+    IDEMPOTENCY_LEASE_SECONDS: int = 60  # a claim whose request never finished frees up after this
+
+    # --- Batch endpoint ---
+    BATCH_MAX_REQUESTS: int = 20  # sub-requests accepted by POST /batch
+
+    # --- Request profiling (see core/profiling.py) ---
+    # Off: the middleware isn't installed at all.  On: admins can profile a
+    # request with `X-Profile: 1` or `?profile=1`.
+    PROFILING_ENABLED: bool = False
+    PROFILE_EVERY_N: int = 0  # also profile 1 in N requests from anyone; 0 = never
+    PROFILE_DIR: str = "./profiles"
+    PROFILE_INTERVAL: float = 0.001  # seconds between stack samples
 
     model_config = {"env_file": ".env", "extra": "ignore"}
 
@@ -17,14 +17,28 @@ FastAPI will:
      then pass the result into your route handler.
 
 This gives you composable, testable auth without global state.
+
+Batch sub-requests (see routers/batch.py) carry the already-authenticated
+user in the ASGI scope, so `get_current_user` skips the JWT decode and the
+user lookup for them.  They're rate-limited one by one in services/batch.py.
+
+`get_current_user` also applies the per-user rate limits
+(core/rate_limit.py) right after decoding the token, so a throttled client
+costs no database work.  `authenticate` is the same check without the
+rate limit, for code that looks at a request before its route does
+(core/profiling.py).
+
+Calendar feeds authenticate with `get_calendar_user` instead: the token is
+a `?token=` query parameter, since calendar apps only know a URL.
 """
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session
 
+from app.core import rate_limit
 from app.core.config import settings
-from app.core.security import decode_access_token
+from app.core.security import decode_access_token, decode_calendar_token
 from app.database import get_session
 from app.models.user import User
 
@@ -34,8 +48,12 @@ oauth2_scheme = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_PREFIX}/auth/login"
 )
 
+# ASGI scope key holding the principal shared by in-process sub-requests.
+SHARED_USER_SCOPE_KEY = "app.shared_user"
+
 
 def get_current_user(
+    request: Request,
     session: Session = Depends(get_session),
     token: str = Depends(oauth2_scheme),
 ) -> User:
@@ -43,8 +61,24 @@ def get_current_user(
     Decode the JWT from the Authorization header, look up the user,
     and return the User model instance.
 
-    Raises 401 if the token is invalid or the user doesn't exist.
+    Raises 401 if the token is invalid or the user doesn't exist, and 429
+    if the user is over their rate limit.
     """
+    shared_user = request.scope.get(SHARED_USER_SCOPE_KEY)
+    if shared_user is not None:
+        return shared_user
+
+    user_id = _user_id(token)
+    rate_limit.check_user(request.method, user_id)
+    return _load_user(session, user_id)
+
+
+def authenticate(session: Session, token: str) -> User:
+    """`get_current_user` without taking a rate-limit token."""
+    return _load_user(session, _user_id(token))
+
+
+def _user_id(token: str) -> int:
     user_id = decode_access_token(token)
     if user_id is None:
         raise HTTPException(
@@ -52,8 +86,11 @@ def get_current_user(
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return int(user_id)
 
-    user = session.get(User, int(user_id))
+
+def _load_user(session: Session, user_id: int) -> User:
+    user = session.get(User, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -89,3 +126,18 @@ def get_current_admin(
             detail="Admin privileges required",
         )
     return current_user
+
+
+def get_calendar_user(
+    token: str = Query(description="Calendar token from GET /users/me/calendar"),
+    session: Session = Depends(get_session),
+) -> User:
+    """The owner of a calendar token (see core/security.py), unless it's been rotated."""
+    claims = decode_calendar_token(token)
+    user = session.get(User, int(claims[0])) if claims is not None else None
+    if user is None or not user.is_active or claims[1] != user.calendar_token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid calendar token",
+        )
+    return user
@@ -0,0 +1,258 @@
+"""
+`Idempotency-Key` support for the create endpoints.
+
+A client on a flaky connection can't tell whether a POST that timed out
+was applied.  If it sends `Idempotency-Key: <any unique string>` (a UUID
+per logical action), retrying is safe:
+
+- The first request with a key claims a row in `idempotency_keys`
+  (models/idempotency.py) and runs normally.  Its status and JSON body are
+  stored when it finishes.  The claim is a lease of
+  IDEMPOTENCY_LEASE_SECONDS, so a process that dies mid-request only
+  blocks the key that long, not for the whole TTL.  A request that outlives
+  its lease finds the key taken over and stores nothing.
+- A retry with the same key gets the stored response back, with
+  `Idempotency-Replayed: true`, after one primary-key lookup.  The route,
+  its validation and its writes don't run again.
+- A duplicate that arrives while the first is still running waits for it
+  (up to IDEMPOTENCY_WAIT_SECONDS, then `409` with `Retry-After`) and then
+  gets the replay.  Within a process it waits on an event; a duplicate in
+  another process polls the row.
+- Reusing a key for a different request (another path or body) is `422`.
+
+Keys are per user (the bearer token's subject) and expire after
+IDEMPOTENCY_TTL_HOURS.  Server errors (5xx) and `429` aren't stored: the
+claim is released so a retry runs the request again.
+
+Only the routes in `IDEMPOTENT_ROUTES` are covered (the create endpoints,
+and `POST /batch` as a whole: see services/batch.py); other requests pass
+through untouched, as do requests without the header or without a valid
+token (the route itself answers 401).
+"""
+
+import asyncio
+import hashlib
+import json
+import re
+import time
+from datetime import datetime, timedelta, timezone
+
+import anyio
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, col, delete, update
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.database import engine
+from app.models.idempotency import IdempotencyKey
+
+# The routes themselves: "/dogs" without the slash is only a redirect to them.
+IDEMPOTENT_ROUTES = re.compile(
+    rf"^{re.escape(settings.API_V1_PREFIX)}/((visits|dogs|parks)/|batch)$"
+)
+MAX_KEY_LENGTH = 255
+_POLL_SECONDS = 0.05
+
+OUTCOMES = metrics.Counter(
+    "idempotency_requests_total",
+    "Requests sent with an Idempotency-Key, by outcome",
+    ("outcome",),
+)
+
+# Keys whose first request is running in this process -> set when it's done.
+_inflight: dict[tuple[int, str], asyncio.Event] = {}
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# ---------------------------------------------------------------------------
+# The stored rows (each call runs in the threadpool, in its own session)
+# ---------------------------------------------------------------------------
+def _claim(user_id: int, key: str, fingerprint: str, lease: datetime) -> IdempotencyKey | None:
+    """
+    None if this request now owns the key until `lease`; otherwise the row
+    of whoever does.  The lease also identifies the claim to `_finish`.
+    """
+    now = _utcnow()
+    with Session(engine, expire_on_commit=False) as session:
+        row = session.get(IdempotencyKey, (user_id, key))
+        if row is not None and row.expires_at > now:
+            return row
+        stmt = insert(IdempotencyKey).values(
+            user_id=user_id, key=key, fingerprint=fingerprint, expires_at=lease,
+        )
+        stmt = stmt.on_conflict_do_update(  # take over an expired row or lease, not a live one
+            index_elements=["user_id", "key"],
+            set_={"fingerprint": stmt.excluded.fingerprint, "status_code": None,
+                  "body": None, "expires_at": stmt.excluded.expires_at},
+            where=col(IdempotencyKey.expires_at) <= now,
+        )
+        claimed = session.exec(stmt).rowcount
+        session.commit()
+        if claimed:
+            return None
+        return session.get(IdempotencyKey, (user_id, key), populate_existing=True)
+
+
+def _finish(user_id: int, key: str, fingerprint: str, lease: datetime,
+            status_code: int, body: bytes) -> None:
+    """
+    Store the response for the TTL, or release the claim if it shouldn't be
+    replayed.  Only the claim this request made is touched: if its lease ran
+    out and another request took the key over, that one's claim is left alone.
+    """
+    where = (
+        col(IdempotencyKey.user_id) == user_id, col(IdempotencyKey.key) == key,
+        col(IdempotencyKey.fingerprint) == fingerprint, col(IdempotencyKey.expires_at) == lease,
+        col(IdempotencyKey.status_code).is_(None),
+    )
+    with Session(engine) as session:
+        if status_code >= 500 or status_code == 429:
+            session.exec(delete(IdempotencyKey).where(*where))
+        else:
+            session.exec(update(IdempotencyKey).where(*where).values(
+                status_code=status_code, body=body,
+                expires_at=_utcnow() + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+            ))
+        session.commit()
+
+
+def purge_expired() -> int:
+    """Delete keys past their TTL; returns how many."""
+    with Session(engine) as session:
+        result = session.exec(
+            delete(IdempotencyKey).where(col(IdempotencyKey.expires_at) <= _utcnow())
+        )
+        session.commit()
+        return result.rowcount
+
+
+# ---------------------------------------------------------------------------
+# Middleware
+# ---------------------------------------------------------------------------
+class IdempotencyMiddleware:
+    """Replays stored responses for POSTs retried with the same Idempotency-Key."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (scope["type"] != "http" or scope["method"] != "POST"
+                or not IDEMPOTENT_ROUTES.match(scope["path"])):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        user_id = decode_access_token(token) if key and scheme.lower() == "bearer" else None
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": "Idempotency-Key is too long"})
+            return
+
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(
+            b"\n".join((scope["path"].encode(), scope["query_string"], body))
+        ).hexdigest()
+        user_key = (int(user_id), key)
+
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            lease = _utcnow() + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+            row = await run_in_threadpool(_claim, *user_key, fingerprint, lease)
+            if row is None:
+                break  # ours: run the request below
+            if row.fingerprint != fingerprint:
+                OUTCOMES.inc("mismatch")
+                await _send_json(send, 422, {
+                    "detail": "Idempotency-Key was already used for a different request"
+                })
+                return
+            if row.status_code is not None:
+                OUTCOMES.inc("replayed")
+                await _send(send, row.status_code, row.body or b"",
+                            [(b"idempotency-replayed", b"true")])
+                return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                OUTCOMES.inc("conflict")
+                await _send_json(send, 409, {
+                    "detail": "A request with this Idempotency-Key is still in progress"
+                }, [(b"retry-after", b"1")])
+                return
+            event = _inflight.get(user_key)
+            try:
+                if event is not None:
+                    await asyncio.wait_for(event.wait(), remaining)
+                else:  # the first request is in another process
+                    await asyncio.sleep(min(_POLL_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                pass
+
+        OUTCOMES.inc("executed")
+        _inflight[user_key] = asyncio.Event()
+        status_code = 500
+        chunks: list[bytes] = []
+
+        async def replay_body() -> Message:
+            nonlocal body
+            if body is None:
+                return await receive()
+            message = {"type": "http.request", "body": body, "more_body": False}
+            body = None
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, send_wrapper)
+        finally:
+            try:
+                with anyio.CancelScope(shield=True):  # even if the client went away
+                    await run_in_threadpool(
+                        _finish, *user_key, fingerprint, lease, status_code, b"".join(chunks)
+                    )
+            finally:
+                _inflight.pop(user_key).set()
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+async def _send_json(send: Send, status_code: int, content: dict,
+                     headers: list[tuple[bytes, bytes]] | None = None) -> None:
+    await _send(send, status_code, json.dumps(content).encode(), headers or [])
+
+
+async def _send(send: Send, status_code: int, body: bytes,
+                headers: list[tuple[bytes, bytes]]) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,281 @@
+"""
+In-process metrics with Prometheus text exposition (served at /metrics).
+
+DESIGN — WHY NO LOCKS ON THE HOT PATH:
+--------------------------------------
+Every thread records into its *own* dictionaries (a "shard", created on the
+thread's first write).  Recording is therefore a couple of dict operations
+with no lock and no contention between the event loop and the threadpool
+workers.  A scrape merges all shards; `dict.copy()` runs entirely under the
+GIL, so it sees each shard in a consistent state.  The only lock guards the
+list of shards, taken once per thread.
+
+Counters and histograms only ever grow, so a finished thread's shard must
+keep contributing -- but threadpool workers come and go (anyio retires
+idle ones after a few seconds), so shards can't simply pile up.  Whenever
+the list is touched (a new thread's first write, a scrape), the shards of
+threads that have exited are folded into one `_retired` shard and dropped;
+nothing writes to them any more, so that needs no care.  Gauges are either per-thread deltas
+that are summed (in-flight requests: incremented and decremented on the same
+thread) or callbacks evaluated at scrape time (DB pool checkouts).
+
+Usage:
+    REQUESTS = Counter("thing_total", "Things done", ("kind",))
+    REQUESTS.inc("big")
+    LATENCY = Histogram("thing_seconds", "Time per thing", ("kind",), buckets=(...))
+    LATENCY.observe(0.012, "big")
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_shards: list[tuple[threading.Thread, dict[tuple, Any]]] = []
+_retired: dict[tuple, Any] = {}  # the shards of threads that have exited, summed
+_shards_lock = threading.Lock()
+_local = threading.local()
+_metrics: list["_Metric"] = []
+_callbacks: dict[str, tuple[str, list[tuple[dict[str, str], Callable[[], float]]]]] = {}
+
+
+def _add(total: dict[tuple, Any], shard: dict[tuple, Any]) -> dict[tuple, Any]:
+    """Add `shard`'s values into `total` (histogram entries element-wise)."""
+    for key, value in shard.items():
+        if isinstance(value, list):
+            current = total.get(key)
+            total[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+        else:
+            total[key] = total.get(key, 0.0) + value
+    return total
+
+
+def _retire_dead_shards() -> None:
+    """Fold the shards of exited threads into `_retired`.  Hold `_shards_lock`."""
+    live = []
+    for thread, shard in _shards:
+        if thread.is_alive():
+            live.append((thread, shard))
+        else:
+            _add(_retired, shard)
+    _shards[:] = live
+
+
+def _shard() -> dict[tuple, Any]:
+    shard: dict[tuple, Any] = {}
+    with _shards_lock:
+        _retire_dead_shards()
+        _shards.append((threading.current_thread(), shard))
+    _local.shard = shard
+    return shard
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _metrics.append(self)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        try:
+            shard = _local.shard
+        except AttributeError:
+            shard = _shard()
+        key = (self, labels)
+        shard[key] = shard.get(key, 0.0) + amount
+
+
+class Gauge(Counter):
+    """A summed per-thread gauge; `dec` must run on the thread that called `inc`."""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        try:
+            shard = _local.shard
+        except AttributeError:
+            shard = _shard()
+        key = (self, labels)
+        entry = shard.get(key)
+        if entry is None:
+            # Per-bucket (non-cumulative) counts, the +Inf bucket, then the sum.
+            entry = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+
+def gauge_callback(
+    name: str, documentation: str, fn: Callable[[], float], labels: dict[str, str] | None = None
+) -> None:
+    """Register a gauge (one series of it, with `labels`) computed at scrape time."""
+    _callbacks.setdefault(name, (documentation, []))[1].append((labels or {}, fn))
+
+
+# ---------------------------------------------------------------------------
+# Exposition
+# ---------------------------------------------------------------------------
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _merged() -> dict[tuple, Any]:
+    with _shards_lock:
+        _retire_dead_shards()
+        merged = _add({}, _retired)
+        shards = [shard for _, shard in _shards]
+    for shard in shards:
+        _add(merged, shard.copy())
+    return merged
+
+
+def render() -> str:
+    """All metrics in Prometheus text format 0.0.4."""
+    merged = _merged()
+    by_metric: dict[_Metric, list[tuple[tuple, Any]]] = {m: [] for m in _metrics}
+    for (metric, labels), value in merged.items():
+        by_metric[metric].append((labels, value))
+
+    lines: list[str] = []
+    for metric, series in by_metric.items():
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for labels, value in sorted(series, key=lambda s: s[0]):
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                bounds = [*(repr(float(b)) for b in metric.buckets), "+Inf"]
+                for bound, count in zip(bounds, value[:-1]):
+                    cumulative += count
+                    le = _labels(metric.labelnames, labels, f'le="{bound}"')
+                    lines.append(f"{metric.name}_bucket{le} {cumulative}")
+                plain = _labels(metric.labelnames, labels)
+                lines.append(f"{metric.name}_sum{plain} {value[-1]}")
+                lines.append(f"{metric.name}_count{plain} {cumulative}")
+            else:
+                lines.append(f"{metric.name}{_labels(metric.labelnames, labels)} {value}")
+    for name, (documentation, series) in _callbacks.items():
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, fn in series:
+            lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {fn()}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Built-in metrics
+# ---------------------------------------------------------------------------
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement execution time (the _count series is the statement count)",
+    ("operation",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0),
+)
+PASSWORD_HASH_SECONDS = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt time per password hash or verification",
+    ("operation",),
+    buckets=(0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache and result (hit/miss); hit ratio = hit / total",
+    ("cache", "result"),
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count and time every statement, and expose pool checkouts."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip()[:6].upper()
+        DB_QUERY_SECONDS.observe(time.perf_counter() - context._metrics_start, operation)
+
+    checkedout = getattr(engine.pool, "checkedout", None)
+    if checkedout is not None:
+        gauge_callback(
+            "db_pool_checked_out_connections", "DB connections currently checked out", checkedout
+        )
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and labels it with the matched route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                route.path if route is not None else "unmatched",
+                str(status),
+            )
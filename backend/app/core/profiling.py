@@ -0,0 +1,216 @@
+"""
+On-demand request profiling with flamegraph output.
+
+HOW TO USE:
+-----------
+With PROFILING_ENABLED=true, an admin adds `X-Profile: 1` (or `?profile=1`)
+to any request.  The response carries an `X-Profile-Summary` header:
+
+    X-Profile-Summary: samples=412; wall_ms=431.9; file=20260101T120000-GET-api_v1_visits-3f2a.folded;
+                       top=_enrich_visits (visits.py:91) 38%, ...
+
+and the full profile is written to PROFILE_DIR in "folded" stack format,
+one `frame;frame;frame count` line per distinct stack.  Feed it to
+flamegraph.pl, or open it in https://www.speedscope.app.
+PROFILE_EVERY_N=N also profiles every Nth request, from anyone.
+
+HOW IT WORKS:
+-------------
+A sampling profiler: a background thread snapshots every thread's stack
+each PROFILE_INTERVAL seconds.  Only stacks working *for the profiled
+request* are kept.  A request's code runs on the event loop (async
+parts) and on threadpool workers (sync endpoints and dependencies); both
+run it inside a copy of the request's `contextvars.Context`, which holds
+the `_ACTIVE` marker set here.  The sampler finds that Context on the
+frame that called `Context.run` (the worker's `context` local, or an
+asyncio handle's `self._context`) and checks the marker, so concurrent
+requests don't pollute the profile.
+
+The profile stops when the response headers are sent, which for ordinary
+(non-streaming) responses is after the endpoint has finished.
+
+COST WHEN OFF:
+--------------
+With PROFILING_ENABLED=false (the default) the middleware isn't installed.
+With it on, unprofiled requests pay one header lookup and a counter.
+"""
+
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import Context, ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from types import FrameType
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.deps import authenticate, get_current_admin, oauth2_scheme
+from app.database import engine
+
+_ACTIVE: ContextVar["_Profile | None"] = ContextVar("profiling_active", default=None)
+
+# Frames that may hold the Context a thread is running in (see module docstring).
+_CONTEXT_RUNNERS = {"run", "_run"}
+
+
+def _context_of(frame: FrameType | None) -> tuple[Context, FrameType] | None:
+    """The innermost Context a thread runs in, and the frame that entered it."""
+    while frame is not None:
+        if frame.f_code.co_name in _CONTEXT_RUNNERS:
+            local = frame.f_locals
+            ctx = local.get("context")
+            if not isinstance(ctx, Context):
+                ctx = getattr(local.get("self"), "_context", None)
+            if isinstance(ctx, Context):
+                return ctx, frame
+        frame = frame.f_back
+    return None
+
+
+def _label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Profile:
+    """Samples the stacks of one request until `stop()`."""
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._stop.is_set():
+            return
+        self.wall_ms = (time.perf_counter() - self.started) * 1000
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                found = _context_of(frame)
+                if found is None or found[0].get(_ACTIVE) is not self:
+                    continue
+                entry = found[1]
+                labels = []
+                while frame is not entry:
+                    labels.append(_label(frame))
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                labels.append(names.get(ident, f"thread-{ident}"))
+                self.stacks[";".join(reversed(labels))] += 1
+                self.samples += 1
+
+    def top(self, n: int = 3) -> list[tuple[str, float]]:
+        """Functions with the most self time (leaf samples), as fractions."""
+        leaves: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = self.samples or 1
+        return [(name, count / total) for name, count in leaves.most_common(n)]
+
+    def write(self, directory: Path, scope: Scope) -> Path:
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        path = directory / f"{stamp}-{scope['method']}-{slug}-{uuid.uuid4().hex[:4]}.folded"
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in self.stacks.items()))
+        return path
+
+    def summary(self, path: Path) -> str:
+        top = ", ".join(f"{name} {share:.0%}" for name, share in self.top())
+        return (
+            f"samples={self.samples}; wall_ms={self.wall_ms:.1f}; file={path.name}; top={top}"
+        )
+
+
+def _flagged(scope: Scope) -> bool:
+    if Headers(scope=scope).get("x-profile") == "1":
+        return True
+    query = scope.get("query_string", b"")
+    return b"profile=" in query and ("profile", "1") in parse_qsl(query.decode("latin-1"))
+
+
+async def _is_admin(scope: Scope) -> bool:
+    """
+    Authorize as `Depends(get_current_admin)` would, but without taking a
+    rate-limit token: the route will take its own.
+    """
+    request = Request(scope)
+    try:
+        token = await oauth2_scheme(request)
+    except HTTPException:
+        return False
+
+    def check() -> bool:
+        with Session(engine) as session:
+            try:
+                get_current_admin(authenticate(session, token))
+            except HTTPException:
+                return False
+            return True
+
+    return await run_in_threadpool(check)
+
+
+class ProfilingMiddleware:
+    """Profiles flagged admin requests and every PROFILE_EVERY_N-th request."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.every_n = settings.PROFILE_EVERY_N
+        self.counter = itertools.count(1)
+        self.directory = Path(settings.PROFILE_DIR)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sampled = self.every_n > 0 and next(self.counter) % self.every_n == 0
+        if not sampled and not (_flagged(scope) and await _is_admin(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        profile = _Profile(settings.PROFILE_INTERVAL)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.stop()
+                path = await run_in_threadpool(profile.write, self.directory, scope)
+                MutableHeaders(scope=message)["x-profile-summary"] = profile.summary(path)
+            await send(message)
+
+        token = _ACTIVE.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _ACTIVE.reset(token)
+            profile.stop()  # no-op unless the app failed before responding
+
@@ -0,0 +1,181 @@
+"""
+Token-bucket rate limiting per user (or per client IP), by route group.
+
+TOKEN BUCKETS:
+--------------
+Each key (group + principal) has a bucket of up to `burst` tokens that
+refills at `rate` tokens per second.  A request takes one token; an empty
+bucket means `429 Too Many Requests` with `Retry-After` set to when the
+next token arrives.  A bucket is just `(tokens, last update)`; it is
+brought up to date lazily when the key is next seen, so there's no timer.
+
+Groups and their limits are settings ("N/second", "N/minute" or "N/hour";
+N is also the burst):
+
+- auth     login and register, keyed by client IP (there's no user yet)
+- reads    GETs, keyed by the `get_current_user` principal
+- writes   everything else a signed-in user sends
+
+Authenticated routes are limited in `get_current_user` itself, so every
+route that needs a user is covered without listing it.  Batch sub-requests
+skip that lookup, so services/batch.py takes a token per sub-request: a
+batch of 20 GETs costs 20 reads (and the batch POST itself, one write).
+Calendar feeds (query-string tokens) and health checks aren't limited here.
+
+STORES:
+-------
+`MemoryStore` (the default) keeps buckets in an LRU-ordered dict: each
+take is O(1), and past RATE_LIMIT_MAX_KEYS the least recently seen key is
+dropped (an idle key's bucket would have refilled anyway).  It is per
+process, so with N uvicorn workers a client gets up to N times the limit.
+Set RATE_LIMIT_STORE to a file path to share buckets between processes
+through `SQLiteStore`; any other store only has to implement `take`.
+"""
+
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Protocol
+
+from fastapi import HTTPException, Request, status
+
+from app.core import metrics
+from app.core.config import settings
+
+_PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0}
+
+RATE_LIMITED = metrics.Counter(
+    "rate_limited_requests_total", "Requests refused with 429, by group", ("group",)
+)
+
+
+def parse_limit(limit: str) -> tuple[float, int]:
+    """"60/minute" -> (1.0 token per second, burst of 60)."""
+    count, _, period = limit.partition("/")
+    burst = int(count)
+    return burst / _PERIODS[period.strip()], burst
+
+
+class Store(Protocol):
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        """Take a token from `key`'s bucket: 0.0, or seconds until one is available."""
+
+
+class MemoryStore:
+    """Buckets in this process, least recently used evicted past `max_keys`."""
+
+    def __init__(self, max_keys: int) -> None:
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(burst), now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if not wait else tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class SQLiteStore:
+    """Buckets in a SQLite file, shared by every process that opens it."""
+
+    IDLE_SECONDS = 3600.0  # rows untouched this long are pruned
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+        return conn
+
+    def take(self, key: str, rate: float, burst: int, now: float) -> float:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (float(burst), now)
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, "
+                "updated = excluded.updated",
+                (key, tokens - 1 if not wait else tokens, now),
+            )
+            self._takes += 1
+            if self._takes % 10_000 == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - self.IDLE_SECONDS,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+def _make_store() -> Store:
+    if settings.RATE_LIMIT_STORE == "memory":
+        return MemoryStore(settings.RATE_LIMIT_MAX_KEYS)
+    return SQLiteStore(settings.RATE_LIMIT_STORE)
+
+
+# Made on first use, once: concurrent first requests would each make one,
+# and all but the last would lose the tokens taken from theirs.
+_store: Store | None = None
+_store_lock = threading.Lock()
+_limits = {
+    "auth": parse_limit(settings.RATE_LIMIT_AUTH),
+    "reads": parse_limit(settings.RATE_LIMIT_READS),
+    "writes": parse_limit(settings.RATE_LIMIT_WRITES),
+}
+
+
+def check(group: str, principal: str) -> None:
+    """Take a token for `principal` in `group`, or raise 429."""
+    global _store
+    if not settings.RATE_LIMITS_ENABLED:
+        return
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _make_store()
+    rate, burst = _limits[group]
+    wait = _store.take(f"{group}:{principal}", rate, burst, time.time())
+    if wait:
+        RATE_LIMITED.inc(group)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
+
+def check_user(method: str, user_id: int) -> None:
+    """The reads or writes limit for a signed-in user, by request method."""
+    check("reads" if method in ("GET", "HEAD") else "writes", f"user:{user_id}")
+
+
+def limit_by_ip(group: str):
+    """Dependency: rate-limit an anonymous route by client IP."""
+
+    def dependency(request: Request) -> None:
+        check(group, f"ip:{request.client.host if request.client else 'unknown'}")
+
+    return dependency
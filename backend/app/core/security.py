@@ -13,14 +13,32 @@ ARCHITECTURE NOTES:
 
 - `decode_access_token` is used inside a FastAPI *dependency* (see
   core/deps.py) to extract the current user from the incoming request.
+
+- Calendar tokens (`create_calendar_token`) go in a subscription URL,
+  because calendar apps can't send headers.  They never expire, so they
+  carry `scope: "calendar"` and are accepted only by the .ics feeds;
+  `decode_access_token` rejects them.  They also carry the user's
+  `calendar_token_version`: rotating the link bumps it, and every older
+  token stops working (core/deps.py).
+
+- `bcrypt` and `jose` are imported inside the functions that use them.
+  jose pulls in `cryptography`, a large share of the app's import time,
+  and nothing needs either until the first login or authenticated request.
+  After that first call the import is a dict lookup.
+
+- `hash_passwords` spreads bulk hashing (CSV imports) over a process pool,
+  one worker per core; bcrypt is deliberately CPU-bound.
 """
 
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
 
-import bcrypt
-from jose import JWTError, jwt
-
 from app.core.config import settings
+from app.core.metrics import PASSWORD_HASH_SECONDS
 
 # ---------------------------------------------------------------------------
 # Password hashing
@@ -28,17 +46,56 @@ from app.core.config import settings
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(
+    import bcrypt
+
+    start = time.perf_counter()
+    ok = bcrypt.checkpw(
         plain_password.encode("utf-8"),
         hashed_password.encode("utf-8"),
     )
+    PASSWORD_HASH_SECONDS.observe(time.perf_counter() - start, "verify")
+    return ok
 
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(
+    import bcrypt
+
+    start = time.perf_counter()
+    hashed = bcrypt.hashpw(
         password.encode("utf-8"),
         bcrypt.gensalt(),
     ).decode("utf-8")
+    PASSWORD_HASH_SECONDS.observe(time.perf_counter() - start, "hash")
+    return hashed
+
+
+_hash_pool: ProcessPoolExecutor | None = None
+_hash_pool_lock = threading.Lock()
+
+
+def hash_passwords(passwords: list[str]) -> list[str]:
+    """Hash many passwords in parallel; results are in input order."""
+    global _hash_pool
+    if len(passwords) < 2:
+        return [hash_password(p) for p in passwords]
+
+    workers = settings.PASSWORD_HASH_WORKERS or os.cpu_count() or 1
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            # "spawn": forking a process that runs server threads is unsafe.
+            _hash_pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+    chunksize = max(1, len(passwords) // (workers * 4))
+    return list(_hash_pool.map(hash_password, passwords, chunksize=chunksize))
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=True)
+            _hash_pool = None
 
 
 # ---------------------------------------------------------------------------
@@ -60,6 +117,8 @@ def create_access_token(subject: int | str, expires_delta: timedelta | None = No
         if expires_delta
         else timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
+    from jose import jwt
+
     to_encode = {"sub": str(subject), "exp": expire}
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
@@ -70,8 +129,37 @@ def decode_access_token(token: str) -> str | None:
 
     Returns None if the token is invalid or expired.
     """
+    from jose import JWTError, jwt
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload.get("sub")
     except JWTError:
         return None
+    if "scope" in payload:  # a scoped token, e.g. a calendar URL's
+        return None
+    return payload.get("sub")
+
+
+def create_calendar_token(subject: int | str, version: int = 0) -> str:
+    """A non-expiring JWT that only authorizes reading calendar feeds, until rotated."""
+    from jose import jwt
+
+    to_encode = {"sub": str(subject), "scope": "calendar", "ver": version}
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def decode_calendar_token(token: str) -> tuple[str, int] | None:
+    """
+    The `sub` and `ver` claims of a calendar token; None for any other token.
+
+    The caller compares `ver` with the user's `calendar_token_version`.
+    """
+    from jose import JWTError, jwt
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("scope") != "calendar" or "sub" not in payload:
+        return None
+    return payload["sub"], payload.get("ver", 0)  # tokens from before rotation: version 0
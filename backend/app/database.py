@@ -13,28 +13,47 @@ KEY CONCEPTS FOR FASTAPI NEWCOMERS:
 
 3. `create_db_and_tables` — called once at startup (see main.py).
    SQLModel reads all imported model classes and issues CREATE TABLE IF NOT
-   EXISTS for each one.
+   EXISTS for each one, then `migrations.py` upgrades tables created by
+   older versions (new columns, new indexes).  A database already stamped
+   with the current schema version skips all of that (SCHEMA_CHECK).
+
+4. Shared sessions — the batch endpoint (routers/batch.py) runs several
+   sub-requests in-process.  It stores its own Session in the ASGI scope
+   under `SHARED_SESSION_SCOPE_KEY` so every sub-request reuses it instead
+   of opening a new one.
 """
 
 from collections.abc import Generator
 
+from fastapi import Request
 from sqlmodel import Session, SQLModel, create_engine
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.migrations import SCHEMA_VERSION, run_migrations, stamp_version, stored_version
 
 engine = create_engine(
     settings.DATABASE_URL,
     echo=False,
     connect_args={"check_same_thread": False},  # SQLite-specific
 )
+instrument_engine(engine)  # query counts/durations and pool checkouts for /metrics
+
+# ASGI scope key holding a Session shared by in-process sub-requests.
+SHARED_SESSION_SCOPE_KEY = "app.shared_session"
 
 
 def create_db_and_tables() -> None:
-    """Create all tables derived from SQLModel.metadata."""
-    SQLModel.metadata.create_all(engine)
+    """Create all tables derived from SQLModel.metadata and upgrade old ones."""
+    with engine.begin() as conn:
+        if settings.SCHEMA_CHECK == "version" and stored_version(conn) == SCHEMA_VERSION:
+            return
+        SQLModel.metadata.create_all(conn)
+        run_migrations(conn)
+        stamp_version(conn)
 
 
-def get_session() -> Generator[Session, None, None]:
+def get_session(request: Request) -> Generator[Session, None, None]:
     """
     FastAPI dependency that yields a DB session.
 
@@ -42,6 +61,14 @@ def get_session() -> Generator[Session, None, None]:
         @router.get("/items")
         def read_items(session: Session = Depends(get_session)):
             ...
+
+    If the request is a batch sub-request, the batch's session is yielded
+    as-is; the batch endpoint owns it and closes it.
     """
+    shared = request.scope.get(SHARED_SESSION_SCOPE_KEY)
+    if shared is not None:
+        yield shared
+        return
+
     with Session(engine) as session:
         yield session
@@ -10,7 +10,8 @@ FastAPI apps are assembled by:
   2. Adding middleware (CORS, etc.).
   3. Including *routers* — each router is a mini-app that owns a group of
      related endpoints (e.g. /auth, /dogs, /parks).
-  4. Registering startup events (here: creating DB tables).
+  4. Registering startup events (here: creating DB tables and starting
+     background job workers).
 
 Each router lives in its own file under `routers/` and is attached with
 `app.include_router(router, prefix=..., tags=[...])`.
@@ -21,17 +22,33 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from sqlmodel import Session
 
+from app.core import metrics
+from app.core.concurrency import ConcurrencyLimitMiddleware
 from app.core.config import settings
-from app.database import create_db_and_tables
-from app.routers import auth, dogs, parks, users, visits
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.security import shutdown_hash_pool
+from app.database import create_db_and_tables, engine
+from app.routers import auth, batch, dogs, media, parks, sync, users, visits
+from app.services import jobs, park_slots, write_queue
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Runs once at startup (before yield) and once at shutdown (after yield)."""
     create_db_and_tables()
+    with Session(engine) as session:
+        park_slots.ensure_built(session)
+
+    workers = jobs.WorkerPool(settings.JOB_WORKERS)
+    workers.start()
+    write_queue.start()  # no-op unless WRITE_QUEUE_ENABLED
     yield
+    write_queue.stop()
+    workers.stop()
+    shutdown_hash_pool()
 
 
 app = FastAPI(
@@ -40,6 +57,18 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_PREFIX}/openapi.json",
 )
 
+# ---------------------------------------------------------------------------
+# Idempotency keys — innermost, so replayed responses still get CORS headers
+# ---------------------------------------------------------------------------
+app.add_middleware(IdempotencyMiddleware)
+
+# ---------------------------------------------------------------------------
+# Concurrency limits — sheds load (503) before it reaches the threadpool;
+# inside CORS, so a browser can read the 503 and its Retry-After
+# ---------------------------------------------------------------------------
+if settings.CONCURRENCY_LIMITS_ENABLED:
+    app.add_middleware(ConcurrencyLimitMiddleware)
+
 # ---------------------------------------------------------------------------
 # CORS — allow the Vite dev server (localhost:5173) to call the API
 # ---------------------------------------------------------------------------
@@ -52,8 +81,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],  # so the frontend can back off after a 429/503
 )
 
+# ---------------------------------------------------------------------------
+# Profiling — only installed when enabled, so it costs nothing otherwise
+# ---------------------------------------------------------------------------
+if settings.PROFILING_ENABLED:
+    from app.core.profiling import ProfilingMiddleware
+
+    app.add_middleware(ProfilingMiddleware)
+
+# ---------------------------------------------------------------------------
+# Metrics — outermost, so the timing covers every other middleware
+# ---------------------------------------------------------------------------
+app.add_middleware(metrics.MetricsMiddleware)
+
 # ---------------------------------------------------------------------------
 # Routers
 # ---------------------------------------------------------------------------
@@ -64,8 +107,17 @@ app.include_router(users.router,  prefix=f"{api}/users",  tags=["Users"])
 app.include_router(dogs.router,   prefix=f"{api}/dogs",   tags=["Dogs"])
 app.include_router(parks.router,  prefix=f"{api}/parks",  tags=["Parks"])
 app.include_router(visits.router, prefix=f"{api}/visits", tags=["Visits"])
+app.include_router(sync.router,   prefix=f"{api}/sync",   tags=["Sync"])
+app.include_router(media.router,  prefix=f"{api}/media",  tags=["Media"])
+app.include_router(batch.router,  prefix=f"{api}/batch",  tags=["Batch"])
 
 
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format 0.0.4)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,181 @@
+"""
+Upgrades for databases created by earlier versions of the app.
+
+`SQLModel.metadata.create_all` creates missing tables (with their indexes)
+but never touches tables that already exist.  Each migration below makes
+one additive change to an existing table and must be idempotent: it checks
+the current schema before altering anything.  Add new migrations to the end
+of `MIGRATIONS`.
+
+SCHEMA VERSION:
+---------------
+Checking every table and index takes a few dozen statements, which is most
+of a cold start on a small server.  So after a full upgrade the database
+is stamped with `SCHEMA_VERSION` (SQLite's `PRAGMA user_version`), and the
+next startup only compares that one integer.  Bump `SCHEMA_VERSION` in the
+same change as any new table, column, index or migration; otherwise
+existing databases won't be upgraded.
+"""
+
+from collections.abc import Callable
+from datetime import datetime
+
+from sqlalchemy import Connection, text
+from sqlalchemy.schema import CreateTable
+from sqlmodel import SQLModel
+
+from app.models.dog import normalize_breed
+from app.models.sync import number_unsequenced
+from app.models.types import to_utc
+from app.models.visit import Visit
+
+# Bump on every schema change (see module docstring).
+SCHEMA_VERSION = 11
+
+
+def _columns(conn: Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def _add_dog_breed_key(conn: Connection) -> None:
+    if "breed_key" in _columns(conn, "dogs"):
+        return
+    conn.exec_driver_sql(
+        "ALTER TABLE dogs ADD COLUMN breed_key VARCHAR(100) NOT NULL DEFAULT 'mixed'"
+    )
+    rows = conn.exec_driver_sql("SELECT id, breed FROM dogs").all()
+    if rows:
+        conn.execute(
+            text("UPDATE dogs SET breed_key = :key WHERE id = :id"),
+            [{"id": dog_id, "key": normalize_breed(breed)} for dog_id, breed in rows],
+        )
+
+
+def _add_dog_photo_thumbnail_url(conn: Connection) -> None:
+    if "photo_thumbnail_url" not in _columns(conn, "dogs"):
+        conn.exec_driver_sql("ALTER TABLE dogs ADD COLUMN photo_thumbnail_url VARCHAR")
+
+
+def _add_visits_changed_at(conn: Connection) -> None:
+    for table in ("users", "dog_parks"):
+        if "visits_changed_at" not in _columns(conn, table):
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN visits_changed_at DATETIME")
+
+
+# Text SQLAlchemy writes for a naive datetime: fixed width, space separator.
+_CANONICAL = "####-##-## ##:##:##.######".replace("#", "[0-9]")
+
+
+def _normalize_visit_times(conn: Connection) -> None:
+    """Rewrite visit times stored in any other form (e.g. raw SQL inserts) as UTC."""
+    for table in ("visits", "timeline_entries"):
+        key = "id" if table == "visits" else "rowid"
+        for column in ("start_time", "end_time"):
+            rows = conn.exec_driver_sql(
+                f"SELECT {key}, {column} FROM {table} "
+                f"WHERE {column} NOT GLOB '{_CANONICAL}'"
+            ).all()
+            if rows:
+                conn.execute(
+                    text(f"UPDATE {table} SET {column} = :value WHERE {key} = :key"),
+                    [
+                        {"key": row_key, "value": to_utc(datetime.fromisoformat(value))
+                         .replace(tzinfo=None).isoformat(sep=" ", timespec="microseconds")}
+                        for row_key, value in rows
+                    ],
+                )
+
+
+def _drop_superseded_visit_indexes(conn: Connection) -> None:
+    # The (park_id, start_time) and (user_id, start_time) indexes replace these.
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_visits_park_id")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_visits_user_id")
+
+
+def _add_sync_columns(conn: Connection) -> None:
+    for table in ("dog_parks", "dogs", "visits"):
+        columns = _columns(conn, table)
+        if "updated_at" not in columns:
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN updated_at DATETIME")
+        if "change_seq" not in columns:
+            conn.exec_driver_sql(
+                f"ALTER TABLE {table} ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0"
+            )
+    number_unsequenced(conn)
+
+
+def _visits_autoincrement(conn: Connection) -> None:
+    """Rebuild `visits` as AUTOINCREMENT, so ids of archived visits aren't reused."""
+    ddl = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'visits'"
+    ).scalar_one()
+    if "AUTOINCREMENT" in ddl.upper():
+        return
+    # SQLite can't alter a primary key: copy into a new table and swap it in.
+    # Its indexes are recreated by run_migrations.
+    create = str(CreateTable(Visit.__table__).compile(dialect=conn.dialect))
+    conn.exec_driver_sql(create.replace("CREATE TABLE visits ", "CREATE TABLE visits_rebuilt ", 1))
+    columns = ", ".join(Visit.__table__.columns.keys())
+    conn.exec_driver_sql(f"INSERT INTO visits_rebuilt ({columns}) SELECT {columns} FROM visits")
+    conn.exec_driver_sql("DROP TABLE visits")
+    conn.exec_driver_sql("ALTER TABLE visits_rebuilt RENAME TO visits")
+    # Start the sequence above every id handed out so far, archived ones included.
+    last = conn.exec_driver_sql(
+        "SELECT max(coalesce((SELECT max(id) FROM visits), 0),"
+        " coalesce((SELECT max(id) FROM visits_archive), 0))"
+    ).scalar_one()
+    conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'visits'")
+    conn.exec_driver_sql(f"INSERT INTO sqlite_sequence (name, seq) VALUES ('visits', {last:d})")
+
+
+def _move_archived_visit_links(conn: Connection) -> None:
+    # Archived visits' links used to stay in visit_dogs.
+    archived = "visit_id IN (SELECT id FROM visits_archive)"
+    conn.exec_driver_sql(
+        f"INSERT OR IGNORE INTO visit_dogs_archive (visit_id, dog_id)"
+        f" SELECT visit_id, dog_id FROM visit_dogs WHERE {archived}"
+    )
+    conn.exec_driver_sql(f"DELETE FROM visit_dogs WHERE {archived}")
+
+
+def _add_calendar_token_version(conn: Connection) -> None:
+    if "calendar_token_version" not in _columns(conn, "users"):
+        conn.exec_driver_sql(
+            "ALTER TABLE users ADD COLUMN calendar_token_version INTEGER NOT NULL DEFAULT 0"
+        )
+
+
+def _add_job_claim_token(conn: Connection) -> None:
+    if "claim_token" not in _columns(conn, "jobs"):
+        conn.exec_driver_sql("ALTER TABLE jobs ADD COLUMN claim_token VARCHAR(32)")
+
+
+MIGRATIONS: list[Callable[[Connection], None]] = [
+    _add_dog_breed_key,
+    _add_dog_photo_thumbnail_url,
+    _add_visits_changed_at,
+    _normalize_visit_times,
+    _drop_superseded_visit_indexes,
+    _add_sync_columns,
+    _visits_autoincrement,
+    _move_archived_visit_links,
+    _add_calendar_token_version,
+    _add_job_claim_token,
+]
+
+
+def run_migrations(conn: Connection) -> None:
+    """Apply every migration, then create any index missing on existing tables."""
+    for migration in MIGRATIONS:
+        migration(conn)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def stored_version(conn: Connection) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar_one()
+
+
+def stamp_version(conn: Connection) -> None:
+    conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION:d}")
@@ -4,6 +4,17 @@ when `create_db_and_tables()` runs in main.py.
 """
 
 from app.models.dog import Dog  # noqa: F401
+from app.models.follow import Follow  # noqa: F401
+from app.models.idempotency import IdempotencyKey  # noqa: F401
+from app.models.job import Job  # noqa: F401
 from app.models.park import DogPark  # noqa: F401
+from app.models.park_slot import ParkSlotStats  # noqa: F401
+from app.models.sync import SyncState, Tombstone  # noqa: F401
+from app.models.timeline import TimelineEntry  # noqa: F401
 from app.models.user import User  # noqa: F401
-from app.models.visit import Visit, VisitDogLink  # noqa: F401
+from app.models.visit import (  # noqa: F401
+    Visit,
+    VisitArchive,
+    VisitDogLink,
+    VisitDogLinkArchive,
+)
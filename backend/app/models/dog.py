@@ -4,24 +4,52 @@ Dog database model.
 Each Dog belongs to exactly one User (owner_id foreign key).
 The `size` field uses a plain string constrained to known values
 via the Pydantic schema layer (see schemas/dog.py).
+
+`breed_key` is a normalised copy of `breed` ("  golden   Retriever" →
+"golden retriever") kept in sync by an ORM hook, so the directory search
+can use exact-match index lookups instead of case-insensitive scans.
 """
 
 from datetime import datetime, timezone
 
+from sqlalchemy import Index, event
 from sqlmodel import Field, SQLModel
 
 
+def normalize_breed(breed: str) -> str:
+    """Lower-case and collapse whitespace — the form stored in `breed_key`."""
+    return " ".join(breed.split()).lower()
+
+
 class Dog(SQLModel, table=True):
     __tablename__ = "dogs"
+    __table_args__ = (
+        # Directory search: breed (+ size, + sociability), and size alone.
+        # SQLite appends the rowid to every index entry, so rows come back in
+        # id order within a key — exactly what cursor pagination needs.
+        Index("ix_dogs_breed_key_size_social", "breed_key", "size", "good_with_others"),
+        Index("ix_dogs_size_social", "size", "good_with_others"),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     name: str = Field(max_length=100)
     breed: str = Field(default="Mixed", max_length=100)
+    breed_key: str = Field(default="mixed", max_length=100)
     size: str = Field(default="medium")  # small, medium, large
     good_with_others: bool = Field(default=True)
     personality_notes: str | None = Field(default=None)
     photo_url: str | None = Field(default=None)
+    photo_thumbnail_url: str | None = Field(default=None)  # set by photo uploads
 
     owner_id: int = Field(foreign_key="users.id", index=True)
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Delta sync (models/sync.py): set on every insert and update.
+    updated_at: datetime | None = Field(default_factory=lambda: datetime.now(timezone.utc))
+    change_seq: int = Field(default=0, index=True, sa_column_kwargs={"server_default": "0"})
+
+
+@event.listens_for(Dog, "before_insert")
+@event.listens_for(Dog, "before_update")
+def _sync_breed_key(mapper, connection, dog: Dog) -> None:
+    dog.breed_key = normalize_breed(dog.breed)
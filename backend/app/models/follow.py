@@ -0,0 +1,21 @@
+"""
+Follow database model — the social graph.
+
+A row means `follower_id` follows `followee_id` (one direction; two rows
+make a mutual friendship).  The primary key serves "who do I follow?";
+the `followee_id` index serves "who follows this user?", which is what
+visit fan-out needs.
+"""
+
+from datetime import datetime, timezone
+
+from sqlmodel import Field, SQLModel
+
+
+class Follow(SQLModel, table=True):
+    __tablename__ = "follows"
+
+    follower_id: int = Field(foreign_key="users.id", primary_key=True)
+    followee_id: int = Field(foreign_key="users.id", primary_key=True, index=True)
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -0,0 +1,30 @@
+"""
+Idempotency keys: the stored outcome of a POST sent with `Idempotency-Key`.
+
+A row is claimed (`status_code` NULL, `expires_at` a short lease) when
+the first request with a key starts, and filled with that request's
+status and JSON body when it finishes; retries with the same key are
+answered from the row (core/idempotency.py).  Keys are per user, so two users can't collide.
+
+The table is WITHOUT ROWID: rows are stored in the primary key's B-tree,
+so a retry is one lookup in one index.  Rows past `expires_at` are swept
+by the background workers (services/jobs.py).
+"""
+
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+from app.models.types import UTCDateTime
+
+
+class IdempotencyKey(SQLModel, table=True):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    user_id: int = Field(primary_key=True)
+    key: str = Field(primary_key=True, max_length=255)
+    fingerprint: str = Field(max_length=64)  # SHA-256 of the path and body
+    status_code: int | None = Field(default=None)  # None while the first request runs
+    body: bytes | None = Field(default=None)
+    expires_at: datetime = Field(sa_type=UTCDateTime, index=True)
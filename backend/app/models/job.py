@@ -0,0 +1,43 @@
+"""
+Job database model — the durable background job queue.
+
+A job is a task name plus a JSON payload.  Workers (services/jobs.py)
+claim a job by moving it to "running" with a `locked_until` deadline; a
+worker that dies mid-job simply lets the deadline pass and the job becomes
+claimable again (visibility timeout).  Failed jobs are re-queued with
+exponential backoff via `run_at` until `max_attempts` is reached.
+
+Each claim writes a fresh `claim_token`, and a worker only records the
+outcome while the token is still its own: a worker whose job was
+reclaimed after its deadline can't overwrite the new owner's result.
+
+`idempotency_key` is unique: enqueueing the same key twice is a no-op.
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import Index
+from sqlmodel import Field, SQLModel
+
+
+class Job(SQLModel, table=True):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Claiming: the oldest due job by status.
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+    id: int | None = Field(default=None, primary_key=True)
+    task: str = Field(max_length=100)
+    payload: str = Field(default="{}")  # JSON object passed as keyword arguments
+    status: str = Field(default="queued", max_length=20)  # queued, running, done, failed
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=5)
+    idempotency_key: str | None = Field(default=None, unique=True, max_length=200)
+    last_error: str | None = Field(default=None)
+
+    run_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    locked_until: datetime | None = Field(default=None)
+    claim_token: str | None = Field(default=None, max_length=32)  # the current claim's
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
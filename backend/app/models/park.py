@@ -23,3 +23,8 @@ class DogPark(SQLModel, table=True):
     created_by_id: int = Field(foreign_key="users.id")
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Delta sync (models/sync.py): set on every insert and update.
+    updated_at: datetime | None = Field(default_factory=lambda: datetime.now(timezone.utc))
+    change_seq: int = Field(default=0, index=True, sa_column_kwargs={"server_default": "0"})
+    # Last write to this park's visits; the validator for its .ics feed.
+    visits_changed_at: datetime | None = Field(default=None)
@@ -0,0 +1,29 @@
+"""
+Per-park, per-hour visit aggregates.
+
+One row summarises every dog expected at a park during one hourly slot:
+how many dogs, how many of each size, and how many are flagged as not
+good with others.  The rows are maintained incrementally by the visit
+endpoints (see services/park_slots.py), so the recommendations endpoint
+reads a handful of narrow rows instead of joining visits, visit_dogs and
+dogs on every request.
+"""
+
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+from app.models.types import UTCDateTime
+
+
+class ParkSlotStats(SQLModel, table=True):
+    __tablename__ = "park_slot_stats"
+
+    park_id: int = Field(foreign_key="dog_parks.id", primary_key=True)
+    slot_start: datetime = Field(sa_type=UTCDateTime, primary_key=True, index=True)  # on the hour
+
+    dog_count: int = Field(default=0)
+    small_count: int = Field(default=0)
+    medium_count: int = Field(default=0)
+    large_count: int = Field(default=0)
+    unsocial_count: int = Field(default=0)  # dogs with good_with_others=False
@@ -0,0 +1,113 @@
+"""
+Delta-sync bookkeeping: one change sequence shared by parks, dogs and visits.
+
+HOW CHANGES ARE NUMBERED:
+-------------------------
+`sync_state` is a single row holding the last sequence number handed out.
+Before every flush, an ORM hook reserves one number per park, dog or
+visit being inserted, updated or deleted, with a single
+`INSERT ... ON CONFLICT DO UPDATE ... RETURNING`.  Inserted and updated
+rows get the number in `change_seq` (and `updated_at`); a deleted row
+leaves a `Tombstone` carrying it.  Set-based deletes (services/cascade.py)
+bypass the hook and write their tombstones with `services.sync`.
+
+The reservation takes the database's write lock, which is held until
+commit, so numbers become visible in the order they were handed out:
+once `last_seq` is committed, no change below it can still appear.
+`GET /sync` (services/sync.py) relies on that.
+
+Rows inserted with Core (seed.py) skip the hook and keep `change_seq = 0`;
+`number_unsequenced` numbers them afterwards.
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import Connection, event, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, attributes
+from sqlmodel import Field, SQLModel
+
+from app.models.dog import Dog
+from app.models.park import DogPark
+from app.models.visit import Visit
+
+# Entity names used in tombstones and in the /sync response.
+ENTITIES: dict[type[SQLModel], str] = {DogPark: "park", Dog: "dog", Visit: "visit"}
+
+
+class SyncState(SQLModel, table=True):
+    __tablename__ = "sync_state"
+
+    id: int = Field(default=1, primary_key=True)  # always the one row
+    last_seq: int = Field(default=0)  # last sequence number handed out
+    pruned_seq: int = Field(default=0)  # tombstones up to here have been deleted
+
+
+class Tombstone(SQLModel, table=True):
+    """A deleted park, dog or visit, kept so clients can drop their copy."""
+
+    __tablename__ = "sync_tombstones"
+
+    seq: int = Field(primary_key=True)
+    entity: str = Field(max_length=10)  # "park", "dog" or "visit"
+    entity_id: int
+    deleted_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+def reserve(count: int):
+    """Statement reserving `count` sequence numbers; it returns the last one."""
+    stmt = insert(SyncState).values(id=1, last_seq=count, pruned_seq=0)
+    return stmt.on_conflict_do_update(
+        index_elements=["id"], set_={"last_seq": SyncState.last_seq + count}
+    ).returning(SyncState.last_seq)
+
+
+def touch(row: SQLModel) -> None:
+    """Mark `row` changed even though no column was set (e.g. only its links changed)."""
+    attributes.flag_modified(row, "change_seq")
+
+
+@event.listens_for(Session, "before_flush")
+def _sequence_changes(session: Session, flush_context, instances) -> None:
+    changed = [row for row in session.new if type(row) in ENTITIES]
+    changed += [
+        row for row in session.dirty
+        if type(row) in ENTITIES and session.is_modified(row)
+    ]
+    deleted = [row for row in session.deleted if type(row) in ENTITIES]
+    if not changed and not deleted:
+        return
+
+    last = session.execute(reserve(len(changed) + len(deleted))).scalar_one()
+    seqs = iter(range(last - len(changed) - len(deleted) + 1, last + 1))
+    now = datetime.now(timezone.utc)
+    for row in changed:
+        row.change_seq = next(seqs)
+        row.updated_at = now
+    for row in deleted:
+        session.add(Tombstone(
+            seq=next(seqs), entity=ENTITIES[type(row)], entity_id=row.id, deleted_at=now
+        ))
+
+
+def number_unsequenced(conn: Connection) -> None:
+    """
+    Give rows still at `change_seq = 0` a sequence number each.
+
+    Numbers are `last_seq + id`, so each table needs one UPDATE however
+    many rows it has; the gaps this leaves are harmless.
+    """
+    conn.execute(text(
+        "INSERT INTO sync_state (id, last_seq, pruned_seq) VALUES (1, 0, 0) "
+        "ON CONFLICT (id) DO NOTHING"
+    ))
+    for model in ENTITIES:
+        table = model.__tablename__
+        conn.execute(text(
+            f"UPDATE {table} SET change_seq = (SELECT last_seq FROM sync_state) + id, "
+            f"updated_at = coalesce(updated_at, created_at) WHERE change_seq = 0"
+        ))
+        conn.execute(text(
+            f"UPDATE sync_state SET last_seq = max(last_seq, "
+            f"(SELECT coalesce(max(change_seq), 0) FROM {table}))"
+        ))
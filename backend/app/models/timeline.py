@@ -0,0 +1,31 @@
+"""
+TimelineEntry database model — precomputed "friends' visits" feeds.
+
+FAN-OUT ON WRITE:
+-----------------
+When someone logs a visit, one row is written per follower
+(services/timeline.py).  Reading a feed is then a single range scan of the
+primary key — `owner_id = ? AND start_time >= ?` in start-time order — with
+no join across follows and visits.
+
+`author_id` and `park_id` are copied from the visit so a feed can be
+rendered (and an unfollow cleaned up) without touching `visits`.
+"""
+
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+from app.models.types import UTCDateTime
+
+
+class TimelineEntry(SQLModel, table=True):
+    __tablename__ = "timeline_entries"
+
+    owner_id: int = Field(foreign_key="users.id", primary_key=True)  # feed reader
+    start_time: datetime = Field(sa_type=UTCDateTime, primary_key=True)
+    visit_id: int = Field(foreign_key="visits.id", primary_key=True, index=True)
+
+    end_time: datetime = Field(sa_type=UTCDateTime)
+    author_id: int = Field(foreign_key="users.id")
+    park_id: int = Field(foreign_key="dog_parks.id")
@@ -0,0 +1,35 @@
+"""
+Column types shared by several models.
+
+UTC TIMESTAMPS:
+---------------
+SQLite has no datetime type: SQLAlchemy stores `YYYY-MM-DD HH:MM:SS.ffffff`
+text and silently drops any timezone, so `10:00+02:00` used to be stored
+as 10:00.  `UTCDateTime` converts aware values to UTC before storing
+(naive values are taken to be UTC already) and hands back aware UTC
+datetimes.  The stored text is fixed-width, so string order is time order
+and range conditions (`end_time >= :now`) can seek an index.
+"""
+
+from datetime import datetime, timezone
+
+from sqlalchemy import DateTime
+from sqlalchemy.types import TypeDecorator
+
+
+def to_utc(value: datetime) -> datetime:
+    """Aware UTC; naive values are assumed to be UTC already."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class UTCDateTime(TypeDecorator):
+    impl = DateTime
+    cache_ok = True
+
+    def process_bind_param(self, value: datetime | None, dialect) -> datetime | None:
+        return None if value is None else to_utc(value).replace(tzinfo=None)
+
+    def process_result_value(self, value: datetime | None, dialect) -> datetime | None:
+        return None if value is None else value.replace(tzinfo=timezone.utc)
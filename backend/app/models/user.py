@@ -4,15 +4,20 @@ User database model.
 SQLModel + table=True  =  SQLAlchemy Table  +  Pydantic validation combined.
 The `hashed_password` is stored in the DB but excluded from default
 serialisation (we never want to accidentally send it to the frontend).
+
+The unique `email` / `username` indexes double as prefix-search indexes
+for the admin directory; the flag index serves its status filters.
 """
 
 from datetime import datetime, timezone
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
 class User(SQLModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (Index("ix_users_is_active_is_admin", "is_active", "is_admin"),)
 
     id: int | None = Field(default=None, primary_key=True)
     email: str = Field(unique=True, index=True, max_length=255)
@@ -25,3 +30,7 @@ class User(SQLModel, table=True):
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Last write to this user's visits; the validator for their .ics feed.
+    visits_changed_at: datetime | None = Field(default=None)
+    # Calendar tokens carry this; bumping it revokes every one issued so far.
+    calendar_token_version: int = Field(default=0)
@@ -11,14 +11,38 @@ two foreign-key columns, and no extra fields.  SQLModel's
 `Relationship(link_model=...)` then handles the join automatically
 when you load related objects.
 
+The primary key (visit_id, dog_id) serves "which dogs are on this visit?";
+the `dog_id` index serves "which visits is this dog on?" (slot updates and
+deleting a dog).
+
+Visit times are UTC (see models/types.py).  The composite indexes match
+the hot queries: a park's or a user's visits in start order (also per
+park for "visits this week"), and visits not yet over (`end_time >= now`).
+`(user_id, end_time)` serves the double-booking check on visit writes: a
+dog's visits are its owner's, and only those ending after the new visit
+starts can overlap it, so the seek skips the owner's whole history.
+tests/test_query_plans.py checks that each of them seeks an index.
+
+HOT AND COLD:
+-------------
+`visits` holds only visits that ended less than VISIT_HOT_DAYS ago or
+haven't ended yet; older ones are moved to `visits_archive` (same columns,
+same ids), with their links moved to `visit_dogs_archive`, by
+services/archive.py.  Upcoming and recent reads never look at the archive,
+and their indexes stay small however much history there is.  `visits` is
+AUTOINCREMENT so a new visit never reuses the id of an archived one.
+
 We keep the link table in this same file since it's tightly coupled
 to Visit.
 """
 
 from datetime import datetime, timezone
 
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
+from app.models.types import UTCDateTime
+
 
 class VisitDogLink(SQLModel, table=True):
     """Many-to-many link between visits and dogs."""
@@ -26,18 +50,51 @@ class VisitDogLink(SQLModel, table=True):
     __tablename__ = "visit_dogs"
 
     visit_id: int = Field(foreign_key="visits.id", primary_key=True)
-    dog_id: int = Field(foreign_key="dogs.id", primary_key=True)
+    dog_id: int = Field(foreign_key="dogs.id", primary_key=True, index=True)
 
 
-class Visit(SQLModel, table=True):
-    __tablename__ = "visits"
+class VisitDogLinkArchive(SQLModel, table=True):
+    """The links of archived visits."""
+
+    __tablename__ = "visit_dogs_archive"
+
+    visit_id: int = Field(foreign_key="visits_archive.id", primary_key=True)
+    dog_id: int = Field(foreign_key="dogs.id", primary_key=True, index=True)
+
+
+class VisitBase(SQLModel):
+    """The columns shared by `visits` and `visits_archive`."""
 
     id: int | None = Field(default=None, primary_key=True)
-    start_time: datetime
-    end_time: datetime
+    start_time: datetime = Field(sa_type=UTCDateTime)
+    end_time: datetime = Field(sa_type=UTCDateTime)
     notes: str | None = Field(default=None)
 
-    user_id: int = Field(foreign_key="users.id", index=True)
-    park_id: int = Field(foreign_key="dog_parks.id", index=True)
+    user_id: int = Field(foreign_key="users.id")
+    park_id: int = Field(foreign_key="dog_parks.id")
 
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    # Delta sync (models/sync.py): set on every insert and update.
+    updated_at: datetime | None = Field(default_factory=lambda: datetime.now(timezone.utc))
+    change_seq: int = Field(default=0, index=True, sa_column_kwargs={"server_default": "0"})
+
+
+class Visit(VisitBase, table=True):
+    __tablename__ = "visits"
+    __table_args__ = (
+        Index("ix_visits_park_id_start_time", "park_id", "start_time"),
+        Index("ix_visits_user_id_start_time", "user_id", "start_time"),
+        Index("ix_visits_end_time_start_time", "end_time", "start_time"),
+        Index("ix_visits_user_id_end_time", "user_id", "end_time"),
+        {"sqlite_autoincrement": True},  # ids of archived visits are never handed out again
+    )
+
+
+class VisitArchive(VisitBase, table=True):
+    """Visits that ended before the hot window; read by history endpoints only."""
+
+    __tablename__ = "visits_archive"
+    __table_args__ = (
+        Index("ix_visits_archive_park_id_start_time", "park_id", "start_time"),
+        Index("ix_visits_archive_user_id_start_time", "user_id", "start_time"),
+    )
@@ -11,12 +11,16 @@ KEY FASTAPI PATTERNS DEMONSTRATED:
    Swagger UI's "Authorize" dialog sends exactly this format.
 
 3. `Depends(get_session)` — injects a database Session that auto-closes.
+
+4. `dependencies=[Depends(...)]` — a dependency run only for its side
+   effect: here the per-IP rate limit, since nobody is signed in yet.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session, select
 
+from app.core.rate_limit import limit_by_ip
 from app.core.security import create_access_token, hash_password, verify_password
 from app.database import get_session
 from app.models.user import User
@@ -25,7 +29,8 @@ from app.schemas.user import Token, UserCreate, UserRead
 router = APIRouter()
 
 
-@router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED)
+@router.post("/register", response_model=UserRead, status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(limit_by_ip("auth"))])
 def register(
     payload: UserCreate,
     session: Session = Depends(get_session),
@@ -53,7 +58,7 @@ def register(
     return user
 
 
-@router.post("/login", response_model=Token)
+@router.post("/login", response_model=Token, dependencies=[Depends(limit_by_ip("auth"))])
 def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     session: Session = Depends(get_session),
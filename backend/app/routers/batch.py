@@ -0,0 +1,47 @@
+"""
+Batch router — several API calls in one round trip.
+
+The dashboard needs `/users/me`, `/dogs`, `/visits/dashboard-stats`,
+`/visits/upcoming-activity` and `/parks` on every page load.  Instead of
+five HTTP requests (five JWT decodes, five user lookups, five sessions),
+the client can send:
+
+    POST /api/v1/batch
+    {"requests": [{"method": "GET", "path": "/users/me"},
+                  {"method": "GET", "path": "/visits/dashboard-stats"}]}
+
+and receive `[{"status": 200, "body": {...}}, ...]` in the same order.
+Sub-requests run sequentially against the regular routers, sharing the
+caller's identity and DB session (see services/batch.py).  A failing
+sub-request does not abort the others.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.deps import get_current_user
+from app.database import get_session
+from app.models.user import User
+from app.schemas.batch import BatchRequest, BatchSubResponse
+from app.services.batch import dispatch_batch
+
+router = APIRouter()
+
+
+@router.post("", response_model=list[BatchSubResponse])
+async def run_batch(
+    payload: BatchRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Execute up to `BATCH_MAX_REQUESTS` API calls in-process."""
+    if not payload.requests:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one request")
+    if len(payload.requests) > settings.BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch is limited to {settings.BATCH_MAX_REQUESTS} requests",
+        )
+    return await dispatch_batch(request, payload.requests, session, current_user)
@@ -6,16 +6,27 @@ Demonstrates:
 - Admin override — admins can modify any dog.
 - `response_model=list[DogRead]` — FastAPI serialises the response
   through the Pydantic schema, stripping any fields not in `DogRead`.
+- "Best time to go" recommendations scored from the precomputed
+  per-park, per-hour aggregates in services/park_slots.py.
+- A public directory search served entirely from indexes (see the
+  `Dog.__table_args__` indexes and the `breed_key` column).
+- Streaming photo uploads into content-addressed storage
+  (services/photos.py); the files are served by routers/media.py.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session, col, select
 
+from app.core.config import settings
 from app.core.deps import get_current_user
 from app.database import get_session
-from app.models.dog import Dog
+from app.models.dog import Dog, normalize_breed
 from app.models.user import User
-from app.schemas.dog import DogCreate, DogRead, DogUpdate
+from app.schemas.dog import DogCreate, DogRead, DogRecommendation, DogSize, DogUpdate
+from app.schemas.pagination import CursorPage
+from app.services import archive, cascade, park_slots, photos
+from app.services.write_queue import queued
 
 router = APIRouter()
 
@@ -47,7 +58,46 @@ def list_my_dogs(
     return session.exec(select(Dog).where(Dog.owner_id == current_user.id)).all()
 
 
+@router.get("/search", response_model=CursorPage[DogRead])
+def search_dogs(
+    breed: str | None = Query(default=None, description="Exact breed, case-insensitive"),
+    size: DogSize | None = Query(default=None),
+    good_with_others: bool | None = Query(default=None),
+    park_id: int | None = Query(default=None, description="Dogs that have visited this park"),
+    cursor: str | None = Query(default=None, description="`next_cursor` of the previous page"),
+    limit: int = Query(default=20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Search all dogs by breed, size, sociability and park, in id order."""
+    stmt = select(Dog)
+    if breed is not None:
+        stmt = stmt.where(Dog.breed_key == normalize_breed(breed))
+    if size is not None:
+        stmt = stmt.where(Dog.size == size.value)
+    if good_with_others is not None:
+        stmt = stmt.where(Dog.good_with_others == good_with_others)
+    if park_id is not None:
+        # Semi-join: the database resolves the dog ids from the park's
+        # visits, hot and archived; nothing is loaded into Python.
+        links = archive.links_where(lambda visits, link: [col(link.visit_id).in_(
+            select(visits.id).where(visits.park_id == park_id)
+        )])
+        park_dog_ids = select(links.c.dog_id)
+        stmt = stmt.where(col(Dog.id).in_(park_dog_ids))
+    if cursor is not None:
+        if not cursor.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(Dog.id > int(cursor))
+
+    # Fetch one extra row to learn whether another page exists.
+    dogs = session.exec(stmt.order_by(Dog.id).limit(limit + 1)).all()
+    next_cursor = str(dogs[limit - 1].id) if len(dogs) > limit else None
+    return CursorPage[DogRead](items=dogs[:limit], next_cursor=next_cursor)
+
+
 @router.post("/", response_model=DogRead, status_code=status.HTTP_201_CREATED)
+@queued
 def create_dog(
     payload: DogCreate,
     current_user: User = Depends(get_current_user),
@@ -72,6 +122,7 @@ def read_dog(
 
 
 @router.patch("/{dog_id}", response_model=DogRead)
+@queued
 def update_dog(
     dog_id: int,
     payload: DogUpdate,
@@ -81,17 +132,74 @@ def update_dog(
     """Update a dog (owner or admin only)."""
     dog = _get_dog_or_404(dog_id, session)
     _check_ownership(dog, current_user)
+    before = Dog(**dog.model_dump())
 
-    for field, value in payload.model_dump(exclude_unset=True).items():
+    update_data = payload.model_dump(exclude_unset=True)
+    if "photo_url" in update_data:
+        # A hand-entered URL has no generated thumbnail.
+        dog.photo_thumbnail_url = None
+    for field, value in update_data.items():
         setattr(dog, field, value)
 
+    park_slots.apply_dog_change(session, before, dog)
     session.add(dog)
     session.commit()
     session.refresh(dog)
     return dog
 
 
+@router.post(
+    "/{dog_id}/photo",
+    response_model=DogRead,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"multipart/form-data": {"schema": {
+                "type": "object",
+                "properties": {"file": {"type": "string", "format": "binary"}},
+                "required": ["file"],
+            }}},
+        }
+    },
+)
+async def upload_dog_photo(
+    dog_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    Upload a dog photo (owner or admin only) as the multipart field `file`.
+
+    The body is streamed to disk while it is hashed; a thumbnail is
+    generated in the background.  `photo_url` and `photo_thumbnail_url`
+    are set to the stored, immutable URLs.
+    """
+
+    def load_dog() -> Dog:
+        dog = _get_dog_or_404(dog_id, session)
+        _check_ownership(dog, current_user)
+        return dog
+
+    # Check ownership before reading a potentially large body.
+    dog = await run_in_threadpool(load_dog)
+    name = await photos.store_upload(request)
+
+    def save() -> Dog:
+        media = f"{settings.API_V1_PREFIX}/media"
+        dog.photo_url = f"{media}/photos/{name}"
+        dog.photo_thumbnail_url = f"{media}/thumbs/{name}"
+        session.add(dog)
+        photos.submit_thumbnail(session, name)
+        session.commit()
+        session.refresh(dog)
+        return dog
+
+    return await run_in_threadpool(save)
+
+
 @router.delete("/{dog_id}", status_code=status.HTTP_204_NO_CONTENT)
+@queued
 def delete_dog(
     dog_id: int,
     current_user: User = Depends(get_current_user),
@@ -100,5 +208,25 @@ def delete_dog(
     """Delete a dog (owner or admin only)."""
     dog = _get_dog_or_404(dog_id, session)
     _check_ownership(dog, current_user)
-    session.delete(dog)
+    cascade.delete_dog(session, dog)
     session.commit()
+
+
+@router.get("/{dog_id}/recommendations", response_model=list[DogRecommendation])
+def recommend_times(
+    dog_id: int,
+    park_id: int | None = Query(default=None, description="Only this park"),
+    days: int = Query(default=7, ge=1, le=14, description="Look-ahead horizon"),
+    limit: int = Query(default=10, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    Best upcoming hours for this dog, scored by the expected mix of dogs:
+    size mismatch, dogs that aren't good with others, and headcount.
+    Every hour in the horizon is scored, empty ones included, and the dog's
+    own planned visits don't count against it.  Owner or admin only.
+    """
+    dog = _get_dog_or_404(dog_id, session)
+    _check_ownership(dog, current_user)
+    return park_slots.recommend(session, dog, days=days, park_id=park_id, limit=limit)
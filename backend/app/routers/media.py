@@ -0,0 +1,83 @@
+"""
+Media router — serves stored dog photos and their thumbnails.
+
+URLs are content-addressed (`/media/photos/<sha256>.<ext>`), so a URL's
+bytes never change: responses are cacheable for a year and marked
+immutable, and the ETag is the hash itself.  There's no auth because
+`<img>` tags can't send a bearer token; the hash in the URL is not
+guessable.
+
+Range requests are supported (FileResponse), and servers implementing the
+ASGI `http.response.pathsend` extension get the file path instead of the
+bytes so they can use sendfile(2).
+"""
+
+import os
+from pathlib import Path
+
+from fastapi import APIRouter, HTTPException, Path as PathParam, Request, Response
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.metrics import record_cache
+from app.services import photos
+
+router = APIRouter()
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+PHOTO_NAME = r"^[0-9a-f]{64}\.(jpg|png|gif|webp)$"
+
+
+class ZeroCopyFileResponse(FileResponse):
+    """FileResponse that lets capable servers send the file themselves."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            "http.response.pathsend" in scope.get("extensions", {})
+            and scope["method"] == "GET"
+            and "range" not in Headers(scope=scope)
+        ):
+            await send({
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            })
+            await send({"type": "http.response.pathsend", "path": str(Path(self.path).resolve())})
+            return
+        await super().__call__(scope, receive, send)
+
+
+def _serve(request: Request, path: Path, media_type: str, etag: str, cache_control: str):
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Photo not found")
+
+    headers = {"cache-control": cache_control, "etag": etag}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return ZeroCopyFileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
+
+
+@router.get("/photos/{name}")
+def get_photo(request: Request, name: str = PathParam(pattern=PHOTO_NAME)):
+    """Full-size photo."""
+    digest, ext = name.split(".")
+    return _serve(request, photos.photo_path(name), photos.MEDIA_TYPES[ext], f'"{digest}"', IMMUTABLE)
+
+
+@router.get("/thumbs/{name}")
+def get_thumbnail(request: Request, name: str = PathParam(pattern=PHOTO_NAME)):
+    """
+    Thumbnail of a photo.  Until the background job has produced it, the
+    original is returned with `no-cache` so clients pick up the thumbnail
+    on a later request.
+    """
+    digest, ext = name.split(".")
+    thumb = photos.thumbnail_path(digest)
+    ready = thumb.exists()
+    record_cache("thumbnails", ready)
+    if ready:
+        return _serve(request, thumb, "image/jpeg", f'"{digest}-thumb"', IMMUTABLE)
+    return _serve(request, photos.photo_path(name), photos.MEDIA_TYPES[ext], f'"{digest}"', "no-cache")
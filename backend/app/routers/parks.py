@@ -5,14 +5,16 @@ Any authenticated user can create a park and all users can read parks.
 Only admins (or the creator) can update/delete a park.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlmodel import Session, select
 
-from app.core.deps import get_current_user
+from app.core.deps import get_calendar_user, get_current_user
 from app.database import get_session
 from app.models.park import DogPark
 from app.models.user import User
 from app.schemas.park import ParkCreate, ParkRead, ParkUpdate
+from app.services import calendar, cascade
+from app.services.write_queue import queued
 
 router = APIRouter()
 
@@ -27,6 +29,7 @@ def list_parks(
 
 
 @router.post("/", response_model=ParkRead, status_code=status.HTTP_201_CREATED)
+@queued
 def create_park(
     payload: ParkCreate,
     current_user: User = Depends(get_current_user),
@@ -54,6 +57,7 @@ def read_park(
 
 
 @router.patch("/{park_id}", response_model=ParkRead)
+@queued
 def update_park(
     park_id: int,
     payload: ParkUpdate,
@@ -71,22 +75,47 @@ def update_park(
         setattr(park, field, value)
 
     session.add(park)
+    calendar.park_changed(session, park.id)  # feeds show its name and address
     session.commit()
     session.refresh(park)
     return park
 
 
 @router.delete("/{park_id}", status_code=status.HTTP_204_NO_CONTENT)
+@queued
 def delete_park(
     park_id: int,
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
-    """Delete a park (creator or admin only)."""
+    """Delete a park and all its visits (creator or admin only)."""
     park = session.get(DogPark, park_id)
     if not park:
         raise HTTPException(status_code=404, detail="Park not found")
     if park.created_by_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized")
-    session.delete(park)
+    cascade.delete_park(session, park)
     session.commit()
+
+
+@router.get("/{park_id}/calendar.ics", response_class=Response)
+def park_calendar(
+    park_id: int,
+    request: Request,
+    current_user: User = Depends(get_calendar_user),
+    session: Session = Depends(get_session),
+):
+    """
+    Everyone's visits to a park as an iCalendar feed, for calendar apps.
+
+    Authenticates with `?token=` (see GET /users/me/calendar).
+    """
+    park = session.get(DogPark, park_id)
+    if not park:
+        raise HTTPException(status_code=404, detail="Park not found")
+    return calendar.feed_response(
+        request,
+        park.visits_changed_at or park.created_at,
+        f"park-{park.id}.ics",
+        calendar.park_visits(park),
+    )
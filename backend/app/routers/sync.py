@@ -0,0 +1,37 @@
+"""
+Delta-sync router: what changed since the client's last sync.
+
+The frontend used to re-fetch whole park, dog and visit lists after every
+mutation.  With this endpoint it keeps its own copy and asks only for the
+changes, which is usually an empty response.  See services/sync.py.
+"""
+
+from fastapi import APIRouter, Depends, Query
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.deps import get_current_user
+from app.database import get_session
+from app.models.user import User
+from app.schemas.sync import SyncChanges
+from app.services import sync
+
+router = APIRouter()
+
+
+@router.get("/", response_model=SyncChanges)
+def sync_changes(
+    since: str | None = Query(None, description="Token from the previous sync; omit for everything"),
+    limit: int = Query(settings.SYNC_MAX_ROWS, ge=1, le=settings.SYNC_MAX_ROWS),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    Parks, dogs and visits created, changed or deleted since `since`.
+
+    Returns at most `limit` changes in the order they happened, and the
+    token to pass next time.  When `has_more` is true, call again at once.
+    410 Gone means the token is too old: drop the local copy and sync
+    without a token.
+    """
+    return sync.changes_since(session, since, limit)
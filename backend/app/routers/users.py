@@ -5,17 +5,39 @@ Demonstrates:
 - `get_current_user` dependency for "who am I?" endpoints.
 - `get_current_admin` dependency for admin-only endpoints.
 - Partial updates using `model.model_dump(exclude_unset=True)`.
+- A paginated admin directory with index-backed prefix search.
+- Bulk CSV onboarding (services/user_import.py).
+- Following other users; a follow copies their upcoming visits into your
+  feed (services/timeline.py).
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import and_
-from sqlmodel import Session, select
+import csv
+import tempfile
 
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_
+from sqlmodel import Session, col, func, select
+
+from app.core.config import settings
 from app.core.deps import get_current_admin, get_current_user
-from app.core.security import hash_password, verify_password
+from app.core.security import create_calendar_token, hash_password, verify_password
 from app.database import get_session
+from app.models.follow import Follow
 from app.models.user import User
-from app.schemas.user import AdminUserCreate, AdminUserUpdate, PasswordChange, UserRead, UserUpdate
+from app.schemas.pagination import CountedCursorPage
+from app.schemas.user import (
+    AdminUserCreate,
+    AdminUserUpdate,
+    CalendarLinks,
+    PasswordChange,
+    UserImportResult,
+    UserPublic,
+    UserRead,
+    UserUpdate,
+)
+from app.services import calendar, timeline
+from app.services.user_import import CSVFormatError, import_users
 
 router = APIRouter()
 
@@ -34,6 +56,8 @@ def update_current_user(
 ):
     """Update the current user's profile fields."""
     update_data = payload.model_dump(exclude_unset=True)
+    if update_data.get("username", current_user.username) != current_user.username:
+        calendar.user_renamed(session, current_user)  # park feeds label visits by username
     for field, value in update_data.items():
         setattr(current_user, field, value)
     session.add(current_user)
@@ -59,16 +83,164 @@ def change_password(
     session.commit()
 
 
+def _calendar_links(request: Request, user: User) -> CalendarLinks:
+    token = create_calendar_token(user.id, user.calendar_token_version)
+    base = f"{str(request.base_url).rstrip('/')}{settings.API_V1_PREFIX}"
+    return CalendarLinks(
+        token=token,
+        my_visits_url=f"{base}/visits/my.ics?token={token}",
+        park_url_template=f"{base}/parks/{{park_id}}/calendar.ics?token={token}",
+    )
+
+
+@router.get("/me/calendar", response_model=CalendarLinks)
+def calendar_links(request: Request, current_user: User = Depends(get_current_user)):
+    """
+    Subscription URLs for the .ics feeds.  They embed a calendar token,
+    which can read calendars and nothing else.
+    """
+    return _calendar_links(request, current_user)
+
+
+@router.post("/me/calendar/rotate", response_model=CalendarLinks)
+def rotate_calendar_links(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """
+    New subscription URLs, for a link that leaked.  Every calendar token
+    issued before stops working; calendar apps must subscribe again.
+    """
+    current_user.calendar_token_version += 1
+    session.add(current_user)
+    session.commit()
+    return _calendar_links(request, current_user)
+
+
+# ---------------------------------------------------------------------------
+# Social graph
+# ---------------------------------------------------------------------------
+@router.get("/me/following", response_model=list[UserPublic])
+def list_following(
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Users the current user follows."""
+    return session.exec(
+        select(User)
+        .join(Follow, Follow.followee_id == User.id)
+        .where(Follow.follower_id == current_user.id)
+    ).all()
+
+
+@router.get("/me/followers", response_model=list[UserPublic])
+def list_followers(
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Users following the current user."""
+    return session.exec(
+        select(User)
+        .join(Follow, Follow.follower_id == User.id)
+        .where(Follow.followee_id == current_user.id)
+    ).all()
+
+
+@router.post("/{user_id}/follow", status_code=status.HTTP_204_NO_CONTENT)
+def follow_user(
+    user_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Follow a user and see their upcoming visits in `/visits/feed`."""
+    if user_id == current_user.id:
+        raise HTTPException(status_code=400, detail="You can't follow yourself")
+    target = session.get(User, user_id)
+    if not target or not target.is_active:
+        raise HTTPException(status_code=404, detail="User not found")
+    if session.get(Follow, (current_user.id, user_id)):
+        return
+
+    session.add(Follow(follower_id=current_user.id, followee_id=user_id))
+    timeline.backfill(session, current_user.id, user_id)
+    session.commit()
+
+
+@router.delete("/{user_id}/follow", status_code=status.HTTP_204_NO_CONTENT)
+def unfollow_user(
+    user_id: int,
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Stop following a user and drop their visits from your feed."""
+    follow = session.get(Follow, (current_user.id, user_id))
+    if not follow:
+        raise HTTPException(status_code=404, detail="You don't follow this user")
+    session.delete(follow)
+    timeline.unfollow(session, current_user.id, user_id)
+    session.commit()
+
+
 # ---------------------------------------------------------------------------
 # Admin endpoints
 # ---------------------------------------------------------------------------
-@router.get("/", response_model=list[UserRead])
+def _prefix_range(column, prefix: str):
+    """`column` starts with `prefix`, phrased as a range the index can seek."""
+    return and_(column >= prefix, column < prefix + "\U0010ffff")
+
+
+def _estimate_total(session: Session, stmt, filtered: bool) -> tuple[int, bool]:
+    """
+    Total for the first page without counting the whole table.
+
+    Users are only ever soft-deleted, so max(id) — one index seek — is the
+    unfiltered total.  Filtered totals count at most USER_COUNT_CAP rows.
+    """
+    if not filtered:
+        return session.exec(select(func.max(User.id))).one() or 0, True
+    cap = settings.USER_COUNT_CAP
+    capped = stmt.with_only_columns(User.id).limit(cap + 1).subquery()
+    count = session.exec(select(func.count()).select_from(capped)).one()
+    return min(count, cap), count <= cap
+
+
+@router.get("/", response_model=CountedCursorPage[UserRead])
 def list_users(
+    q: str | None = Query(default=None, description="Username or email prefix"),
+    is_active: bool | None = Query(default=None),
+    is_admin: bool | None = Query(default=None),
+    cursor: str | None = Query(default=None, description="`next_cursor` of the previous page"),
+    limit: int = Query(default=50, ge=1, le=200),
     admin: User = Depends(get_current_admin),
     session: Session = Depends(get_session),
 ):
-    """Admin: list all users."""
-    return session.exec(select(User)).all()
+    """Admin: search and page through users, in id order."""
+    stmt = select(User)
+    if q:
+        stmt = stmt.where(or_(_prefix_range(User.username, q), _prefix_range(User.email, q)))
+    if is_active is not None:
+        stmt = stmt.where(User.is_active == is_active)
+    if is_admin is not None:
+        stmt = stmt.where(User.is_admin == is_admin)
+
+    total, exact = None, False
+    if cursor is None:
+        filtered = bool(q) or is_active is not None or is_admin is not None
+        total, exact = _estimate_total(session, stmt, filtered)
+    else:
+        if not cursor.isdigit():
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        stmt = stmt.where(col(User.id) > int(cursor))
+
+    users = session.exec(stmt.order_by(User.id).limit(limit + 1)).all()
+    next_cursor = str(users[limit - 1].id) if len(users) > limit else None
+    return CountedCursorPage[UserRead](
+        items=users[:limit],
+        next_cursor=next_cursor,
+        total_estimate=total,
+        total_is_exact=exact,
+    )
 
 
 @router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
@@ -100,6 +272,40 @@ def create_user(
     return user
 
 
+@router.post(
+    "/import",
+    response_model=UserImportResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"text/csv": {"schema": {"type": "string"}}},
+        }
+    },
+)
+async def import_users_csv(
+    request: Request,
+    admin: User = Depends(get_current_admin),
+    session: Session = Depends(get_session),
+):
+    """
+    Admin: create many users from a CSV request body.
+
+    Header row: `email,username,password[,full_name,is_admin,is_active]`.
+    Valid rows are created even if others fail; failures are listed by
+    line number.
+    """
+    # Spool the upload (to disk past 1 MB) instead of holding it in memory.
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as csv_file:
+        async for chunk in request.stream():
+            csv_file.write(chunk)
+        csv_file.seek(0)
+        try:
+            created, errors = await run_in_threadpool(import_users, session, csv_file)
+        except (CSVFormatError, UnicodeDecodeError, csv.Error) as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid CSV: {exc}")
+    return UserImportResult(created=created, errors=errors)
+
+
 @router.patch("/{user_id}", response_model=UserRead)
 def update_user(
     user_id: int,
@@ -118,6 +324,8 @@ def update_user(
         ).first()
         if other:
             raise HTTPException(status_code=409, detail="Another user already has this email")
+    if update_data.get("username", user.username) != user.username:
+        calendar.user_renamed(session, user)
     for field, value in update_data.items():
         setattr(user, field, value)
     session.add(user)
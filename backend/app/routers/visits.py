@@ -5,20 +5,41 @@ Handles creating, reading, updating, and deleting park visits,
 including managing the many-to-many relationship between visits and dogs.
 
 Also includes the dashboard stats endpoint.
+
+Upcoming and recent reads use the hot `visits` table only; history reads
+(the full list, `/my`, a visit by id) also cover `visits_archive`
+(services/archive.py).
+
+Every write keeps the per-park, per-hour aggregates behind the dog
+recommendations in sync (services/park_slots.py) and fans the visit out to
+followers' timelines (services/timeline.py), which back `/visits/feed`.
 """
 
+import json
+from collections.abc import Iterable
 from datetime import datetime, timedelta, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlmodel import Session, col, func, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import select as core_select
+from sqlmodel import Session, col, delete, func, select
 
-from app.core.deps import get_current_user
+from app.core.deps import get_calendar_user, get_current_user
 from app.database import get_session
 from app.models.dog import Dog
 from app.models.park import DogPark
+from app.models.sync import touch
 from app.models.user import User
 from app.models.visit import Visit, VisitDogLink
-from app.schemas.visit import DashboardStats, VisitCreate, VisitDetail, VisitRead, VisitUpdate
+from app.schemas.visit import (
+    DashboardStats,
+    FeedItem,
+    VisitCreate,
+    VisitDetail,
+    VisitRead,
+    VisitUpdate,
+)
+from app.services import archive, calendar, cascade, park_slots, timeline
+from app.services.write_queue import queued
 
 router = APIRouter()
 
@@ -26,14 +47,26 @@ router = APIRouter()
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
-def _get_visit_or_404(visit_id: int, session: Session) -> Visit:
-    visit = session.get(Visit, visit_id)
+def _get_visit_or_404(visit_id: int, user: User, session: Session) -> Visit:
+    """
+    The visit `user` may write to (its owner, or an admin).
+
+    An archived visit is moved back to `visits` only after that check, so a
+    stranger's request can't shuffle it between tables.
+    """
+    visit = archive.get_visit(session, visit_id)
     if not visit:
         raise HTTPException(status_code=404, detail="Visit not found")
+    if visit.user_id != user.id and not user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if not isinstance(visit, Visit):
+        visit = archive.restore(session, visit_id)
     return visit
 
 
-def _attach_dogs_to_visit(visit: Visit, dog_ids: list[int], user: User, session: Session) -> None:
+def _attach_dogs_to_visit(
+    visit: Visit, dog_ids: list[int], user: User, session: Session
+) -> list[Dog]:
     """Validate that all dog_ids belong to the user, then create link rows."""
     dogs = session.exec(select(Dog).where(col(Dog.id).in_(dog_ids))).all()
     if len(dogs) != len(dog_ids):
@@ -42,36 +75,132 @@ def _attach_dogs_to_visit(visit: Visit, dog_ids: list[int], user: User, session:
     for dog in dogs:
         if dog.owner_id != user.id:
             raise HTTPException(status_code=403, detail=f"Dog '{dog.name}' does not belong to you")
+    for dog in dogs:
         session.add(VisitDogLink(visit_id=visit.id, dog_id=dog.id))
+    return list(dogs)
+
+
+def _check_conflicts(
+    session: Session,
+    dog_ids: Iterable[int],
+    start_time: datetime,
+    end_time: datetime,
+    exclude_visit_id: int | None = None,
+) -> None:
+    """
+    Raise 409 if any of `dog_ids` is already on a visit overlapping the range.
+
+    One query per table, whatever the dogs' history: a dog's visits are its
+    owner's (`_attach_dogs_to_visit` checks that), and the owner/end_time
+    index seeks straight to the owner's visits ending after `start_time`.
+    Each of those is then probed in the links table by primary key.  The
+    archive only holds visits that ended before `archive.hot_cutoff()`, so
+    it's only read for a range starting before that.
+
+    Call it after flushing the visit's own write: the flush takes SQLite's
+    write lock, so no other writer can slip a clashing visit in between
+    this check and the commit.
+    """
+    dog_ids = list(dog_ids)
+    if not dog_ids:
+        return
+    owners = core_select(Dog.owner_id).where(_id_in(Dog.id, dog_ids))
+    partitions = archive.PARTITIONS
+    if start_time >= archive.hot_cutoff():
+        partitions = partitions[:1]
+    conflicts = []
+    for visits, links in partitions:
+        stmt = (
+            select(visits, links.dog_id)
+            .join(links, links.visit_id == visits.id)
+            .where(
+                col(visits.user_id).in_(owners),
+                visits.end_time > start_time,
+                visits.start_time < end_time,
+                _id_in(links.dog_id, dog_ids),
+            )
+        )
+        if exclude_visit_id is not None:
+            stmt = stmt.where(visits.id != exclude_visit_id)
+        conflicts += session.exec(stmt).all()
+    conflicts.sort(key=lambda row: (row[0].start_time, row[1]))
+    if conflicts:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={
+                "message": "A dog is already on a visit at that time",
+                "conflicts": [
+                    {
+                        "visit_id": visit.id,
+                        "dog_id": dog_id,
+                        "park_id": visit.park_id,
+                        "start_time": visit.start_time.isoformat(),
+                        "end_time": visit.end_time.isoformat(),
+                    }
+                    for visit, dog_id in conflicts
+                ],
+            },
+        )
 
 
 def _get_dogs_for_visit(visit_id: int, session: Session) -> list[Dog]:
     """Load all dogs linked to a visit."""
-    stmt = (
-        select(Dog)
-        .join(VisitDogLink, Dog.id == VisitDogLink.dog_id)
-        .where(VisitDogLink.visit_id == visit_id)
+    return _dogs_by_visit([visit_id], session).get(visit_id, [])
+
+
+def _id_in(column, ids: Iterable[int]):
+    """`column IN (ids)` with all ids bound as one JSON array parameter."""
+    values = func.json_each(json.dumps(sorted(set(ids)))).table_valued("value")
+    return col(column).in_(core_select(values.c.value))
+
+
+def _dogs_by_visit(visit_ids: list[int], session: Session) -> dict[int, list[Dog]]:
+    """Dogs of many visits in one query, keyed by visit id."""
+    by_visit: dict[int, list[Dog]] = {}
+    if not visit_ids:
+        return by_visit
+    links = archive.links_where(lambda _, link: [_id_in(link.visit_id, visit_ids)])
+    rows = session.exec(
+        select(links.c.visit_id, Dog).join(Dog, Dog.id == links.c.dog_id)
     )
-    return list(session.exec(stmt).all())
+    for visit_id, dog in rows:
+        by_visit.setdefault(visit_id, []).append(dog)
+    return by_visit
 
 
-def _enrich_visit(visit: Visit, session: Session) -> dict:
-    """Build a VisitDetail-compatible dict with nested user, park, dogs."""
-    dogs = _get_dogs_for_visit(visit.id, session)
-    user = session.get(User, visit.user_id)
-    park = session.get(DogPark, visit.park_id)
-    return {
-        **visit.model_dump(),
-        "dogs": [d.model_dump() for d in dogs],
-        "user": user.model_dump() if user else None,
-        "park": park.model_dump() if park else None,
+def _enrich_visits(visits: list[Visit], session: Session) -> list[dict]:
+    """
+    Build VisitDetail-compatible dicts with nested user, park and dogs.
+
+    Three queries however many visits there are: dogs, users and parks
+    are each loaded in one batch and stitched together here.
+    """
+    if not visits:
+        return []
+    dogs = _dogs_by_visit([v.id for v in visits], session)
+    users = {
+        u.id: u for u in session.exec(select(User).where(_id_in(User.id, (v.user_id for v in visits))))
+    }
+    parks = {
+        p.id: p
+        for p in session.exec(select(DogPark).where(_id_in(DogPark.id, (v.park_id for v in visits))))
     }
+    return [
+        {
+            **visit.model_dump(),
+            "dogs": [d.model_dump() for d in dogs.get(visit.id, [])],
+            "user": users[visit.user_id].model_dump() if visit.user_id in users else None,
+            "park": parks[visit.park_id].model_dump() if visit.park_id in parks else None,
+        }
+        for visit in visits
+    ]
 
 
 # ---------------------------------------------------------------------------
 # CRUD
 # ---------------------------------------------------------------------------
 @router.post("/", response_model=VisitRead, status_code=status.HTTP_201_CREATED)
+@queued
 def create_visit(
     payload: VisitCreate,
     current_user: User = Depends(get_current_user),
@@ -81,6 +210,8 @@ def create_visit(
     Log a new visit to a park.
 
     The user selects a park, a time range, and which of their dogs are coming.
+    A dog can't be on two visits at once: an overlap is a 409 listing the
+    visits it clashes with.
     """
     # Validate park exists
     park = session.get(DogPark, payload.park_id)
@@ -98,11 +229,17 @@ def create_visit(
         park_id=payload.park_id,
     )
     session.add(visit)
-    session.commit()
-    session.refresh(visit)
+    session.flush()  # for its id, and the write lock; nothing is committed until it's all valid
 
     # Attach dogs (many-to-many)
-    _attach_dogs_to_visit(visit, payload.dog_ids, current_user, session)
+    dogs = _attach_dogs_to_visit(visit, payload.dog_ids, current_user, session)
+    _check_conflicts(
+        session, payload.dog_ids, visit.start_time, visit.end_time, exclude_visit_id=visit.id
+    )
+    park_slots.apply_visit(session, visit.park_id, visit.start_time, visit.end_time, dogs, +1)
+    timeline.fan_out_visit(session, visit)
+    calendar.visit_changed(session, visit)
+    touch(visit)  # re-sequence it now its dogs are attached (GET /sync)
     session.commit()
 
     dogs = _get_dogs_for_visit(visit.id, session)
@@ -117,15 +254,16 @@ def list_visits(
     session: Session = Depends(get_session),
 ):
     """List visits with optional park and time filters."""
-    stmt = select(Visit)
-    if park_id is not None:
-        stmt = stmt.where(Visit.park_id == park_id)
-    if upcoming:
-        stmt = stmt.where(Visit.end_time >= datetime.now(timezone.utc))
-    stmt = stmt.order_by(Visit.start_time)
-
-    visits = session.exec(stmt).all()
-    return [_enrich_visit(v, session) for v in visits]
+    if upcoming:  # hot table only
+        stmt = select(Visit).where(Visit.end_time >= datetime.now(timezone.utc))
+        if park_id is not None:
+            stmt = stmt.where(Visit.park_id == park_id)
+        return _enrich_visits(list(session.exec(stmt.order_by(Visit.start_time))), session)
+
+    visits = archive.history(
+        session, lambda v: [] if park_id is None else [v.park_id == park_id]
+    )
+    return _enrich_visits(visits, session)
 
 
 @router.get("/my", response_model=list[VisitRead])
@@ -134,14 +272,30 @@ def list_my_visits(
     session: Session = Depends(get_session),
 ):
     """List the current user's visits."""
-    visits = session.exec(
-        select(Visit).where(Visit.user_id == current_user.id).order_by(Visit.start_time)
-    ).all()
-    result = []
-    for v in visits:
-        dogs = _get_dogs_for_visit(v.id, session)
-        result.append({**v.model_dump(), "dogs": [d.model_dump() for d in dogs]})
-    return result
+    visits = archive.history(session, lambda v: [v.user_id == current_user.id])
+    dogs = _dogs_by_visit([v.id for v in visits], session)
+    return [
+        {**v.model_dump(), "dogs": [d.model_dump() for d in dogs.get(v.id, [])]} for v in visits
+    ]
+
+
+@router.get("/my.ics", response_class=Response)
+def my_visits_calendar(
+    request: Request,
+    current_user: User = Depends(get_calendar_user),
+):
+    """
+    The current user's visits as an iCalendar feed, for calendar apps.
+
+    Authenticates with `?token=` (see GET /users/me/calendar) and answers
+    conditional requests with 304 (see services/calendar.py).
+    """
+    return calendar.feed_response(
+        request,
+        current_user.visits_changed_at or current_user.created_at,
+        "my-visits.ics",
+        calendar.my_visits(current_user),
+    )
 
 
 @router.get("/upcoming-activity", response_model=list[VisitDetail])
@@ -157,7 +311,7 @@ def upcoming_activity(
         .order_by(Visit.start_time)
         .limit(10)
     ).all()
-    return [_enrich_visit(v, session) for v in visits]
+    return _enrich_visits(list(visits), session)
 
 
 @router.get("/dashboard-stats", response_model=DashboardStats)
@@ -193,6 +347,42 @@ def dashboard_stats(
     )
 
 
+@router.get("/feed", response_model=list[FeedItem])
+def friends_feed(
+    limit: int = Query(default=20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session),
+):
+    """Upcoming visits of the users you follow, soonest first."""
+    entries = timeline.read_feed(session, current_user.id, limit)
+    if not entries:
+        return []
+
+    # Hydrate authors and parks with two primary-key lookups.
+    authors = {
+        u.id: u
+        for u in session.exec(
+            select(User).where(col(User.id).in_({e.author_id for e in entries}))
+        )
+    }
+    parks = {
+        p.id: p
+        for p in session.exec(
+            select(DogPark).where(col(DogPark.id).in_({e.park_id for e in entries}))
+        )
+    }
+    return [
+        {
+            "visit_id": e.visit_id,
+            "start_time": e.start_time,
+            "end_time": e.end_time,
+            "user": authors[e.author_id],
+            "park": parks[e.park_id],
+        }
+        for e in entries
+    ]
+
+
 @router.get("/{visit_id}", response_model=VisitDetail)
 def read_visit(
     visit_id: int,
@@ -200,11 +390,14 @@ def read_visit(
     session: Session = Depends(get_session),
 ):
     """Get a single visit with full details."""
-    visit = _get_visit_or_404(visit_id, session)
-    return _enrich_visit(visit, session)
+    visit = archive.get_visit(session, visit_id)
+    if not visit:
+        raise HTTPException(status_code=404, detail="Visit not found")
+    return _enrich_visits([visit], session)[0]
 
 
 @router.patch("/{visit_id}", response_model=VisitRead)
+@queued
 def update_visit(
     visit_id: int,
     payload: VisitUpdate,
@@ -212,52 +405,57 @@ def update_visit(
     session: Session = Depends(get_session),
 ):
     """Update a visit (owner or admin only)."""
-    visit = _get_visit_or_404(visit_id, session)
-    if visit.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Not authorized")
+    visit = _get_visit_or_404(visit_id, current_user, session)
 
     update_data = payload.model_dump(exclude_unset=True)
     dog_ids = update_data.pop("dog_ids", None)
 
+    old_dogs = _get_dogs_for_visit(visit.id, session)
+    before = (visit.park_id, visit.start_time, visit.end_time, old_dogs)
+
+    # Replace dog links if new list provided (validated before anything changes)
+    dogs = old_dogs
+    if dog_ids is not None:
+        session.exec(delete(VisitDogLink).where(VisitDogLink.visit_id == visit.id))
+        dogs = _attach_dogs_to_visit(visit, dog_ids, current_user, session)
+        touch(visit)  # its dogs changed (GET /sync)
+
     for field, value in update_data.items():
         setattr(visit, field, value)
 
     session.add(visit)
+    if dog_ids is not None or "start_time" in update_data or "end_time" in update_data:
+        session.flush()  # the write lock, before checking (see `_check_conflicts`)
+        _check_conflicts(
+            session, (d.id for d in dogs), visit.start_time, visit.end_time,
+            exclude_visit_id=visit.id,
+        )
+    # Move its dogs between slot aggregates, in this same transaction.
+    park_slots.move_visit(
+        session, before, (visit.park_id, visit.start_time, visit.end_time, dogs)
+    )
+    timeline.update_visit(session, visit)
+    calendar.visit_changed(session, visit)
     session.commit()
     session.refresh(visit)
 
-    # Replace dog links if new list provided
-    if dog_ids is not None:
-        # Remove existing links
-        existing_links = session.exec(
-            select(VisitDogLink).where(VisitDogLink.visit_id == visit.id)
-        ).all()
-        for link in existing_links:
-            session.delete(link)
-        session.commit()
-        # Add new links
-        _attach_dogs_to_visit(visit, dog_ids, current_user, session)
-        session.commit()
-
     dogs = _get_dogs_for_visit(visit.id, session)
     return {**visit.model_dump(), "dogs": [d.model_dump() for d in dogs]}
 
 
 @router.delete("/{visit_id}", status_code=status.HTTP_204_NO_CONTENT)
+@queued
 def delete_visit(
     visit_id: int,
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session),
 ):
     """Delete a visit (owner or admin only)."""
-    visit = _get_visit_or_404(visit_id, session)
-    if visit.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Not authorized")
-
-    # Remove dog links first
-    links = session.exec(select(VisitDogLink).where(VisitDogLink.visit_id == visit.id)).all()
-    for link in links:
-        session.delete(link)
+    visit = _get_visit_or_404(visit_id, current_user, session)
 
-    session.delete(visit)
+    dogs = _get_dogs_for_visit(visit.id, session)
+    park_slots.apply_visit(session, visit.park_id, visit.start_time, visit.end_time, dogs, -1)
+    timeline.remove_visit(session, visit.id)
+    calendar.visit_changed(session, visit)
+    cascade.delete_visit(session, visit)
     session.commit()
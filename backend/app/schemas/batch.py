@@ -0,0 +1,20 @@
+"""Pydantic schemas for the batch endpoint."""
+
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+
+class BatchSubRequest(BaseModel):
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"] = "GET"
+    path: str  # relative to the API prefix, e.g. "/visits/dashboard-stats"
+    body: Any = None
+
+
+class BatchRequest(BaseModel):
+    requests: list[BatchSubRequest]
+
+
+class BatchSubResponse(BaseModel):
+    status: int
+    body: Any = None
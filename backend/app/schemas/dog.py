@@ -38,7 +38,24 @@ class DogRead(BaseModel):
     good_with_others: bool
     personality_notes: str | None
     photo_url: str | None
+    photo_thumbnail_url: str | None = None
     owner_id: int
     created_at: datetime
+    updated_at: datetime | None = None
 
     model_config = {"from_attributes": True}
+
+
+class DogRecommendation(BaseModel):
+    """One scored upcoming hour at a park (score 0–100, higher is better)."""
+
+    park_id: int
+    park_name: str
+    slot_start: datetime
+    slot_end: datetime
+    score: int
+    dog_count: int
+    small_count: int
+    medium_count: int
+    large_count: int
+    unsocial_count: int
@@ -0,0 +1,29 @@
+"""Shared envelope for cursor-paginated list endpoints."""
+
+from typing import Generic, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """
+    One page of results.
+
+    Pass `next_cursor` back as `?cursor=` to fetch the following page;
+    it is None on the last page.
+    """
+
+    items: list[T]
+    next_cursor: str | None = None
+
+
+class CountedCursorPage(CursorPage[T], Generic[T]):
+    """
+    A page plus an approximate total, sent with the first page only
+    (later pages carry None — reuse the first page's figure).
+    """
+
+    total_estimate: int | None = None
+    total_is_exact: bool = False
@@ -30,5 +30,6 @@ class ParkRead(BaseModel):
     longitude: float | None
     created_by_id: int
     created_at: datetime
+    updated_at: datetime | None = None
 
     model_config = {"from_attributes": True}
@@ -0,0 +1,39 @@
+"""Pydantic schemas for the delta-sync endpoint."""
+
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from app.schemas.dog import DogRead
+from app.schemas.park import ParkRead
+
+
+class SyncVisit(BaseModel):
+    """A visit with its dogs as ids; the dogs themselves sync separately."""
+
+    id: int
+    start_time: datetime
+    end_time: datetime
+    notes: str | None
+    user_id: int
+    park_id: int
+    created_at: datetime
+    updated_at: datetime | None = None
+    dog_ids: list[int] = []
+
+
+class SyncDeleted(BaseModel):
+    """Ids deleted since the token.  A deleted dog also leaves every visit."""
+
+    parks: list[int] = []
+    dogs: list[int] = []
+    visits: list[int] = []
+
+
+class SyncChanges(BaseModel):
+    token: str  # pass back as `since`; opaque to clients
+    has_more: bool  # more changes are waiting: sync again now with `token`
+    parks: list[ParkRead] = []
+    dogs: list[DogRead] = []
+    visits: list[SyncVisit] = []
+    deleted: SyncDeleted = SyncDeleted()
@@ -80,6 +80,24 @@ class UserPublic(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class CalendarLinks(BaseModel):
+    """Subscription URLs for calendar apps; each embeds a calendar token."""
+
+    token: str
+    my_visits_url: str
+    park_url_template: str  # replace {park_id}
+
+
+class UserImportError(BaseModel):
+    row: int  # CSV line number (the header is line 1)
+    error: str
+
+
+class UserImportResult(BaseModel):
+    created: int
+    errors: list[UserImportError]
+
+
 # ---------------------------------------------------------------------------
 # Auth
 # ---------------------------------------------------------------------------
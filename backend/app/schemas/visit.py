@@ -1,25 +1,31 @@
 """Pydantic schemas for Visit API endpoints."""
 
 from datetime import datetime
+from typing import Annotated
 
-from pydantic import BaseModel
+from pydantic import AfterValidator, BaseModel
 
+from app.models.types import to_utc
 from app.schemas.dog import DogRead
 from app.schemas.park import ParkRead
 from app.schemas.user import UserPublic
 
 
+# Incoming times are converted to UTC; a time without an offset is taken as UTC.
+UTCTime = Annotated[datetime, AfterValidator(to_utc)]
+
+
 class VisitCreate(BaseModel):
     park_id: int
-    start_time: datetime
-    end_time: datetime
+    start_time: UTCTime
+    end_time: UTCTime
     dog_ids: list[int]  # which of the user's dogs are coming
     notes: str | None = None
 
 
 class VisitUpdate(BaseModel):
-    start_time: datetime | None = None
-    end_time: datetime | None = None
+    start_time: UTCTime | None = None
+    end_time: UTCTime | None = None
     dog_ids: list[int] | None = None
     notes: str | None = None
 
@@ -32,6 +38,7 @@ class VisitRead(BaseModel):
     user_id: int
     park_id: int
     created_at: datetime
+    updated_at: datetime | None = None
     dogs: list[DogRead] = []
 
     model_config = {"from_attributes": True}
@@ -44,6 +51,16 @@ class VisitDetail(VisitRead):
     park: ParkRead
 
 
+class FeedItem(BaseModel):
+    """A followed user's upcoming visit, as shown in the friends feed."""
+
+    visit_id: int
+    start_time: datetime
+    end_time: datetime
+    user: UserPublic
+    park: ParkRead
+
+
 class DashboardStats(BaseModel):
     upcoming_visit_count: int
     most_popular_park: str | None
@@ -0,0 +1,152 @@
+"""
+Hot/cold partitioning of visits: the archiver, and reads across both tables.
+
+WHY:
+----
+Nearly every read is about upcoming or recent visits (upcoming activity,
+dashboard stats, calendar feeds, `?upcoming=true`), yet `visits` kept every
+visit ever logged in the same B-trees.  Visits that ended more than
+VISIT_HOT_DAYS ago now move to `visits_archive` (models/visit.py), so the
+hot table and its indexes only grow with what's current.
+
+THE ARCHIVER:
+-------------
+`archive_visits()` moves ended visits in batches of VISIT_ARCHIVE_BATCH,
+one transaction per batch so writers are never blocked for long: copy the
+rows and their dog links, drop their (already expired) feed entries, and
+delete them from `visits`.  Ids and sync sequence numbers are kept, so
+nothing else notices.  The hourly housekeeping job runs it, on one worker
+at a time (services/jobs.py); `python maintenance.py archive-visits` runs
+it by hand.
+
+The hot window never drops below what the hot-only reads look back over:
+the calendar feeds' CALENDAR_PAST_DAYS and the dashboard's week.
+
+READING HISTORY:
+----------------
+History reads (`GET /visits/`, `/visits/my`, a visit by id, dogs seen at a
+park, a full sync) cover both tables through the helpers below.  Each
+table is read with its own index-ordered statement and the two sorted
+lists are merged here, so neither read sorts in a temp B-tree.
+
+Writing to an archived visit (PATCH/DELETE) first `restore`s it to the hot
+table, once the caller is known to be allowed to write to it; the archiver
+moves it back later if it's still old.
+"""
+
+import heapq
+import json
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, func, insert, union_all
+from sqlalchemy import select as core_select
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.database import engine
+from app.models.timeline import TimelineEntry
+from app.models.visit import Visit, VisitArchive, VisitBase, VisitDogLink, VisitDogLinkArchive
+
+_COLUMNS = list(Visit.model_fields)
+_LINK_COLUMNS = list(VisitDogLink.model_fields)
+
+# (visits table, its links table): hot first.
+PARTITIONS = ((Visit, VisitDogLink), (VisitArchive, VisitDogLinkArchive))
+
+_DASHBOARD_DAYS = 7  # dashboard stats count visits that started this week
+
+
+def hot_cutoff() -> datetime:
+    """Visits that ended before this belong in the archive."""
+    days = max(settings.VISIT_HOT_DAYS, settings.CALENDAR_PAST_DAYS, _DASHBOARD_DAYS)
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def _ids_in(column, ids: list[int]):
+    values = func.json_each(json.dumps(ids)).table_valued("value")
+    return col(column).in_(core_select(values.c.value))
+
+
+# ---------------------------------------------------------------------------
+# Moving rows
+# ---------------------------------------------------------------------------
+def _copy(session: Session, source, target, columns: list[str], where) -> None:
+    rows = core_select(*(getattr(source, c) for c in columns)).where(where)
+    session.exec(insert(target).from_select(columns, rows))
+    session.exec(delete(source).where(where))
+
+
+def _move(session: Session, source: int, target: int, ids: list[int]) -> None:
+    """Move visits `ids`, with their links, from partition `source` to `target`."""
+    (visits, links), (to_visits, to_links) = PARTITIONS[source], PARTITIONS[target]
+    _copy(session, links, to_links, _LINK_COLUMNS, _ids_in(links.visit_id, ids))
+    _copy(session, visits, to_visits, _COLUMNS, _ids_in(visits.id, ids))
+
+
+def archive_visits(before: datetime | None = None, batch_size: int | None = None) -> int:
+    """Move visits that ended before `before` (default: the hot cutoff); returns how many."""
+    before = before or hot_cutoff()
+    batch_size = batch_size or settings.VISIT_ARCHIVE_BATCH
+    moved = 0
+    while True:
+        with Session(engine) as session:
+            ids = list(session.exec(
+                select(Visit.id).where(Visit.end_time < before).limit(batch_size)
+            ))
+            if not ids:
+                return moved
+            session.exec(delete(TimelineEntry).where(_ids_in(TimelineEntry.visit_id, ids)))
+            _move(session, 0, 1, ids)
+            session.commit()
+        moved += len(ids)
+
+
+def restore(session: Session, visit_id: int) -> Visit | None:
+    """Move an archived visit back to `visits` (to write to it); None if there's none."""
+    if session.get(VisitArchive, visit_id) is None:
+        return None
+    _move(session, 1, 0, [visit_id])
+    return session.get(Visit, visit_id)
+
+
+# ---------------------------------------------------------------------------
+# Reading across both tables
+# ---------------------------------------------------------------------------
+def get_visit(session: Session, visit_id: int) -> VisitBase | None:
+    """A visit by id, hot or archived."""
+    return session.get(Visit, visit_id) or session.get(VisitArchive, visit_id)
+
+
+def history(session: Session, where: Callable[[type[VisitBase]], list]) -> list[VisitBase]:
+    """
+    Visits from both tables matching `where(model)`, in start time order.
+
+        archive.history(session, lambda v: [v.user_id == user.id])
+    """
+    parts = [
+        session.exec(select(model).where(*where(model)).order_by(model.start_time)).all()
+        for model in (VisitArchive, Visit)
+    ]
+    return list(heapq.merge(*parts, key=lambda v: v.start_time))
+
+
+def ids_where(where: Callable[[type[VisitBase]], list]):
+    """One SELECT of the ids of matching visits in both tables, for `IN (...)`."""
+    return union_all(*(
+        core_select(model.id).where(*where(model)) for model, _ in PARTITIONS
+    ))
+
+
+def links_where(where: Callable[[type[VisitBase], type], list]):
+    """
+    One SELECT of `(visit_id, dog_id)` links in both partitions, as a subquery.
+
+    `where(visits, links)` filters each partition's links table:
+
+        archive.links_where(lambda v, l: [l.visit_id.in_(select(v.id).where(...))])
+    """
+    return union_all(*(
+        core_select(links.visit_id, links.dog_id).where(*where(model, links))
+        for model, links in PARTITIONS
+    )).subquery()
@@ -0,0 +1,160 @@
+"""
+In-process dispatch of batch sub-requests.
+
+Each sub-request is turned into a fresh ASGI scope (copied from the outer
+request) and handed straight to the application's router, so it runs the
+exact same route, validation and dependency code as a normal HTTP call —
+minus the network round trip.
+
+The outer request's Session and authenticated User are placed in every
+sub-request scope (see `get_session` and `get_current_user`), so the whole
+batch costs one JWT decode, one user lookup and one DB session.
+
+Sub-requests go to the router rather than the full middleware stack:
+CORS and friends already ran for the outer request.  For the middlewares
+that count or guard requests, that means:
+
+- Rate limits: `get_current_user` is skipped, so each sub-request takes its
+  own read or write token here; the ones over the limit get 429.
+- Idempotency-Key: honoured for the batch as a whole (core/idempotency.py
+  covers `POST /batch`), so a retried batch replays every result instead
+  of running any sub-request again.  Sub-requests never see the key.
+- Concurrency: the batch is one "heavy" request (core/concurrency.py); its
+  sub-requests run one after another inside that slot.
+- Metrics: recorded once, as `POST /batch`.
+"""
+
+import json
+from typing import Any
+from urllib.parse import urlsplit
+
+import anyio
+from fastapi import HTTPException, Request
+from sqlmodel import Session
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.deps import SHARED_USER_SCOPE_KEY
+from app.database import SHARED_SESSION_SCOPE_KEY
+from app.models.user import User
+from app.schemas.batch import BatchSubRequest
+
+# Scope keys written by routing the *outer* request; sub-requests re-route.
+_ROUTE_SCOPE_KEYS = ("route", "endpoint", "path_params")
+_DROPPED_HEADERS = (b"content-length", b"content-type", b"idempotency-key")
+
+
+async def dispatch_batch(
+    request: Request,
+    items: list[BatchSubRequest],
+    session: Session,
+    user: User,
+) -> list[dict[str, Any]]:
+    """Run every sub-request in order and collect their status and body."""
+    return [await _dispatch_one(request, item, session, user) for item in items]
+
+
+async def _dispatch_one(
+    request: Request,
+    item: BatchSubRequest,
+    session: Session,
+    user: User,
+) -> dict[str, Any]:
+    if not item.path.startswith("/"):
+        return {"status": 400, "body": {"detail": "Sub-request path must start with '/'"}}
+    if item.path.split("?", 1)[0].rstrip("/") == "/batch":
+        return {"status": 400, "body": {"detail": "Batches cannot be nested"}}
+    try:  # each sub-request costs a token, as it would sent on its own
+        rate_limit.check_user(item.method, user.id)
+    except HTTPException as exc:
+        return {"status": exc.status_code, "body": {"detail": exc.detail}}
+
+    path = settings.API_V1_PREFIX + item.path
+    status_code, headers, body = await _call_router(request, item, path, session, user)
+
+    # The router answers "/dogs" with a redirect to "/dogs/"; follow it here
+    # so callers don't need to know the trailing-slash convention.
+    if status_code in (307, 308) and b"location" in headers:
+        location = urlsplit(headers[b"location"].decode("latin-1"))
+        redirected = location.path + (f"?{location.query}" if location.query else "")
+        status_code, headers, body = await _call_router(request, item, redirected, session, user)
+
+    if status_code >= 400:
+        # Don't let a failed sub-request leave half-applied changes behind
+        # for the next one.
+        session.rollback()
+
+    return {"status": status_code, "body": _decode_body(headers, body)}
+
+
+async def _call_router(
+    request: Request,
+    item: BatchSubRequest,
+    path: str,
+    session: Session,
+    user: User,
+) -> tuple[int, dict[bytes, bytes], bytes]:
+    path, _, query = path.partition("?")
+    payload = b"" if item.body is None else json.dumps(item.body).encode("utf-8")
+
+    headers = [(k, v) for k, v in request.scope["headers"] if k not in _DROPPED_HEADERS]
+    if payload:
+        headers.append((b"content-type", b"application/json"))
+    headers.append((b"content-length", str(len(payload)).encode("latin-1")))
+
+    scope = {
+        key: value for key, value in request.scope.items() if key not in _ROUTE_SCOPE_KEYS
+    }
+    scope.update(
+        method=item.method,
+        path=path,
+        raw_path=path.encode("utf-8"),
+        query_string=query.encode("utf-8"),
+        headers=headers,
+    )
+    scope[SHARED_SESSION_SCOPE_KEY] = session
+    scope[SHARED_USER_SCOPE_KEY] = user
+
+    body_sent = False
+
+    async def receive() -> dict[str, Any]:
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        # The client never disconnects from an in-process call.
+        await anyio.sleep_forever()
+
+    status_code = 500
+    response_headers: dict[bytes, bytes] = {}
+    chunks: list[bytes] = []
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            response_headers.update((k.lower(), v) for k, v in message.get("headers", []))
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await request.app.router(scope, receive, send)
+    except StarletteHTTPException as exc:
+        # Raised by the router itself for unknown paths / wrong methods.
+        detail = json.dumps({"detail": exc.detail}).encode("utf-8")
+        return exc.status_code, {b"content-type": b"application/json"}, detail
+    except Exception:
+        session.rollback()
+        detail = json.dumps({"detail": "Internal Server Error"}).encode("utf-8")
+        return 500, {b"content-type": b"application/json"}, detail
+
+    return status_code, response_headers, b"".join(chunks)
+
+
+def _decode_body(headers: dict[bytes, bytes], body: bytes) -> Any:
+    if not body:
+        return None
+    if headers.get(b"content-type", b"").startswith(b"application/json"):
+        return json.loads(body)
+    return body.decode("utf-8", errors="replace")
@@ -0,0 +1,216 @@
+"""
+iCalendar (.ics) feeds of visits, for calendar-app subscriptions.
+
+Calendar apps poll a subscription URL every few minutes, and nearly every
+poll finds nothing new.  The feeds are built around that:
+
+- VALIDATORS.  Every visit write stamps `visits_changed_at` on the visit's
+  user and park (`visit_changed`, `park_changed`, ...).  A feed's ETag and
+  Last-Modified come from that one column of a row the request loads for
+  auth anyway, so an unchanged feed is a 304 without reading `visits`.
+- STREAMING.  A 200 renders events from a narrow column projection (no
+  ORM objects, no dogs), a chunk of rows at a time, so a busy park's feed
+  is never held in memory whole.
+
+Feeds include visits that ended at most CALENDAR_PAST_DAYS ago.  That
+window slides without any write, so a client answered 304 may keep a few
+older events; calendars keep past events anyway.  Callers commit.
+"""
+
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import update
+from sqlalchemy import select as core_select
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.database import engine
+from app.models.park import DogPark
+from app.models.user import User
+from app.models.visit import Visit
+
+PRODID = "-//Dog Park Social//Visits//EN"
+CHUNK_ROWS = 500
+CACHE_CONTROL = "private, no-cache"  # store, but revalidate every time
+
+
+# ---------------------------------------------------------------------------
+# Change stamps
+# ---------------------------------------------------------------------------
+def visit_changed(session: Session, visit: Visit) -> None:
+    """Stamp the feeds `visit` appears in: its user's and its park's."""
+    now = datetime.now(timezone.utc)
+    session.exec(update(User).where(User.id == visit.user_id).values(visits_changed_at=now))
+    session.exec(
+        update(DogPark).where(DogPark.id == visit.park_id).values(visits_changed_at=now)
+    )
+
+
+def park_visitors_changed(session: Session, park_id: int) -> None:
+    """Stamp the feed of everyone with a visit at the park."""
+    visitors = core_select(Visit.user_id).where(Visit.park_id == park_id)
+    session.exec(
+        update(User)
+        .where(col(User.id).in_(visitors))
+        .values(visits_changed_at=datetime.now(timezone.utc))
+    )
+
+
+def user_renamed(session: Session, user: User) -> None:
+    """Stamp the feeds that show `user`'s username: their own, and their parks'."""
+    now = datetime.now(timezone.utc)
+    parks = core_select(Visit.park_id).where(Visit.user_id == user.id, Visit.end_time >= _since())
+    session.exec(update(DogPark).where(col(DogPark.id).in_(parks)).values(visits_changed_at=now))
+    user.visits_changed_at = now
+
+
+def park_changed(session: Session, park_id: int) -> None:
+    """Stamp a park's feed and the feed of everyone with a visit there."""
+    park_visitors_changed(session, park_id)
+    session.exec(
+        update(DogPark)
+        .where(DogPark.id == park_id)
+        .values(visits_changed_at=datetime.now(timezone.utc))
+    )
+
+
+# ---------------------------------------------------------------------------
+# Conditional responses
+# ---------------------------------------------------------------------------
+def _as_utc(value: datetime) -> datetime:
+    """Stored datetimes come back naive, in UTC."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def _not_modified(request: Request, etag: str, changed: datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:  # takes precedence over If-Modified-Since
+        return if_none_match.strip() == "*" or etag in (
+            tag.strip() for tag in if_none_match.split(",")
+        )
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return changed.replace(microsecond=0) <= since
+
+
+def feed_response(request: Request, changed: datetime, filename: str,
+                  body: Iterator[str]) -> Response:
+    """
+    304 if the client's copy matches `changed`, else `body` streamed.
+
+    `body` is a generator, so nothing is queried or rendered for a 304.
+    """
+    changed = _as_utc(changed)
+    etag = f'"{int(changed.timestamp() * 1_000_000):x}"'
+    headers = {
+        "etag": etag,
+        "last-modified": format_datetime(changed, usegmt=True),
+        "cache-control": CACHE_CONTROL,
+    }
+    if _not_modified(request, etag, changed):
+        return Response(status_code=304, headers=headers)
+    headers["content-disposition"] = f'inline; filename="{filename}"'
+    return StreamingResponse(body, media_type="text/calendar; charset=utf-8", headers=headers)
+
+
+# ---------------------------------------------------------------------------
+# Rendering (RFC 5545)
+# ---------------------------------------------------------------------------
+def _text(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n").replace("\r", "")
+    )
+
+
+def _fold(line: str) -> str:
+    """Wrap `line` at 75 octets, never inside a UTF-8 sequence."""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, start, limit = [], 0, 75
+    while start < len(raw):
+        end = min(start + limit, len(raw))
+        while end < len(raw) and raw[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(raw[start:end].decode())
+        start, limit = end, 74  # continuation lines begin with a space
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _stamp(value: datetime) -> str:
+    return _as_utc(value).astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _event(visit_id: int, start: datetime, end: datetime, created: datetime,
+           summary: str, location: str | None = None, description: str | None = None) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:visit-{visit_id}@dog-park-social",
+        f"DTSTAMP:{_stamp(created)}",
+        f"DTSTART:{_stamp(start)}",
+        f"DTEND:{_stamp(end)}",
+        f"SUMMARY:{_text(summary)}",
+    ]
+    if location:
+        lines.append(f"LOCATION:{_text(location)}")
+    if description:
+        lines.append(f"DESCRIPTION:{_text(description)}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+
+def _stream(name: str, stmt, render) -> Iterator[str]:
+    yield "".join(_fold(line) for line in (
+        "BEGIN:VCALENDAR", "VERSION:2.0", f"PRODID:{PRODID}", "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH", f"X-WR-CALNAME:{_text(name)}",
+    ))
+    # Its own session: the request's is closed before the body is sent.
+    with Session(engine) as session:
+        rows = session.exec(stmt.execution_options(yield_per=CHUNK_ROWS))
+        for chunk in rows.partitions():
+            yield "".join(render(row) for row in chunk)
+    yield "END:VCALENDAR\r\n"
+
+
+def _since() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=settings.CALENDAR_PAST_DAYS)
+
+
+def my_visits(user: User) -> Iterator[str]:
+    """The user's own visits, located at their parks."""
+    stmt = (
+        select(Visit.id, Visit.start_time, Visit.end_time, Visit.created_at, Visit.notes,
+               DogPark.name, DogPark.address)
+        .join(DogPark, DogPark.id == Visit.park_id)
+        .where(Visit.user_id == user.id, Visit.end_time >= _since())
+        .order_by(Visit.start_time)
+    )
+    return _stream(
+        f"{user.username}'s dog park visits",
+        stmt,
+        lambda r: _event(r[0], r[1], r[2], r[3], f"Dog park: {r[5]}", r[6], r[4]),
+    )
+
+
+def park_visits(park: DogPark) -> Iterator[str]:
+    """Everyone's visits to one park, labelled by username."""
+    name, address = park.name, park.address
+    stmt = (
+        select(Visit.id, Visit.start_time, Visit.end_time, Visit.created_at, User.username)
+        .join(User, User.id == Visit.user_id)
+        .where(Visit.park_id == park.id, Visit.end_time >= _since())
+        .order_by(Visit.start_time)
+    )
+    return _stream(
+        name, stmt, lambda r: _event(r[0], r[1], r[2], r[3], f"{r[4]} at {name}", address)
+    )
@@ -0,0 +1,108 @@
+"""
+Set-based cascading deletes, and a purge for rows left orphaned by older versions.
+
+WHY NOT `ON DELETE CASCADE`?
+----------------------------
+SQLite can't add a cascade to an existing foreign key: every table would
+have to be rebuilt, and `PRAGMA foreign_keys=ON` set on every connection.
+Instead, each delete here removes a parent's dependents with one
+`DELETE ... WHERE` per child table, selected through an index.  Deleting
+a park with 50k visits is then five statements, not 100k ORM deletes.
+
+WHAT DEPENDS ON WHAT:
+---------------------
+    dog_parks ─┬─ visits ─┬─ visit_dogs
+               │          └─ timeline_entries
+               ├─ visits_archive ── visit_dogs_archive
+               └─ park_slot_stats
+    dogs ─────┬─ visit_dogs
+              └─ visit_dogs_archive
+
+Users are soft-deleted (`is_active=False`) and keep their rows, so they
+have no cascade.  Visits deleted set-based get delta-sync tombstones here
+(services/sync.py); ORM deletes get theirs from the flush hook.  Callers
+commit.
+"""
+
+from sqlalchemy import ColumnElement, delete, exists
+from sqlalchemy import select as core_select
+from sqlmodel import Session, col
+
+from app.models.dog import Dog
+from app.models.park import DogPark
+from app.models.park_slot import ParkSlotStats
+from app.models.timeline import TimelineEntry
+from app.models.visit import Visit, VisitArchive, VisitDogLink, VisitDogLinkArchive
+from app.services import archive, calendar, park_slots, sync
+
+
+def delete_park(session: Session, park: DogPark) -> None:
+    """Delete a park with its visits and their links, feed entries and slot stats."""
+    calendar.park_visitors_changed(session, park.id)  # their feeds lose these visits
+    sync.tombstone_where(session, Visit, archive.ids_where(lambda v: [v.park_id == park.id]))
+    for visits, links in archive.PARTITIONS:  # hot and archived
+        visit_ids = core_select(visits.id).where(visits.park_id == park.id)
+        if visits is Visit:
+            session.exec(delete(TimelineEntry).where(col(TimelineEntry.visit_id).in_(visit_ids)))
+        session.exec(delete(links).where(col(links.visit_id).in_(visit_ids)))
+        session.exec(delete(visits).where(visits.park_id == park.id))
+    session.exec(delete(ParkSlotStats).where(ParkSlotStats.park_id == park.id))
+    session.delete(park)
+
+
+def delete_dog(session: Session, dog: Dog) -> None:
+    """Delete a dog and drop it from every visit (the visits themselves stay)."""
+    park_slots.remove_dog(session, dog)
+    for _, links in archive.PARTITIONS:
+        session.exec(delete(links).where(links.dog_id == dog.id))
+    session.delete(dog)
+
+
+def delete_visit(session: Session, visit: Visit) -> None:
+    """Delete a visit and its dog links.  Slot stats and feeds are the caller's."""
+    session.exec(delete(VisitDogLink).where(VisitDogLink.visit_id == visit.id))
+    session.delete(visit)
+
+
+# ---------------------------------------------------------------------------
+# Orphan purge (python maintenance.py purge-orphans)
+# ---------------------------------------------------------------------------
+def _missing(column, parent_id) -> ColumnElement[bool]:
+    """`column` points at no row of `parent_id`'s table."""
+    return ~exists().where(parent_id == column)
+
+
+def purge_orphans(session: Session) -> dict[str, int]:
+    """
+    Delete rows whose parent is gone; returns rows deleted per table.
+
+    The slot aggregates may still count a purged link's dog (whose row,
+    and so its size, is already gone), so they're rebuilt if any hot link
+    was purged.
+    """
+    # Visits first: their links and feed entries become orphans in turn.
+    def orphaned(model):
+        return [_missing(model.park_id, DogPark.id)]
+
+    sync.tombstone_where(session, Visit, archive.ids_where(orphaned))
+    steps = [
+        ("visits", delete(Visit).where(*orphaned(Visit))),
+        ("visits_archive", delete(VisitArchive).where(*orphaned(VisitArchive))),
+        ("visit_dogs", delete(VisitDogLink).where(
+            _missing(VisitDogLink.visit_id, Visit.id) | _missing(VisitDogLink.dog_id, Dog.id)
+        )),
+        ("visit_dogs_archive", delete(VisitDogLinkArchive).where(
+            _missing(VisitDogLinkArchive.visit_id, VisitArchive.id)
+            | _missing(VisitDogLinkArchive.dog_id, Dog.id)
+        )),
+        ("timeline_entries", delete(TimelineEntry).where(
+            _missing(TimelineEntry.visit_id, Visit.id)
+        )),
+        ("park_slot_stats", delete(ParkSlotStats).where(
+            _missing(ParkSlotStats.park_id, DogPark.id)
+        )),
+    ]
+    deleted = {table: session.exec(stmt).rowcount for table, stmt in steps}
+    if deleted["visit_dogs"]:
+        park_slots.rebuild(session)
+    return deleted
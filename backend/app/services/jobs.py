@@ -0,0 +1,278 @@
+"""
+Durable background jobs backed by the `jobs` table (models/job.py).
+
+USAGE:
+------
+Register a handler when its module is imported (and list the module in
+`TASK_MODULES` so standalone workers import it too):
+
+    @job_handler("photos.thumbnail")
+    def make_thumbnail(session: Session, name: str) -> None:
+        ...
+
+Enqueue from a route *in the route's own session*, so the job commits
+atomically with the rest of the request — no job for a rolled-back write,
+no lost job for a committed one:
+
+    jobs.enqueue(session, "photos.thumbnail", {"name": name},
+                 idempotency_key=f"thumbnail:{name}")
+    session.commit()
+
+Workers run as threads inside the API process (`JOB_WORKERS`, started from
+the lifespan hook in main.py) and/or as a separate process (`python
+worker.py`).  Claiming is a single UPDATE ... RETURNING, so any number of
+workers in any number of processes can share the queue; the claim's token
+keeps a worker whose job was reclaimed from recording its outcome.
+
+HOUSEKEEPING:
+-------------
+The hourly clean-up (finished jobs, expired idempotency keys, archiving
+old visits, past park slots) is itself a job, `jobs.housekeeping`, with the idempotency key
+`housekeeping:<hour>`.  Every worker enqueues the current hour's job every
+few minutes, which is a no-op once the row exists, so whatever the number
+of threads and processes, each hour's clean-up is claimed and run once.
+"""
+
+import importlib
+import json
+import logging
+import random
+import threading
+import uuid
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, col, delete, update
+
+from app.core import idempotency
+from app.core.config import settings
+from app.database import engine
+from app.models.job import Job
+from app.services import archive, park_slots
+
+logger = logging.getLogger(__name__)
+
+# Modules whose import registers job handlers.
+TASK_MODULES = ("app.services.photos",)
+
+_handlers: dict[str, Callable[..., None]] = {}
+_wakeup = threading.Event()
+
+HOUSEKEEPING = "jobs.housekeeping"
+_SCHEDULE_SECONDS = 300  # how often each worker makes sure this hour's job exists
+
+# A running job past its deadline is reclaimed only while it has attempts
+# left; `fail_abandoned` fails the rest.
+_CLAIM_SQL = text(
+    """
+    UPDATE jobs
+    SET status = 'running', attempts = attempts + 1, claim_token = :token,
+        locked_until = :locked_until, updated_at = :now
+    WHERE id = (
+        SELECT id FROM jobs
+        WHERE (status = 'queued' AND run_at <= :now)
+           OR (status = 'running' AND locked_until < :now AND attempts < max_attempts)
+        ORDER BY run_at
+        LIMIT 1
+    )
+    RETURNING id, task, payload, attempts, max_attempts
+    """
+).bindparams(bindparam("now", type_=DateTime), bindparam("locked_until", type_=DateTime))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def job_handler(task: str) -> Callable[[Callable[..., None]], Callable[..., None]]:
+    """Register `fn(session, **payload)` as the handler for `task`."""
+
+    def register(fn: Callable[..., None]) -> Callable[..., None]:
+        _handlers[task] = fn
+        return fn
+
+    return register
+
+
+def load_handlers() -> None:
+    for module in TASK_MODULES:
+        importlib.import_module(module)
+
+
+# ---------------------------------------------------------------------------
+# Producer side
+# ---------------------------------------------------------------------------
+def enqueue(
+    session: Session,
+    task: str,
+    payload: dict[str, Any] | None = None,
+    *,
+    idempotency_key: str | None = None,
+    delay: float = 0.0,
+    max_attempts: int | None = None,
+) -> None:
+    """
+    Add a job in the caller's transaction (the caller commits).
+
+    A job whose `idempotency_key` already exists — queued, running or
+    finished — is silently not enqueued again.
+    """
+    now = _utcnow()
+    stmt = insert(Job).values(
+        task=task,
+        payload=json.dumps(payload or {}),
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        idempotency_key=idempotency_key,
+        run_at=now + timedelta(seconds=delay),
+        created_at=now,
+        updated_at=now,
+    )
+    session.exec(stmt.on_conflict_do_nothing(index_elements=["idempotency_key"]))
+    _wakeup.set()
+
+
+# ---------------------------------------------------------------------------
+# Worker side
+# ---------------------------------------------------------------------------
+def _retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: base * 2^(n-1), capped, ±50%."""
+    delay = min(settings.JOB_RETRY_MAX_DELAY, settings.JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+    return random.uniform(delay / 2, delay)
+
+
+def run_one() -> bool:
+    """Claim and run one due job.  Returns False if the queue had none."""
+    now = _utcnow()
+    token = uuid.uuid4().hex
+    with Session(engine) as session:
+        job = session.exec(_CLAIM_SQL, params={
+            "now": now,
+            "token": token,
+            "locked_until": now + timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT),
+        }).first()
+        session.commit()
+    if job is None:
+        return False
+
+    error = None
+    try:
+        handler = _handlers.get(job.task)
+        if handler is None:
+            raise LookupError(f"No handler registered for task {job.task!r}")
+        with Session(engine) as session:
+            handler(session, **json.loads(job.payload))
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed on attempt %s", job.id, job.task, job.attempts)
+        error = f"{type(exc).__name__}: {exc}"
+
+    now = _utcnow()
+    if error is None:
+        values = {"status": "done", "last_error": None}
+    elif job.attempts >= job.max_attempts:
+        values = {"status": "failed", "last_error": error}
+    else:
+        values = {
+            "status": "queued",
+            "last_error": error,
+            "run_at": now + timedelta(seconds=_retry_delay(job.attempts)),
+        }
+    with Session(engine) as session:
+        recorded = session.exec(
+            update(Job)
+            .where(col(Job.id) == job.id, col(Job.claim_token) == token)
+            .values(updated_at=now, locked_until=None, claim_token=None, **values)
+        ).rowcount
+        session.commit()
+    if not recorded:
+        logger.warning("Job %s (%s) was reclaimed while it ran; outcome dropped",
+                       job.id, job.task)
+    return True
+
+
+def purge_finished() -> int:
+    """Delete done/failed jobs older than JOB_RETENTION_DAYS."""
+    cutoff = _utcnow() - timedelta(days=settings.JOB_RETENTION_DAYS)
+    with Session(engine) as session:
+        result = session.exec(
+            delete(Job).where(col(Job.status).in_(["done", "failed"]), Job.updated_at < cutoff)
+        )
+        session.commit()
+        return result.rowcount
+
+
+def fail_abandoned() -> int:
+    """Fail running jobs past their deadline with no attempts left; returns how many."""
+    now = _utcnow()
+    with Session(engine) as session:
+        result = session.exec(
+            update(Job)
+            .where(col(Job.status) == "running", col(Job.locked_until) < now,
+                   col(Job.attempts) >= col(Job.max_attempts))
+            .values(status="failed", locked_until=None, claim_token=None, updated_at=now,
+                    last_error="Abandoned: its worker missed the deadline on the last attempt")
+        )
+        session.commit()
+        return result.rowcount
+
+
+@job_handler(HOUSEKEEPING)
+def housekeeping(session: Session) -> None:
+    """The hourly clean-up; one job per hour, so one worker runs it."""
+    fail_abandoned()
+    purge_finished()
+    idempotency.purge_expired()
+    archive.archive_visits()
+    park_slots.prune(session)
+    session.commit()
+
+
+def schedule_housekeeping() -> None:
+    """Enqueue this hour's housekeeping job unless some worker already has."""
+    hour = _utcnow().replace(minute=0, second=0, microsecond=0)
+    with Session(engine) as session:
+        enqueue(session, HOUSEKEEPING, idempotency_key=f"housekeeping:{hour:%Y-%m-%dT%H}")
+        session.commit()
+
+
+def _work(stop: threading.Event) -> None:
+    next_schedule = 0.0
+    while not stop.is_set():
+        try:
+            if _utcnow().timestamp() >= next_schedule:
+                schedule_housekeeping()
+                next_schedule = _utcnow().timestamp() + _SCHEDULE_SECONDS
+            if run_one():
+                continue
+        except Exception:
+            # e.g. "database is locked" — back off and keep the worker alive.
+            logger.exception("Job worker error")
+        _wakeup.wait(settings.JOB_POLL_INTERVAL)
+        _wakeup.clear()
+
+
+class WorkerPool:
+    """A set of worker threads sharing one stop signal."""
+
+    def __init__(self, workers: int) -> None:
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=_work, args=(self._stop,), name=f"job-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+    def start(self) -> None:
+        load_handlers()
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Signal workers to exit after their current job and wait for them."""
+        self._stop.set()
+        _wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
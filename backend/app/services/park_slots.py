@@ -0,0 +1,304 @@
+"""
+Incremental maintenance of `park_slot_stats` and slot scoring for dogs.
+
+Visit writes call `apply_visit(...)` with sign=+1 (visit added / dogs
+attached) or sign=-1 (visit removed / dogs detached), and `move_visit`
+when an edit changes its times or dogs.  Changes are summed per hourly
+slot in memory and written with a single executemany upsert, so a write
+costs one statement however many slots or visits it touches.  Reads then
+only scan the slots in the requested horizon.
+
+LIVE SLOTS ONLY:
+----------------
+Only slots from the current hour on are maintained: that's all
+`recommend` reads.  Every function here skips earlier slots, so editing or
+deleting a visit that has (partly) happened never subtracts from a slot
+that `rebuild` would no longer have counted, and counts can't go
+negative.  Past rows are dead weight; `prune` (run by the hourly
+housekeeping job) deletes them.
+
+Callers run these in the same transaction as the visit change itself,
+after validating it, and commit once.
+"""
+
+import heapq
+from collections.abc import Iterable, Mapping
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, col, delete, select
+
+from app.models.dog import Dog
+from app.models.park import DogPark
+from app.models.park_slot import ParkSlotStats
+from app.models.visit import Visit, VisitDogLink
+
+SLOT = timedelta(hours=1)
+
+_SIZE_RANK = {"small": 0, "medium": 1, "large": 2}
+_SIZE_COLUMN = {"small": "small_count", "medium": "medium_count", "large": "large_count"}
+
+# Scoring weights — a slot starts at 100 and loses points for each risk.
+_PENALTY_SIZE_GAP_ONE = 4     # e.g. small dog next to a medium dog
+_PENALTY_SIZE_GAP_TWO = 12    # small dog next to a large dog
+_PENALTY_UNSOCIAL = 20        # per dog flagged as not good with others
+_PENALTY_CROWD = 5            # per dog over _COMFORTABLE_HEADCOUNT
+_PENALTY_ANY_DOG = 15         # per dog, when *our* dog is not good with others
+_COMFORTABLE_HEADCOUNT = 6
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Normalise a datetime to naive UTC (naive values are assumed UTC)."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def slot_floor(value: datetime) -> datetime:
+    return to_utc_naive(value).replace(minute=0, second=0, microsecond=0)
+
+
+def live_from() -> datetime:
+    """The first slot still maintained: the current hour's."""
+    return slot_floor(datetime.now(timezone.utc))
+
+
+def _slots(start: datetime, end: datetime) -> list[datetime]:
+    """Live hourly slots overlapped by the half-open interval [start, end)."""
+    slot, end = max(slot_floor(start), live_from()), to_utc_naive(end)
+    slots = []
+    while slot < end:
+        slots.append(slot)
+        slot += SLOT
+    return slots
+
+
+_COUNTERS = ("dog_count", "small_count", "medium_count", "large_count", "unsocial_count")
+
+# (park_id, slot_start) -> counter deltas, summed before anything is written.
+Deltas = dict[tuple[int, datetime], dict[str, int]]
+
+
+def _accumulate(
+    deltas: Deltas,
+    park_id: int,
+    start: datetime,
+    end: datetime,
+    size: str,
+    good_with_others: bool,
+    sign: int,
+) -> None:
+    """Add one dog's presence (sign=+1) or absence (sign=-1) to `deltas`."""
+    size_column = _SIZE_COLUMN.get(size, "medium_count")
+    for slot in _slots(start, end):
+        counters = deltas.get((park_id, slot))
+        if counters is None:
+            counters = deltas[(park_id, slot)] = dict.fromkeys(_COUNTERS, 0)
+        counters["dog_count"] += sign
+        counters[size_column] += sign
+        if not good_with_others:
+            counters["unsocial_count"] += sign
+
+
+def _write(session: Session, deltas: Deltas) -> None:
+    """Apply all deltas with one executemany upsert."""
+    rows = [
+        {"park_id": park_id, "slot_start": slot, **counters}
+        for (park_id, slot), counters in deltas.items()
+        if any(counters.values())
+    ]
+    if not rows:
+        return
+    table = ParkSlotStats.__table__
+    stmt = insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.park_id, table.c.slot_start],
+        set_={name: table.c[name] + stmt.excluded[name] for name in _COUNTERS},
+    )
+    session.exec(stmt, params=rows)
+
+
+def apply_visit(
+    session: Session,
+    park_id: int,
+    start: datetime,
+    end: datetime,
+    dogs: Iterable[Dog],
+    sign: int,
+) -> None:
+    """Add (sign=+1) or remove (sign=-1) dogs from every slot of a visit."""
+    deltas: Deltas = {}
+    for dog in dogs:
+        _accumulate(deltas, park_id, start, end, dog.size, dog.good_with_others, sign)
+    _write(session, deltas)
+
+
+def move_visit(
+    session: Session,
+    before: tuple[int, datetime, datetime, Iterable[Dog]],
+    after: tuple[int, datetime, datetime, Iterable[Dog]],
+) -> None:
+    """An edited visit: `(park_id, start, end, dogs)` before and after, in one upsert."""
+    deltas: Deltas = {}
+    for (park_id, start, end, dogs), sign in ((before, -1), (after, +1)):
+        for dog in dogs:
+            _accumulate(deltas, park_id, start, end, dog.size, dog.good_with_others, sign)
+    _write(session, deltas)
+
+
+def apply_dog_change(session: Session, old: Dog, new: Dog) -> None:
+    """Move a dog's upcoming slot contributions from its old to new attributes."""
+    if old.size == new.size and old.good_with_others == new.good_with_others:
+        return
+    deltas: Deltas = {}
+    for visit in _upcoming_visits_for_dog(session, new.id):
+        _accumulate(deltas, visit.park_id, visit.start_time, visit.end_time,
+                    old.size, old.good_with_others, -1)
+        _accumulate(deltas, visit.park_id, visit.start_time, visit.end_time,
+                    new.size, new.good_with_others, +1)
+    _write(session, deltas)
+
+
+def remove_dog(session: Session, dog: Dog) -> None:
+    """Drop a dog from the slots of all its upcoming visits."""
+    deltas: Deltas = {}
+    for visit in _upcoming_visits_for_dog(session, dog.id):
+        _accumulate(deltas, visit.park_id, visit.start_time, visit.end_time,
+                    dog.size, dog.good_with_others, -1)
+    _write(session, deltas)
+
+
+def _upcoming_visits_for_dog(session: Session, dog_id: int) -> list[Visit]:
+    """The dog's visits that overlap a live slot."""
+    stmt = (
+        select(Visit)
+        .join(VisitDogLink, VisitDogLink.visit_id == Visit.id)
+        .where(VisitDogLink.dog_id == dog_id, Visit.end_time > live_from())
+    )
+    return list(session.exec(stmt).all())
+
+
+def rebuild(session: Session) -> int:
+    """
+    Recompute all aggregates for upcoming visits; returns visits processed.
+    Callers commit.
+
+    Counters are summed in memory and written with one bulk INSERT, so a
+    rebuild over hundreds of thousands of visits stays a few seconds.
+    """
+    session.exec(delete(ParkSlotStats))
+    rows = session.exec(
+        select(Visit.id, Visit.park_id, Visit.start_time, Visit.end_time,
+               Dog.size, Dog.good_with_others)
+        .join(VisitDogLink, VisitDogLink.visit_id == Visit.id)
+        .join(Dog, Dog.id == VisitDogLink.dog_id)
+        .where(Visit.end_time > live_from())
+    )
+    totals: Deltas = {}
+    visit_ids = set()
+    for visit_id, park_id, start, end, size, good_with_others in rows:
+        visit_ids.add(visit_id)
+        _accumulate(totals, park_id, start, end, size, good_with_others, +1)
+    if totals:
+        session.exec(
+            insert(ParkSlotStats.__table__),
+            params=[
+                {"park_id": park_id, "slot_start": slot, **counters}
+                for (park_id, slot), counters in totals.items()
+            ],
+        )
+    return len(visit_ids)
+
+
+def prune(session: Session) -> int:
+    """Delete the rows of slots that have passed; returns how many.  Callers commit."""
+    return session.exec(
+        delete(ParkSlotStats).where(ParkSlotStats.slot_start < live_from())
+    ).rowcount
+
+
+def ensure_built(session: Session) -> None:
+    """Backfill the aggregates once for databases created before they existed."""
+    has_stats = session.exec(select(ParkSlotStats.park_id).limit(1)).first()
+    if has_stats is None:
+        rebuild(session)
+        session.commit()
+
+
+def score_slot(dog: Dog, counts: Mapping[str, int]) -> int:
+    """Score 0–100 (higher is better) for `dog` joining a slot with `counts` (`_COUNTERS`)."""
+    rank = _SIZE_RANK.get(dog.size, 1)
+    by_rank = {0: counts["small_count"], 1: counts["medium_count"], 2: counts["large_count"]}
+    gap_one = sum(n for r, n in by_rank.items() if abs(r - rank) == 1)
+    gap_two = sum(n for r, n in by_rank.items() if abs(r - rank) == 2)
+
+    penalty = (
+        _PENALTY_SIZE_GAP_ONE * gap_one
+        + _PENALTY_SIZE_GAP_TWO * gap_two
+        + _PENALTY_UNSOCIAL * counts["unsocial_count"]
+        + _PENALTY_CROWD * max(0, counts["dog_count"] - _COMFORTABLE_HEADCOUNT)
+    )
+    if not dog.good_with_others:
+        penalty += _PENALTY_ANY_DOG * counts["dog_count"]
+    return max(0, 100 - penalty)
+
+
+def recommend(
+    session: Session,
+    dog: Dog,
+    days: int,
+    park_id: int | None = None,
+    limit: int = 10,
+) -> list[dict]:
+    """
+    Best upcoming slots for `dog` within `days`, best score first.
+
+    Every hour of every park in the horizon is a candidate: an hour with no
+    row has no dogs planned, which is just what a small or unsocial dog
+    wants.  The dog's own planned visits are taken back out of the counts,
+    so it's never scored against itself.  Ties go to the earliest hour.
+    """
+    start = live_from()
+    end = start + timedelta(days=days)
+    parks = select(DogPark.id, DogPark.name).order_by(col(DogPark.id))
+    stmt = select(ParkSlotStats).where(
+        ParkSlotStats.slot_start >= start,
+        ParkSlotStats.slot_start < end,
+        ParkSlotStats.dog_count > 0,
+    )
+    if park_id is not None:
+        parks = parks.where(DogPark.id == park_id)
+        stmt = stmt.where(ParkSlotStats.park_id == park_id)
+
+    counts: Deltas = {
+        (stats.park_id, to_utc_naive(stats.slot_start)): {
+            name: getattr(stats, name) for name in _COUNTERS
+        }
+        for stats in session.exec(stmt)
+    }
+    for visit in _upcoming_visits_for_dog(session, dog.id):
+        _accumulate(counts, visit.park_id, visit.start_time, visit.end_time,
+                    dog.size, dog.good_with_others, -1)
+
+    empty = dict.fromkeys(_COUNTERS, 0)
+
+    def candidates():
+        for park, park_name in session.exec(parks).all():
+            slot = start
+            while slot < end:
+                slot_counts = counts.get((park, slot), empty)
+                yield score_slot(dog, slot_counts), slot, park, park_name, slot_counts
+                slot += SLOT
+
+    best = heapq.nsmallest(limit, candidates(), key=lambda c: (-c[0], c[1], c[2]))
+    return [
+        {
+            "park_id": park,
+            "park_name": park_name,
+            "slot_start": slot.replace(tzinfo=timezone.utc),
+            "slot_end": (slot + SLOT).replace(tzinfo=timezone.utc),
+            "score": score,
+            **slot_counts,
+        }
+        for score, slot, park, park_name, slot_counts in best
+    ]
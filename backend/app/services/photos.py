@@ -0,0 +1,213 @@
+"""
+Dog photo storage: streaming uploads, content-addressed files, thumbnails.
+
+LAYOUT (under settings.MEDIA_ROOT):
+-----------------------------------
+    photos/<sha256>.<ext>   original upload, named by its content hash
+    thumbs/<sha256>.jpg     resized JPEG, generated in the background
+    tmp/                    in-progress uploads (same filesystem, so the
+                            final move is an atomic rename)
+
+Because names are content hashes, identical uploads share one file and
+every URL is immutable — browsers may cache them forever.
+
+Uploads are parsed straight off the request stream with python-multipart's
+push parser: each network chunk is hashed and appended to a temp file, so
+memory use stays at one chunk regardless of the photo size.
+
+Thumbnails are produced by the background job queue (services/jobs.py),
+keyed by content hash so each distinct photo is resized once.  Pillow is
+only imported by the job; if it's missing, photos are still stored and
+served at full size.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+import anyio
+from fastapi import HTTPException, Request, status
+from python_multipart.multipart import MultipartParser, parse_options_header
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.services.jobs import enqueue, job_handler
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes → (file extension, media type)
+_SIGNATURES: list[tuple[bytes, int, str, str]] = [
+    (b"\xff\xd8\xff", 0, "jpg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", 0, "png", "image/png"),
+    (b"GIF87a", 0, "gif", "image/gif"),
+    (b"GIF89a", 0, "gif", "image/gif"),
+    (b"WEBP", 8, "webp", "image/webp"),  # RIFF....WEBP
+]
+MEDIA_TYPES = {ext: media_type for _, _, ext, media_type in _SIGNATURES}
+
+
+def media_root() -> Path:
+    return Path(settings.MEDIA_ROOT)
+
+
+def photo_path(name: str) -> Path:
+    return media_root() / "photos" / name
+
+
+def thumbnail_path(digest: str) -> Path:
+    return media_root() / "thumbs" / f"{digest}.jpg"
+
+
+def _sniff(head: bytes) -> str | None:
+    for magic, offset, ext, _ in _SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            return ext
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Upload
+# ---------------------------------------------------------------------------
+class _UploadSink:
+    """Receives the `file` part from the multipart parser callbacks."""
+
+    def __init__(self) -> None:
+        self.in_file_part = False
+        self.seen_file = False
+        self.header_field = b""
+        self.header_value = b""
+        self.part_headers: dict[bytes, bytes] = {}
+        self.pending: list[bytes] = []  # data parsed from the current chunk
+
+    def on_part_begin(self) -> None:
+        self.part_headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self.header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self.part_headers[self.header_field.lower()] = self.header_value
+        self.header_field = self.header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self.part_headers.get(b"content-disposition", b""))
+        self.in_file_part = options.get(b"name") == b"file" and not self.seen_file
+        self.seen_file = self.seen_file or self.in_file_part
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self.in_file_part:
+            self.pending.append(data[start:end])
+
+    def on_part_end(self) -> None:
+        self.in_file_part = False
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Photo exceeds {settings.PHOTO_MAX_BYTES} bytes",
+    )
+
+
+async def store_upload(request: Request) -> str:
+    """
+    Stream the multipart `file` field of `request` into content-addressed
+    storage and return the stored file name (`<sha256>.<ext>`).
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data with a 'file' field")
+
+    tmp_dir = media_root() / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    sink = _UploadSink()
+    parser = MultipartParser(boundary, callbacks={
+        name: getattr(sink, name)
+        for name in ("on_part_begin", "on_header_field", "on_header_value", "on_header_end",
+                     "on_headers_finished", "on_part_data", "on_part_end")
+    })
+    digest = hashlib.sha256()
+    size = received = 0
+    head = b""
+    # Room for the multipart framing and any small form fields.
+    max_body = settings.PHOTO_MAX_BYTES + 64 * 1024
+
+    fd, tmp_name = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > max_body:
+                    raise _too_large()
+                parser.write(chunk)
+                if not sink.pending:
+                    continue
+                data = b"".join(sink.pending)
+                sink.pending.clear()
+                size += len(data)
+                if size > settings.PHOTO_MAX_BYTES:
+                    raise _too_large()
+                if len(head) < 16:
+                    head += data[:16]
+                digest.update(data)
+                await anyio.to_thread.run_sync(out.write, data)
+            parser.finalize()
+
+        if not sink.seen_file or size == 0:
+            raise HTTPException(status_code=400, detail="Missing 'file' field")
+        ext = _sniff(head)
+        if ext is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Photo must be a JPEG, PNG, GIF or WebP image",
+            )
+
+        name = f"{digest.hexdigest()}.{ext}"
+        final = photo_path(name)
+        if final.exists():
+            os.unlink(tmp_name)  # duplicate content — share the stored file
+        else:
+            final.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_name, final)
+        return name
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+# ---------------------------------------------------------------------------
+# Thumbnails
+# ---------------------------------------------------------------------------
+def submit_thumbnail(session: Session, name: str) -> None:
+    """Enqueue thumbnail generation in the caller's transaction."""
+    if not thumbnail_path(name.split(".")[0]).exists():
+        enqueue(session, "photos.thumbnail", {"name": name}, idempotency_key=f"thumbnail:{name}")
+
+
+@job_handler("photos.thumbnail")
+def generate_thumbnail(session: Session, name: str) -> None:
+    """Write `thumbs/<hash>.jpg` for `photos/<name>`."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.warning("Pillow is not installed; serving %s without a thumbnail", name)
+        return
+
+    target = thumbnail_path(name.split(".")[0])
+    if target.exists():
+        return
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with Image.open(photo_path(name)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((settings.THUMBNAIL_SIZE, settings.THUMBNAIL_SIZE))
+        fd, tmp_name = tempfile.mkstemp(dir=media_root() / "tmp")
+        with os.fdopen(fd, "wb") as out:
+            image.convert("RGB").save(out, "JPEG", quality=85, optimize=True)
+    os.replace(tmp_name, target)
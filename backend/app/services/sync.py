@@ -0,0 +1,179 @@
+"""
+Delta sync: the parks, dogs and visits changed since a client's last sync.
+
+A client keeps its own copy of the lists and, instead of re-fetching
+them, asks `GET /sync/?since=<token>` for what changed.  The token is the
+change sequence number (models/sync.py) the client has caught up to:
+
+- rows with `since < change_seq <= last_seq` were created or updated;
+- tombstones in that range are deletions.
+
+Every statement here is an index range scan on the sequence, so a sync
+that finds nothing new costs a few index probes however big the tables
+are.  A response holds at most `limit` changes; `has_more` says to call
+again straight away with the returned token.
+
+WHY READ `last_seq` FIRST:
+--------------------------
+Each table is read by its own statement, so a write can commit between
+them.  Capping every read at the `last_seq` committed when the sync began
+keeps all tables at one point in time; anything later comes next sync.
+
+Tombstones older than SYNC_TOMBSTONE_DAYS are pruned (`python
+maintenance.py prune-tombstones`).  A token from before the last prune
+may have missed deletions, so it gets 410 Gone and the client starts over
+with a full sync (no token).
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, insert, literal
+from sqlalchemy import select as core_select
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.models.dog import Dog
+from app.models.park import DogPark
+from app.models.sync import ENTITIES, SyncState, Tombstone, reserve
+from app.services import archive
+
+
+# ---------------------------------------------------------------------------
+# Set-based deletes
+# ---------------------------------------------------------------------------
+def tombstone_where(session: Session, model, ids) -> None:
+    """
+    Write tombstones for the rows of `model` whose ids `ids` (a SELECT) returns.
+
+    For deletes that bypass the ORM hook; call it before the DELETE.  The
+    rows are numbered after the current `last_seq` inside the INSERT, then
+    that many numbers are reserved.
+    """
+    ids = ids.subquery()
+    last = core_select(func.coalesce(func.max(SyncState.last_seq), 0)).scalar_subquery()
+    numbered = core_select(
+        last + func.row_number().over(),  # any order will do; no sort
+        literal(ENTITIES[model]),
+        ids.c[0],
+        literal(datetime.now(timezone.utc)),
+    )
+    result = session.exec(insert(Tombstone).from_select(
+        ["seq", "entity", "entity_id", "deleted_at"], numbered
+    ))
+    if result.rowcount:
+        session.exec(reserve(result.rowcount))
+
+
+def prune_tombstones(session: Session) -> int:
+    """Delete tombstones older than SYNC_TOMBSTONE_DAYS; returns how many."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.SYNC_TOMBSTONE_DAYS)
+    newest = session.exec(
+        select(func.max(Tombstone.seq)).where(Tombstone.deleted_at < cutoff)
+    ).one()
+    if newest is None:
+        return 0
+    deleted = session.exec(delete(Tombstone).where(Tombstone.seq <= newest)).rowcount
+    state = session.get(SyncState, 1)
+    state.pruned_seq = max(state.pruned_seq, newest)
+    session.add(state)
+    return deleted
+
+
+# ---------------------------------------------------------------------------
+# Reading changes
+# ---------------------------------------------------------------------------
+def _parse(token: str | None) -> int:
+    if not token:
+        return 0  # a full sync
+    try:
+        since = int(token)
+    except ValueError:
+        since = -1
+    if since < 0:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return since
+
+
+def changes_since(session: Session, token: str | None, limit: int) -> dict:
+    """Up to `limit` changes after `token` (everything, if there's none), as a SyncChanges."""
+    since = _parse(token)
+    state = session.get(SyncState, 1) or SyncState()
+    if since > state.last_seq:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    if 0 < since < state.pruned_seq:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token expired; sync again without a token",
+        )
+    upper = state.last_seq
+
+    def window(column):
+        return (col(column) > since) & (col(column) <= upper)
+
+    # Each source is read in sequence order, at most `limit` rows apiece.
+    # Archived visits (services/archive.py) keep their numbers, so only a
+    # full or very old sync finds any there.
+    def dog_ids(model, links):
+        return (
+            core_select(func.json_group_array(links.dog_id))
+            .where(links.visit_id == model.id)
+            .scalar_subquery()
+        )
+
+    sources = [
+        ("parks", session.exec(
+            select(DogPark).where(window(DogPark.change_seq))
+            .order_by(DogPark.change_seq).limit(limit)
+        ).all()),
+        ("dogs", session.exec(
+            select(Dog).where(window(Dog.change_seq)).order_by(Dog.change_seq).limit(limit)
+        ).all()),
+        *(("visits", session.exec(
+            select(model, dog_ids(model, links)).where(window(model.change_seq))
+            .order_by(model.change_seq).limit(limit)
+        ).all()) for model, links in archive.PARTITIONS),
+    ]
+    if since:  # a full sync has nothing to delete
+        sources.append(("deleted", session.exec(
+            select(Tombstone).where(window(Tombstone.seq))
+            .order_by(Tombstone.seq).limit(limit)
+        ).all()))
+
+    def seq(kind: str, row) -> int:
+        if kind == "visits":
+            return row[0].change_seq
+        return row.seq if kind == "deleted" else row.change_seq
+
+    merged = sorted(((seq(kind, row), kind, row) for kind, rows in sources for row in rows),
+                    key=lambda item: item[0])
+    taken = merged[:limit]
+    has_more = len(merged) > limit or any(len(rows) == limit for _, rows in sources)
+
+    changes = {
+        "token": str(taken[-1][0] if has_more else upper),
+        "has_more": has_more,
+        "parks": [], "dogs": [], "visits": [],
+        "deleted": {"parks": [], "dogs": [], "visits": []},
+    }
+    for _, kind, row in taken:
+        if kind == "visits":
+            visit, links = row
+            changes["visits"].append(
+                {**visit.model_dump(), "dog_ids": sorted(json.loads(links) if links else [])}
+            )
+        elif kind == "deleted":
+            changes["deleted"][f"{row.entity}s"].append(row.entity_id)
+        else:
+            changes[kind].append(row)
+
+    # A deleted id that's live again (SQLite reuses the highest rowid after
+    # a delete) comes back in the same response as both an upsert and a
+    # tombstone.  The row is always the newer of the two, so drop the
+    # tombstone: a client applying upserts before deletes would lose it.
+    for kind, deleted in changes["deleted"].items():
+        if deleted:
+            live = {row["id"] if kind == "visits" else row.id for row in changes[kind]}
+            deleted[:] = [entity_id for entity_id in deleted if entity_id not in live]
+    return changes
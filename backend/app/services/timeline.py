@@ -0,0 +1,85 @@
+"""
+Fan-out-on-write maintenance of `timeline_entries`.
+
+Every function issues set-based statements (INSERT ... SELECT, UPDATE,
+DELETE) so the cost of a write is one statement regardless of how many
+followers the author has.  Callers commit.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, literal, update
+from sqlalchemy import select as core_select
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.models.follow import Follow
+from app.models.timeline import TimelineEntry
+from app.models.visit import Visit
+
+_COLUMNS = ["owner_id", "start_time", "visit_id", "end_time", "author_id", "park_id"]
+
+
+def fan_out_visit(session: Session, visit: Visit) -> None:
+    """Add a new visit to the timeline of everyone following its author."""
+    followers = core_select(
+        Follow.follower_id,
+        literal(visit.start_time),
+        literal(visit.id),
+        literal(visit.end_time),
+        literal(visit.user_id),
+        literal(visit.park_id),
+    ).where(Follow.followee_id == visit.user_id)
+    session.exec(insert(TimelineEntry).from_select(_COLUMNS, followers))
+
+
+def update_visit(session: Session, visit: Visit) -> None:
+    """Propagate a visit's new times to every timeline holding it."""
+    session.exec(
+        update(TimelineEntry)
+        .where(TimelineEntry.visit_id == visit.id)
+        .values(start_time=visit.start_time, end_time=visit.end_time)
+    )
+
+
+def remove_visit(session: Session, visit_id: int) -> None:
+    session.exec(delete(TimelineEntry).where(TimelineEntry.visit_id == visit_id))
+
+
+def backfill(session: Session, follower_id: int, followee_id: int) -> None:
+    """On follow: copy the followee's upcoming visits into the follower's feed."""
+    now = datetime.now(timezone.utc)
+    visits = core_select(
+        literal(follower_id),
+        Visit.start_time,
+        Visit.id,
+        Visit.end_time,
+        Visit.user_id,
+        Visit.park_id,
+    ).where(Visit.user_id == followee_id, Visit.end_time >= now)
+    session.exec(insert(TimelineEntry).from_select(_COLUMNS, visits))
+
+
+def unfollow(session: Session, follower_id: int, followee_id: int) -> None:
+    session.exec(
+        delete(TimelineEntry).where(
+            TimelineEntry.owner_id == follower_id, TimelineEntry.author_id == followee_id
+        )
+    )
+
+
+def read_feed(session: Session, owner_id: int, limit: int) -> list[TimelineEntry]:
+    """Upcoming and in-progress visits in `owner_id`'s feed, soonest first."""
+    now = datetime.now(timezone.utc)
+    lookback = now - timedelta(hours=settings.FEED_LOOKBACK_HOURS)
+    stmt = (
+        select(TimelineEntry)
+        .where(
+            TimelineEntry.owner_id == owner_id,
+            TimelineEntry.start_time >= lookback,
+            TimelineEntry.end_time >= now,
+        )
+        .order_by(col(TimelineEntry.start_time))
+        .limit(limit)
+    )
+    return list(session.exec(stmt).all())
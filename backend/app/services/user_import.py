@@ -0,0 +1,169 @@
+"""
+Bulk user onboarding from CSV.
+
+The CSV needs a header row with at least `email,username,password`;
+`full_name`, `is_admin` and `is_active` are optional columns.
+
+Rows are processed in batches of USER_IMPORT_BATCH_SIZE:
+
+1. Validate each row with `AdminUserCreate` and reject duplicates within
+   the file itself.
+2. One query per batch finds every email/username that already exists
+   (the values are passed as a single JSON array and expanded with
+   SQLite's `json_each`, so the statement size doesn't grow with the batch).
+3. Hash the surviving passwords on the process pool (`hash_passwords`).
+4. Insert the batch with one executemany in one transaction.
+
+Problems are reported per row; they never abort the rest of the import.
+"""
+
+import csv
+import io
+import json
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from typing import IO
+
+from pydantic import ValidationError
+from sqlalchemy import insert, text
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.core.security import hash_passwords
+from app.models.user import User
+from app.schemas.user import AdminUserCreate
+
+REQUIRED_COLUMNS = {"email", "username", "password"}
+
+_EXISTING_SQL = text(
+    "SELECT email, username FROM users "
+    "WHERE email IN (SELECT value FROM json_each(:emails)) "
+    "OR username IN (SELECT value FROM json_each(:usernames))"
+)
+
+
+class CSVFormatError(ValueError):
+    """The file can't be imported at all (e.g. missing header columns)."""
+
+
+def _batches(reader: csv.DictReader) -> Iterator[list[tuple[int, dict]]]:
+    batch: list[tuple[int, dict]] = []
+    for count, row in enumerate(reader, start=1):
+        if count > settings.USER_IMPORT_MAX_ROWS:
+            raise CSVFormatError(f"Import is limited to {settings.USER_IMPORT_MAX_ROWS} rows")
+        batch.append((reader.line_num, row))
+        if len(batch) >= settings.USER_IMPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _validate(row: dict) -> AdminUserCreate:
+    # Blank optional cells fall back to the schema defaults.
+    values = {
+        k.strip(): v.strip() for k, v in row.items() if k and isinstance(v, str) and v.strip()
+    }
+    return AdminUserCreate.model_validate(values)
+
+
+def _error_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in exc.errors()
+    )
+
+
+def import_users(session: Session, csv_file: IO[bytes]) -> tuple[int, list[dict]]:
+    """Import users from a binary CSV file; returns (created, row errors)."""
+    reader = csv.DictReader(io.TextIOWrapper(csv_file, encoding="utf-8-sig", newline=""))
+    columns = {name.strip() for name in reader.fieldnames or []}
+    missing = REQUIRED_COLUMNS - columns
+    if missing:
+        raise CSVFormatError(f"CSV is missing column(s): {', '.join(sorted(missing))}")
+
+    created = 0
+    errors: list[dict] = []
+    seen_emails: set[str] = set()
+    seen_usernames: set[str] = set()
+
+    for batch in _batches(reader):
+        # 1. Validate and de-duplicate within the file.
+        candidates: list[tuple[int, AdminUserCreate]] = []
+        for line, row in batch:
+            try:
+                user = _validate(row)
+            except ValidationError as exc:
+                errors.append({"row": line, "error": _error_message(exc)})
+                continue
+            if user.email in seen_emails or user.username in seen_usernames:
+                errors.append({"row": line, "error": "Duplicate email or username in file"})
+                continue
+            seen_emails.add(user.email)
+            seen_usernames.add(user.username)
+            candidates.append((line, user))
+        if not candidates:
+            continue
+
+        # 2. One set-based lookup against existing accounts.
+        existing = session.exec(_EXISTING_SQL, params={
+            "emails": json.dumps([u.email for _, u in candidates]),
+            "usernames": json.dumps([u.username for _, u in candidates]),
+        }).all()
+        taken_emails = {email for email, _ in existing}
+        taken_usernames = {username for _, username in existing}
+        fresh = []
+        for line, user in candidates:
+            if user.email in taken_emails or user.username in taken_usernames:
+                errors.append({"row": line, "error": "A user with this email or username already exists"})
+            else:
+                fresh.append((line, user))
+        if not fresh:
+            continue
+
+        # 3. Hash in parallel, 4. insert in one transaction.
+        hashes = hash_passwords([u.password for _, u in fresh])
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "email": user.email,
+                "username": user.username,
+                "hashed_password": hashed,
+                "full_name": user.full_name,
+                "is_active": user.is_active,
+                "is_admin": user.is_admin,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for (_, user), hashed in zip(fresh, hashes)
+        ]
+        try:
+            session.exec(insert(User), params=rows)
+            session.commit()
+            created += len(rows)
+        except IntegrityError:
+            # Someone created a clashing account since step 2 — retry the
+            # batch row by row so only the clashing rows fail.
+            session.rollback()
+            created += _insert_one_by_one(session, fresh, rows, errors)
+
+    errors.sort(key=lambda e: e["row"])
+    return created, errors
+
+
+def _insert_one_by_one(
+    session: Session,
+    fresh: list[tuple[int, AdminUserCreate]],
+    rows: list[dict],
+    errors: list[dict],
+) -> int:
+    created = 0
+    for (line, _), row in zip(fresh, rows):
+        try:
+            with session.begin_nested():
+                session.exec(insert(User), params=[row])
+            created += 1
+        except IntegrityError:
+            errors.append({"row": line, "error": "A user with this email or username already exists"})
+    session.commit()
+    return created
@@ -0,0 +1,156 @@
+"""
+Group commit: one writer thread runs many requests' writes per transaction.
+
+SQLite allows one writer at a time.  Under a burst of visit logging, every
+threadpool request opens its own write transaction, waits for the lock,
+and pays for its own journal sync on commit; waits longer than the busy
+timeout (5 s) fail with "database is locked".
+
+With WRITE_QUEUE_ENABLED, routes decorated with `@queued` don't write from
+the request thread.  The whole route function is handed to one writer
+thread, which:
+
+1. opens a transaction (`BEGIN IMMEDIATE`, so it holds the write lock);
+2. runs queued routes one after another, each in its own SAVEPOINT, for
+   up to WRITE_QUEUE_WINDOW_MS or WRITE_QUEUE_MAX_BATCH routes;
+3. commits once, then hands every route its result (or exception).
+
+A route's `session.commit()` only releases its savepoint, and an exception
+rolls back just that route's savepoint (what it had already committed
+stays), so each route behaves as it does unqueued; the response is sent
+only after the group's commit.  Only this
+process's writes are grouped; other processes (worker.py) still contend
+for the lock as before.
+
+    @router.post("/")
+    @queued
+    def create_thing(..., session: Session = Depends(get_session)): ...
+
+When the queue isn't running (disabled, or tests without the lifespan),
+`@queued` routes run inline exactly as before.
+"""
+
+import functools
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future
+from typing import Any
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+_writer: "WriteQueue | None" = None
+
+
+class WriteQueue:
+    """The writer thread and its queue of `(function, future)` pairs."""
+
+    def __init__(self, window_ms: float, max_batch: int) -> None:
+        self._window = window_ms / 1000
+        self._max_batch = max_batch
+        self._queue: queue.Queue[tuple[Callable[[Session], Any], Future] | None] = queue.Queue()
+        self._thread = threading.Thread(target=self._work, name="write-queue", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Finish the writes already queued, then exit."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def submit(self, fn: Callable[[Session], Any]) -> Future:
+        future: Future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    # -----------------------------------------------------------------------
+    def _work(self) -> None:
+        # One connection for the thread's lifetime: requests waiting on the
+        # queue hold pool connections, so checking one out per group could
+        # wait on them forever.
+        with engine.connect() as conn:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is None:
+                    break
+                group = [item]
+                deadline = time.monotonic() + self._window
+                while len(group) < self._max_batch:
+                    try:
+                        item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    group.append(item)
+                self._commit(conn, group)
+
+    def _commit(self, conn, group: list[tuple[Callable[[Session], Any], Future]]) -> None:
+        outcomes: list[tuple[bool, Any]] = []
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            for fn, _ in group:
+                outcomes.append(_run(conn, fn))
+            conn.commit()
+        except Exception as exc:  # the transaction itself failed: nothing was written
+            logger.exception("Group commit of %d write(s) failed", len(group))
+            conn.rollback()
+            outcomes = [(False, exc)] * len(group)
+        for (_, future), (ok, value) in zip(group, outcomes):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+def _run(conn, fn: Callable[[Session], Any]) -> tuple[bool, Any]:
+    """Run `fn` in a savepoint of `conn`; `(True, result)` or `(False, exception)`."""
+    # Commits inside `fn` release its savepoint; objects stay loaded for the response.
+    with Session(bind=conn, join_transaction_mode="create_savepoint",
+                 expire_on_commit=False) as session:
+        try:
+            return True, fn(session)
+        except Exception as exc:
+            return False, exc  # closing the session rolls back to the savepoint
+
+
+# ---------------------------------------------------------------------------
+# Lifecycle and the route decorator
+# ---------------------------------------------------------------------------
+def start() -> None:
+    global _writer
+    if settings.WRITE_QUEUE_ENABLED and _writer is None:
+        _writer = WriteQueue(settings.WRITE_QUEUE_WINDOW_MS, settings.WRITE_QUEUE_MAX_BATCH)
+        _writer.start()
+
+
+def stop() -> None:
+    global _writer
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+
+def queued(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Run a sync route on the writer thread, with the writer's session as `session`."""
+
+    @functools.wraps(endpoint)
+    def run(**kwargs: Any) -> Any:
+        writer = _writer
+        if writer is None:
+            return endpoint(**kwargs)
+        return writer.submit(
+            lambda session: endpoint(**{**kwargs, "session": session})
+        ).result()
+
+    return run
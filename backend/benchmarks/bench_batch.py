@@ -0,0 +1,99 @@
+"""
+Dashboard page-load latency: five separate requests vs. one POST /batch.
+
+Run from backend/:  python -m benchmarks.bench_batch [--iterations 200]
+
+Uses a throwaway SQLite file so your dev database is left alone.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+_tmpdir = tempfile.mkdtemp(prefix="dogpark-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["RATE_LIMITS_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+DASHBOARD_PATHS = [
+    "/users/me",
+    "/dogs/",
+    "/visits/dashboard-stats",
+    "/visits/upcoming-activity",
+    "/parks/",
+]
+
+
+def _seed(client: TestClient) -> dict[str, str]:
+    client.post("/api/v1/auth/register", json={
+        "email": "bench@example.com", "username": "bench", "password": "benchpass",
+    })
+    token = client.post(
+        "/api/v1/auth/login", data={"username": "bench", "password": "benchpass"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    dog_ids = [
+        client.post("/api/v1/dogs/", json={"name": f"Dog {i}"}, headers=headers).json()["id"]
+        for i in range(3)
+    ]
+    park_ids = [
+        client.post(
+            "/api/v1/parks/", json={"name": f"Park {i}", "address": f"{i} Bark St"}, headers=headers
+        ).json()["id"]
+        for i in range(5)
+    ]
+    now = datetime.now(timezone.utc)
+    for i in range(30):
+        client.post("/api/v1/visits/", json={
+            "park_id": park_ids[i % len(park_ids)],
+            "start_time": (now + timedelta(hours=i)).isoformat(),
+            "end_time": (now + timedelta(hours=i + 1)).isoformat(),
+            "dog_ids": dog_ids[: 1 + i % len(dog_ids)],
+        }, headers=headers)
+    return headers
+
+
+def _summarise(label: str, samples: list[float]) -> None:
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[int(len(samples_ms) * 0.95) - 1]
+    print(
+        f"{label:<22} mean {statistics.mean(samples_ms):7.2f} ms   "
+        f"p50 {statistics.median(samples_ms):7.2f} ms   p95 {p95:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        headers = _seed(client)
+        batch_body = {"requests": [{"method": "GET", "path": p} for p in DASHBOARD_PATHS]}
+
+        separate, batched = [], []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            for path in DASHBOARD_PATHS:
+                assert client.get(f"/api/v1{path}", headers=headers).status_code == 200
+            separate.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            resp = client.post("/api/v1/batch", json=batch_body, headers=headers)
+            assert all(item["status"] == 200 for item in resp.json())
+            batched.append(time.perf_counter() - start)
+
+    print(f"Dashboard page load, {args.iterations} iterations (in-process, no network):")
+    _summarise("5 separate requests", separate)
+    _summarise("1 batch request", batched)
+
+
+if __name__ == "__main__":
+    main()
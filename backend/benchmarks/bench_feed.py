@@ -0,0 +1,115 @@
+"""
+Friends feed with fan-out on write: an author with 1,000 followers.
+
+Run from backend/:  python -m benchmarks.bench_feed [--followers 1000] [--visits 200]
+
+Measures
+  * POST /visits by the popular author (one INSERT ... SELECT fan-out),
+  * GET /visits/feed for a follower (one range scan + two PK lookups),
+  * the equivalent join across follows and visits, for comparison.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+_tmpdir = tempfile.mkdtemp(prefix="dogpark-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["RATE_LIMITS_ENABLED"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app.core.security import create_access_token, hash_password  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.dog import Dog  # noqa: E402
+from app.models.follow import Follow  # noqa: E402
+from app.models.park import DogPark  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.models.visit import Visit  # noqa: E402
+
+
+def _ms(samples: list[float]) -> str:
+    samples_ms = sorted(s * 1000 for s in samples)
+    p95 = samples_ms[max(0, int(len(samples_ms) * 0.95) - 1)]
+    return f"mean {statistics.mean(samples_ms):7.2f} ms   p95 {p95:7.2f} ms"
+
+
+def _seed(followers: int) -> tuple[int, int, int, int]:
+    """Author (id 1), followers, one park, one dog — inserted in bulk."""
+    now = datetime.now(timezone.utc)
+    hashed = hash_password("benchpass")  # one bcrypt for everyone
+    with Session(engine) as session:
+        session.exec(insert(User), params=[
+            {"email": f"u{i}@example.com", "username": f"u{i}", "hashed_password": hashed,
+             "created_at": now, "updated_at": now}
+            for i in range(followers + 1)
+        ])
+        author_id, follower_id = 1, 2
+        session.exec(insert(Follow), params=[
+            {"follower_id": i, "followee_id": author_id, "created_at": now}
+            for i in range(2, followers + 2)
+        ])
+        park = DogPark(name="Bench Park", address="1 Bench St", created_by_id=author_id)
+        dog = Dog(name="Rex", owner_id=author_id)
+        session.add_all([park, dog])
+        session.commit()
+        return author_id, follower_id, park.id, dog.id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--followers", type=int, default=1000)
+    parser.add_argument("--visits", type=int, default=200)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        author_id, follower_id, park_id, dog_id = _seed(args.followers)
+        author = {"Authorization": f"Bearer {create_access_token(author_id)}"}
+        follower = {"Authorization": f"Bearer {create_access_token(follower_id)}"}
+
+        now = datetime.now(timezone.utc)
+        writes = []
+        for i in range(args.visits):
+            body = {
+                "park_id": park_id,
+                "start_time": (now + timedelta(hours=i + 1)).isoformat(),
+                "end_time": (now + timedelta(hours=i + 2)).isoformat(),
+                "dog_ids": [dog_id],
+            }
+            start = time.perf_counter()
+            assert client.post("/api/v1/visits/", json=body, headers=author).status_code == 201
+            writes.append(time.perf_counter() - start)
+
+        reads = []
+        for _ in range(200):
+            start = time.perf_counter()
+            assert len(client.get("/api/v1/visits/feed", headers=follower).json()) == 20
+            reads.append(time.perf_counter() - start)
+
+    joins = []
+    with Session(engine) as session:
+        for _ in range(200):
+            start = time.perf_counter()
+            session.exec(
+                select(Visit)
+                .join(Follow, Follow.followee_id == Visit.user_id)
+                .where(Follow.follower_id == follower_id, Visit.end_time >= now)
+                .order_by(Visit.start_time)
+                .limit(20)
+            ).all()
+            joins.append(time.perf_counter() - start)
+
+    print(f"Author with {args.followers} followers, {args.visits} visits:")
+    print(f"  POST /visits (fan-out write)   {_ms(writes)}")
+    print(f"  GET  /visits/feed              {_ms(reads)}")
+    print(f"  follows ⋈ visits query only    {_ms(joins)}")
+
+
+if __name__ == "__main__":
+    main()
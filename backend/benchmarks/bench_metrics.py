@@ -0,0 +1,88 @@
+"""
+Overhead of the /metrics instrumentation.
+
+Run from backend/:  python -m benchmarks.bench_metrics [--iterations 200000]
+
+Measures (1) one histogram observation, single-threaded and from several
+threads at once (recording is lock-free, so the per-call cost should not
+grow with the thread count), and (2) the MetricsMiddleware wrapped around a
+do-nothing ASGI app, driven directly so no HTTP client noise is included.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="dogpark-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/bench.db"
+os.environ["RATE_LIMITS_ENABLED"] = "false"
+
+from app.core.metrics import Histogram, MetricsMiddleware  # noqa: E402
+
+BENCH_SECONDS = Histogram("bench_seconds", "Benchmark-only histogram", ("route",))
+
+
+def _observe_loop(n: int) -> None:
+    for _ in range(n):
+        BENCH_SECONDS.observe(0.003, "/bench")
+
+
+def _bench_observe(iterations: int, threads: int) -> float:
+    """Nanoseconds per observation, wall clock over all threads."""
+    per_thread = iterations // threads
+    workers = [threading.Thread(target=_observe_loop, args=(per_thread,)) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1e9
+
+
+class _Route:
+    path = "/api/v1/bench/{item_id}"
+
+
+async def _noop_app(scope, receive, send) -> None:
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _drive(app, iterations: int) -> float:
+    """Nanoseconds per request through `app`."""
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await app({"type": "http", "method": "GET", "path": "/api/v1/bench/1"}, receive, send)
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"Histogram.observe, {args.iterations} observations:")
+    for threads in (1, 4, 8):
+        print(f"  {threads} thread(s)          {_bench_observe(args.iterations, threads):8.0f} ns/call")
+
+    bare = asyncio.run(_drive(_noop_app, args.iterations))
+    wrapped = asyncio.run(_drive(MetricsMiddleware(_noop_app), args.iterations))
+    print(f"Request through ASGI app, {args.iterations} requests:")
+    print(f"  without middleware   {bare:8.0f} ns/request")
+    print(f"  with middleware      {wrapped:8.0f} ns/request")
+    print(f"  overhead             {wrapped - bare:8.0f} ns/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Cold-start time: importing the app, running its startup, first request.
+
+Run from backend/:  python -m benchmarks.bench_startup [--runs 5]
+
+Every run is a fresh interpreter (a subprocess), so nothing is cached in
+sys.modules.  Each child reports:
+
+- import_ms      `import app.main`
+- startup_ms     the lifespan's startup half (schema check, job workers)
+- startup_sql    SQL statements issued during startup
+- first_ms       the first authenticated request (GET /users/me), which
+                 pays for any lazily imported modules (jose) and warm-up
+- second_ms      the same request again, for comparison
+
+against a small seeded database, once with SCHEMA_CHECK=version (the
+default: one PRAGMA) and once with SCHEMA_CHECK=full (create_all plus
+migrations, as every boot did before the stored schema version).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+FIELDS = ("import_ms", "startup_ms", "startup_sql", "first_ms", "second_ms")
+
+
+def _child() -> None:
+    """Measure one cold start and print the numbers as JSON."""
+    started = time.perf_counter()
+    from app.main import app
+
+    import_ms = (time.perf_counter() - started) * 1000
+
+    import asyncio
+
+    import httpx
+    from sqlalchemy import event
+
+    from app.database import engine
+
+    statements = 0
+
+    def count(*_args) -> None:
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    headers = {"Authorization": f"Bearer {os.environ['BENCH_TOKEN']}"}
+
+    async def run() -> dict:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            lifespan = app.router.lifespan_context(app)
+            started = time.perf_counter()
+            await lifespan.__aenter__()
+            startup_ms = (time.perf_counter() - started) * 1000
+            startup_sql = statements
+            try:
+                timings = []
+                for _ in range(2):
+                    started = time.perf_counter()
+                    resp = await client.get("/api/v1/users/me", headers=headers)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    resp.raise_for_status()
+            finally:
+                await lifespan.__aexit__(None, None, None)
+        return {
+            "import_ms": import_ms,
+            "startup_ms": startup_ms,
+            "startup_sql": startup_sql,
+            "first_ms": timings[0],
+            "second_ms": timings[1],
+        }
+
+    print(json.dumps(asyncio.run(run())))
+
+
+def _run_child(env: dict[str, str]) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child"],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts per mode (median shown)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child()
+        return
+
+    tmpdir = tempfile.mkdtemp(prefix="dogpark-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ["MEDIA_ROOT"] = f"{tmpdir}/media"
+
+    from app.core.security import create_access_token
+    from seed import generate
+
+    generate(users=20, parks=3, visits_per_week=50, weeks=2)
+    base_env = {**os.environ, "JOB_WORKERS": "0", "BENCH_TOKEN": create_access_token(2)}
+
+    print(f"{'mode':<10} " + " ".join(f"{f:>12}" for f in FIELDS))
+    for mode in ("version", "full"):
+        env = {**base_env, "SCHEMA_CHECK": mode}
+        runs = [_run_child(env) for _ in range(args.runs)]
+        medians = {f: statistics.median(r[f] for r in runs) for f in FIELDS}
+        print(f"{mode:<10} " + " ".join(f"{medians[f]:>12.1f}" for f in FIELDS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Concurrent visit logging, with and without the group-commit write queue.
+
+Run from backend/:  python -m benchmarks.bench_writes [--writers 200] [--duration 10]
+
+`--writers` virtual users each POST /visits/ in a loop for `--duration`
+seconds, all at once, against the same seeded throwaway database: once
+with WRITE_QUEUE_ENABLED=false (every request commits on its own) and
+once with it on (services/write_queue.py).  Each mode runs in a fresh
+interpreter on its own copy of the database.  Reported per mode:
+
+- writes/s       visits created per second
+- lock_errors    requests that failed with "database is locked"
+- other_errors   any other failure
+- p50/p95 ms     latency of the successful writes
+
+The app's threadpool is widened to `--writers` threads so every writer
+really is in flight at once, as behind a server with that many workers.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+FIELDS = ("writes/s", "lock_errors", "other_errors", "p50_ms", "p95_ms")
+
+
+def _child(writers: int, duration: float) -> None:
+    """Run the writers against this process's app and print the numbers as JSON."""
+    import anyio
+    import httpx
+
+    from app.core.security import create_access_token
+    from app.main import app
+    from benchmarks.loadtest import load_users
+
+    users, park_ids = load_users()
+    user_ids = sorted(users)
+    latencies: list[float] = []
+    errors = {"lock_errors": 0, "other_errors": 0}
+
+    async def writer(client: httpx.AsyncClient, user_id: int, deadline: float) -> None:
+        rng = random.Random(user_id)
+        headers = {"Authorization": f"Bearer {create_access_token(user_id)}"}
+        dog_ids = users[user_id][1]
+        while time.perf_counter() < deadline:
+            start = datetime.now(timezone.utc) + timedelta(hours=rng.randint(1, 24 * 14))
+            started = time.perf_counter()
+            try:
+                resp = await client.post("/api/v1/visits/", headers=headers, json={
+                    "park_id": rng.choice(park_ids),
+                    "start_time": start.isoformat(),
+                    "end_time": (start + timedelta(hours=1)).isoformat(),
+                    "dog_ids": dog_ids[:1],
+                })
+                ok = resp.status_code == 201
+            except Exception as exc:  # app exceptions surface here, not as a 500
+                ok = False
+                if "database is locked" in str(exc):
+                    errors["lock_errors"] += 1
+                    continue
+            if ok:
+                latencies.append((time.perf_counter() - started) * 1000)
+            else:
+                errors["other_errors"] += 1
+
+    async def run() -> float:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = writers
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                     timeout=120) as client:
+            async with app.router.lifespan_context(app):
+                started = time.perf_counter()
+                deadline = started + duration
+                await asyncio.gather(*(
+                    writer(client, user_ids[i % len(user_ids)], deadline) for i in range(writers)
+                ))
+                return time.perf_counter() - started
+
+    elapsed = asyncio.run(run())
+    latencies.sort()
+    print(json.dumps({
+        "writes/s": len(latencies) / elapsed,
+        **errors,
+        "p50_ms": statistics.median(latencies) if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writers", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per mode")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.writers, args.duration)
+        return
+
+    tmpdir = tempfile.mkdtemp(prefix="dogpark-bench-")
+    template = f"{tmpdir}/template.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{template}"
+    os.environ["MEDIA_ROOT"] = f"{tmpdir}/media"
+
+    from seed import generate
+
+    generate(users=args.writers, parks=20, visits_per_week=2_000, weeks=2)
+
+    print(f"{args.writers} writers, {args.duration:.0f} s per mode")
+    print(f"{'write queue':<12} " + " ".join(f"{f:>12}" for f in FIELDS))
+    for enabled in ("false", "true"):
+        database = f"{tmpdir}/queue-{enabled}.db"
+        shutil.copy(template, database)
+        env = {
+            **os.environ, "DATABASE_URL": f"sqlite:///{database}",
+            "JOB_WORKERS": "0", "WRITE_QUEUE_ENABLED": enabled, "RATE_LIMITS_ENABLED": "false",
+        }
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_writes", "--child",
+             "--writers", str(args.writers), "--duration", str(args.duration)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        label = "on" if enabled == "true" else "off"
+        print(f"{label:<12} " + " ".join(f"{result[f]:>12.1f}" for f in FIELDS))
+
+
+if __name__ == "__main__":
+    main()
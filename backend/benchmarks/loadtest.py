@@ -0,0 +1,302 @@
+"""
+Load test: weighted user scenarios against a large seeded dataset.
+
+Run from backend/:
+    python -m benchmarks.loadtest                          # in-process, throwaway DB
+    python -m benchmarks.loadtest --out results.json --baseline benchmarks/baseline.json
+
+Against a real server, seed a database file first and point uvicorn at it
+(the server must share this SECRET_KEY, since tokens are minted here):
+    python -m benchmarks.loadtest --database load.db --seed-only
+    DATABASE_URL=sqlite:///./load.db RATE_LIMITS_ENABLED=false uvicorn app.main:app &
+    python -m benchmarks.loadtest --database load.db --url http://127.0.0.1:8000
+
+SCENARIOS (picked per iteration by weight):
+-------------------------------------------
+- dashboard    the five GETs the dashboard page makes
+- log_visit    POST /visits/ for one of the user's dogs
+- browse_park  park list, one park, and its upcoming visits
+- login        a burst of password logins (bcrypt-bound)
+
+Every request is timed and grouped by endpoint template.  The JSON report
+holds throughput and p50/p95/p99 per endpoint; with --baseline, any
+endpoint whose p95 grew, or throughput dropped, by more than --tolerance
+fails the run (exit status 1).  Write a baseline with --save-baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import httpx
+
+PASSWORD = "password123"  # every seeded user's password (see seed.py)
+SEED_WEEKS = 4
+API = "/api/v1"
+DASHBOARD_PATHS = [
+    "/users/me",
+    "/dogs/",
+    "/visits/dashboard-stats",
+    "/visits/upcoming-activity",
+    "/parks/",
+]
+SCENARIO_WEIGHTS = {"dashboard": 50, "browse_park": 30, "log_visit": 15, "login": 5}
+LOGIN_BURST = 3
+
+
+# ---------------------------------------------------------------------------
+# Dataset
+# ---------------------------------------------------------------------------
+def load_users() -> tuple[dict[int, tuple[str, list[int]]], list[int]]:
+    """({user id: (username, dog ids)}, park ids) from the seeded database."""
+    from sqlmodel import Session, select
+
+    from app.database import engine
+    from app.models import Dog, DogPark, User
+
+    with Session(engine) as session:
+        rows = session.exec(
+            select(User.id, User.username, Dog.id).join(Dog, Dog.owner_id == User.id)
+        ).all()
+        park_ids = list(session.exec(select(DogPark.id)).all())
+    users: dict[int, tuple[str, list[int]]] = {}
+    for user_id, username, dog_id in rows:
+        users.setdefault(user_id, (username, []))[1].append(dog_id)
+    return users, park_ids
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, user_id: int, username: str, dog_ids: list[int],
+                 park_ids: list[int], rng: random.Random, samples: dict[str, list], record: bool):
+        from app.core.security import create_access_token
+
+        self.client = client
+        self.username = username
+        self.dog_ids = dog_ids
+        self.park_ids = park_ids
+        self.rng = rng
+        self.samples = samples
+        self.record = record
+        self.headers = {"Authorization": f"Bearer {create_access_token(user_id)}"}
+
+    async def request(self, label: str, method: str, path: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        resp = await self.client.request(method, f"{API}{path}", headers=self.headers, **kwargs)
+        if self.record:
+            self.samples[label].append((time.perf_counter() - start, resp.status_code < 400))
+        return resp
+
+    async def dashboard(self) -> None:
+        for path in DASHBOARD_PATHS:
+            await self.request(f"GET {path}", "GET", path)
+
+    async def browse_park(self) -> None:
+        park_id = self.rng.choice(self.park_ids)
+        await self.request("GET /parks/", "GET", "/parks/")
+        await self.request("GET /parks/{park_id}", "GET", f"/parks/{park_id}")
+        await self.request(
+            "GET /visits/?park_id&upcoming", "GET", "/visits/",
+            params={"park_id": park_id, "upcoming": "true"},
+        )
+
+    async def log_visit(self) -> None:
+        start = datetime.now(timezone.utc) + timedelta(hours=self.rng.randint(1, 72))
+        await self.request("POST /visits/", "POST", "/visits/", json={
+            "park_id": self.rng.choice(self.park_ids),
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+            "dog_ids": self.dog_ids[:1],
+        })
+
+    async def login(self) -> None:
+        for _ in range(LOGIN_BURST):
+            await self.request("POST /auth/login", "POST", "/auth/login", data={
+                "username": self.username, "password": PASSWORD,
+            })
+
+
+async def _run_user(vu: VirtualUser, deadline: float, warmup_until: float) -> None:
+    names = list(SCENARIO_WEIGHTS)
+    weights = list(SCENARIO_WEIGHTS.values())
+    while time.perf_counter() < deadline:
+        vu.record = time.perf_counter() >= warmup_until
+        await getattr(vu, vu.rng.choices(names, weights)[0])()
+
+
+async def run(args: argparse.Namespace) -> dict:
+    users_by_id, park_ids = load_users()
+    if not users_by_id or not park_ids:
+        sys.exit("No data in the database; run without --skip-seed first.")
+
+    if args.url:
+        transport, lifespan = None, None
+    else:
+        from app.main import app
+
+        transport, lifespan = httpx.ASGITransport(app=app), app.router.lifespan_context(app)
+
+    samples: dict[str, list[tuple[float, bool]]] = defaultdict(list)
+    user_ids = sorted(users_by_id)
+    async with httpx.AsyncClient(
+        transport=transport, base_url=args.url or "http://loadtest", timeout=60
+    ) as client:
+        if lifespan is not None:
+            await lifespan.__aenter__()
+        try:
+            start = time.perf_counter()
+            warmup_until = start + args.warmup
+            deadline = warmup_until + args.duration
+            users = []
+            for i in range(args.concurrency):
+                user_id = user_ids[i % len(user_ids)]
+                username, dog_ids = users_by_id[user_id]
+                users.append(VirtualUser(
+                    client, user_id, username, dog_ids, park_ids,
+                    random.Random(args.seed + i), samples, record=False,
+                ))
+            await asyncio.gather(*(_run_user(vu, deadline, warmup_until) for vu in users))
+            elapsed = time.perf_counter() - warmup_until
+        finally:
+            if lifespan is not None:
+                await lifespan.__aexit__(None, None, None)
+
+    return _report(samples, elapsed, args)
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def _stats(samples: list[tuple[float, bool]], elapsed: float) -> dict:
+    latencies = sorted(s * 1000 for s, _ in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for _, ok in samples if not ok),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+    }
+
+
+def _report(samples: dict[str, list], elapsed: float, args: argparse.Namespace) -> dict:
+    everything = [s for values in samples.values() for s in values]
+    return {
+        "config": {
+            "target": args.url or "in-process",
+            "duration_s": args.duration,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "dataset": {"users": args.users, "dogs_per_user": args.dogs_per_user,
+                        "parks": args.parks, "visits": args.visits},
+            "scenario_weights": SCENARIO_WEIGHTS,
+        },
+        "total": _stats(everything, elapsed) if everything else {},
+        "endpoints": {label: _stats(values, elapsed) for label, values in sorted(samples.items())},
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Human-readable regressions of `report` against `baseline`."""
+    regressions = []
+    for label, base in baseline["endpoints"].items():
+        current = report["endpoints"].get(label)
+        if current is None:
+            regressions.append(f"{label}: not exercised in this run")
+            continue
+        if current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {base['p95_ms']} ms -> {current['p95_ms']} ms")
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: throughput {base['throughput_rps']} -> {current['throughput_rps']} req/s"
+            )
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{label}: errors {base['errors']} -> {current['errors']}")
+    return regressions
+
+
+def _print_table(report: dict) -> None:
+    print(f"{'endpoint':<34} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    rows = [*report["endpoints"].items(), ("TOTAL", report["total"])]
+    for label, s in rows:
+        print(
+            f"{label:<34} {s['requests']:>7} {s['errors']:>5} {s['throughput_rps']:>8.1f} "
+            f"{s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--database", help="SQLite file to seed/use (default: throwaway)")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse an already seeded --database")
+    parser.add_argument("--seed-only", action="store_true", help="Seed --database and exit")
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--dogs-per-user", type=float, default=1.5)
+    parser.add_argument("--parks", type=int, default=100)
+    parser.add_argument("--visits", type=int, default=100_000)
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds first")
+    parser.add_argument("--concurrency", type=int, default=20, help="Virtual users")
+    parser.add_argument("--seed", type=int, default=1, help="RNG seed (dataset and scenarios)")
+    parser.add_argument("--out", default="loadtest-results.json", help="JSON report path")
+    parser.add_argument("--baseline", help="Fail on regressions against this JSON report")
+    parser.add_argument("--save-baseline", help="Also write the report here as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so the URL must be set before importing app.
+    database = args.database or f"{tempfile.mkdtemp(prefix='dogpark-load-')}/load.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ["RATE_LIMITS_ENABLED"] = "false"  # every virtual user logs in from one IP
+
+    if not args.skip_seed:
+        if Path(database).exists():
+            sys.exit(f"{database} already exists; pass --skip-seed to reuse it.")
+        started = time.perf_counter()
+        from seed import generate
+
+        generate(
+            users=args.users, dogs_per_user=args.dogs_per_user, parks=args.parks,
+            visits_per_week=args.visits // SEED_WEEKS, weeks=SEED_WEEKS, seed=args.seed,
+        )
+        print(f"Seeded {database} in {time.perf_counter() - started:.1f}s")
+    if args.seed_only:
+        return
+
+    report = asyncio.run(run(args))
+    _print_table(report)
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(f"Report written to {args.out}")
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(report, indent=2))
+
+    if args.baseline:
+        regressions = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print(f"\nREGRESSIONS vs {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions vs {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+"""
+Index advisor — finds router queries that scan a table, and suggests indexes.
+
+Run:  python index_advisor.py                      # seed a throwaway DB, report
+      python index_advisor.py --check --baseline index_advisor_baseline.json   # CI
+
+HOW IT WORKS:
+-------------
+1. Seeds a throwaway database with seed.py (or uses --database).
+2. Replays the API in-process: every GET route, with path parameters
+   taken from the seeded data, plus a fixed sequence of writes (log,
+   edit and delete a visit, follow, edit a dog, delete a park, ...).
+3. Captures every SQL statement each request sends (an engine event) and
+   runs EXPLAIN QUERY PLAN on it.
+4. Flags plan steps that read a whole table or index (`SCAN t`) or sort
+   in a temp B-tree.  A scan that needs no sort under a LIMIT stops after
+   a page (cursor pagination), so it isn't flagged.  Suggests an index
+   from the statement itself:
+   its equality columns on that table first, then its ORDER BY columns
+   (or else its first range column).  Suggestions are written as the
+   `Index(...)` line to add to the model's `__table_args__`.
+
+FAILING CI:
+-----------
+With --check, the run exits 1 when a finding on a table of at least
+--min-rows rows is not in --baseline.  Accepted findings (a list that
+really is meant to return every park, say) go in the baseline file; write
+it with --save-baseline, then review the diff like code.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+
+DEFAULT_VISITS = 20_000
+
+# Plan steps worth flagging, e.g. "SCAN visits", "SCAN visits USING INDEX ix",
+# "USE TEMP B-TREE FOR ORDER BY".
+_SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?$")
+_SEARCH = re.compile(r"^SEARCH (\w+)")
+_TEMP = re.compile(r"^USE TEMP B-TREE FOR (.+)$")
+_SKIPPED = ("PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "EXPLAIN")
+
+
+# ---------------------------------------------------------------------------
+# Capture
+# ---------------------------------------------------------------------------
+@dataclass
+class Captured:
+    sql: str
+    parameters: object
+    statement: object  # the SQLAlchemy construct, when there is one
+    routes: set[str] = field(default_factory=set)
+
+
+class Recorder:
+    """Collects the distinct statements sent while `route` is set."""
+
+    def __init__(self, engine) -> None:
+        from sqlalchemy import event
+
+        self.route: str | None = None
+        self.statements: dict[str, Captured] = {}
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, sql, parameters, context, executemany) -> None:
+        if self.route is None or sql.lstrip().upper().startswith(_SKIPPED):
+            return
+        if executemany:
+            parameters = parameters[0]
+        compiled = getattr(context, "compiled", None)
+        captured = self.statements.setdefault(
+            sql, Captured(sql, parameters, getattr(compiled, "statement", None))
+        )
+        captured.routes.add(self.route)
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+def _sample(session) -> dict[str, object]:
+    """Ids to fill path parameters with: bob's (user 2) dog and visit, park 1."""
+    from sqlmodel import select
+
+    from app.models import Dog, Visit
+
+    return {
+        "user_id": 3,
+        "park_id": 1,
+        "dog_id": session.exec(select(Dog.id).where(Dog.owner_id == 2).order_by(Dog.id)).first(),
+        "visit_id": session.exec(select(Visit.id).where(Visit.user_id == 2)).first(),
+    }
+
+
+def _replay(client, recorder: Recorder, ids: dict[str, object]) -> list[str]:
+    """Make every request; returns the GET routes that couldn't be replayed."""
+    from datetime import datetime, timedelta, timezone
+
+    from fastapi.routing import APIRoute
+
+    from app.core.security import create_access_token, create_calendar_token
+    from app.main import app
+
+    admin = {"Authorization": f"Bearer {create_access_token(1)}"}
+    bob = {"Authorization": f"Bearer {create_access_token(2)}"}
+    query = {"token": create_calendar_token(1)}
+
+    def request(method: str, template: str, headers=admin, **kwargs):
+        recorder.route = f"{method} {template}"
+        try:
+            return client.request(method, template.format(**ids), headers=headers, **kwargs)
+        finally:
+            recorder.route = None
+
+    skipped = []
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or "GET" not in route.methods:
+            continue
+        names = re.findall(r"{(\w+)}", route.path)
+        if any(ids.get(name) is None for name in names):
+            skipped.append(route.path)
+            continue
+        required = {p.alias for p in route.dependant.query_params if p.required}
+        request("GET", route.path, params={k: v for k, v in query.items() if k in required})
+
+    # Filtered reads the plain GETs above don't reach.
+    api = "/api/v1"
+    request("GET", f"{api}/visits/", params={"park_id": ids["park_id"], "upcoming": True})
+    request("GET", f"{api}/visits/", params={"upcoming": True})
+    request("GET", f"{api}/dogs/search", params={"breed": "beagle", "park_id": ids["park_id"]})
+    request("GET", f"{api}/users/", params={"q": "user", "is_active": True})
+
+    # Writes, as bob, in an order that leaves every id valid until it's used.
+    start = datetime.now(timezone.utc) + timedelta(days=1)
+    visit = request("POST", f"{api}/visits/", headers=bob, json={
+        "park_id": ids["park_id"], "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(), "dog_ids": [ids["dog_id"]],
+    }).json()
+    request("PATCH", f"{api}/visits/{visit['id']}", headers=bob,
+            json={"end_time": (start + timedelta(hours=2)).isoformat(), "dog_ids": [ids["dog_id"]]})
+    request("DELETE", f"{api}/visits/{visit['id']}", headers=bob)
+    request("POST", f"{api}/users/{{user_id}}/follow", headers=bob)
+    request("DELETE", f"{api}/users/{{user_id}}/follow", headers=bob)
+    request("PATCH", f"{api}/dogs/{{dog_id}}", headers=bob, json={"size": "large"})
+    park = request("POST", f"{api}/parks/", headers=bob,
+                   json={"name": "Advisor Park", "address": "1 Plan Street"}).json()
+    request("PATCH", f"{api}/parks/{park['id']}", headers=bob, json={"description": "Fenced"})
+    request("DELETE", f"{api}/parks/{{park_id}}")  # the busiest park, with all its visits
+    request("DELETE", f"{api}/dogs/{{dog_id}}", headers=bob)
+    return skipped
+
+
+# ---------------------------------------------------------------------------
+# Analysis
+# ---------------------------------------------------------------------------
+@dataclass
+class Finding:
+    routes: list[str]
+    table: str
+    rows: int
+    kind: str  # "full scan", "index scan" or "temp b-tree"
+    step: str
+    sql: str
+    suggestion: str | None
+
+    def keys(self) -> list[str]:
+        return [f"{route} | {self.table} | {self.kind}" for route in self.routes]
+
+
+def _columns_on(statement, table) -> tuple[list[str], list[str], list[str]]:
+    """(equality, range, order-by) column names of `table` in `statement`."""
+    from sqlalchemy import Column
+    from sqlalchemy.sql import operators, visitors
+    from sqlalchemy.sql.elements import BinaryExpression
+
+    equality, ranges, order = [], [], []
+    ranged = {operators.gt, operators.ge, operators.lt, operators.le}
+    for element in visitors.iterate(statement):
+        if not isinstance(element, BinaryExpression):
+            continue
+        for side in (element.left, element.right):
+            if isinstance(side, Column) and side.table is table:
+                if element.operator in (operators.eq, operators.in_op):
+                    equality.append(side.name)
+                elif element.operator in ranged:
+                    ranges.append(side.name)
+    for clause in getattr(statement, "_order_by_clauses", ()):
+        column = getattr(clause, "element", clause)
+        if isinstance(column, Column) and column.table is table:
+            order.append(column.name)
+    return equality, ranges, order
+
+
+def _order_table(statement):
+    """The table whose columns `statement` is ordered by, if any."""
+    from sqlalchemy import Column
+
+    for clause in getattr(statement, "_order_by_clauses", ()):
+        column = getattr(clause, "element", clause)
+        if isinstance(column, Column):
+            return column.table
+    return None
+
+
+def _suggest(statement, table, kind: str) -> str | None:
+    """An `Index(...)` for `table` serving `statement`, unless one already leads with it."""
+    if statement is None or table is None:
+        return None
+    equality, ranges, order = _columns_on(statement, table)
+    if kind == "temp b-tree" and not order:
+        return None  # sorted by an expression (e.g. count(*)); no index helps
+    wanted = list(dict.fromkeys(equality + (order or ranges[:1])))
+    if not wanted:
+        return None
+    for index in table.indexes:
+        if [c.name for c in index.columns][: len(wanted)] == wanted:
+            return f"{index.name} already covers it; the planner preferred another plan"
+    primary = [c.name for c in table.primary_key.columns]
+    if primary[: len(wanted)] == wanted:
+        return "the primary key already covers it; the planner preferred another plan"
+    columns = ", ".join(f'"{c}"' for c in wanted)
+    return f'Index("ix_{table.name}_{"_".join(wanted)}", {columns})  # {_model_file(table)}'
+
+
+def _model_file(table) -> str:
+    from sqlmodel import SQLModel
+
+    for mapper in SQLModel._sa_registry.mappers:
+        if mapper.local_table is table:
+            return sys.modules[mapper.class_.__module__].__file__.split("backend/")[-1]
+    return "?"
+
+
+def analyse(engine, captured: dict[str, Captured]) -> list[Finding]:
+    from sqlmodel import SQLModel
+
+    tables = SQLModel.metadata.tables
+    sizes: dict[str, int] = {}
+    findings = []
+    with engine.connect() as conn:
+        def rows(name: str) -> int:
+            if name not in sizes:
+                sizes[name] = conn.exec_driver_sql(f"SELECT count(*) FROM {name}").scalar_one()
+            return sizes[name]
+
+        for item in captured.values():
+            try:
+                steps = [r[3] for r in conn.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {item.sql}", item.parameters
+                )]
+            except Exception as exc:  # e.g. a statement only valid mid-transaction
+                print(f"  (could not explain: {exc.__class__.__name__}) {item.sql[:80]}")
+                continue
+            read = [m.group(1) for s in steps if (m := _SCAN.match(s) or _SEARCH.match(s))]
+            read = [name for name in read if name in tables]
+            sorts = any(_TEMP.match(s) for s in steps)
+            paged = not sorts and re.search(r"\bLIMIT\b", item.sql) is not None
+            ordered_by = _order_table(item.statement)
+            for step in steps:
+                if (scan := _SCAN.match(step)) and scan.group(1) in tables and not paged:
+                    name, kind = scan.group(1), "index scan" if scan.group(2) else "full scan"
+                elif _TEMP.match(step) and read:
+                    if ordered_by is not None and ordered_by.name in read:
+                        name = ordered_by.name
+                    else:
+                        name = max(read, key=rows)
+                    kind = "temp b-tree"
+                else:
+                    continue
+                findings.append(Finding(
+                    routes=sorted(item.routes), table=name, rows=rows(name), kind=kind,
+                    step=step, sql=" ".join(item.sql.split()),
+                    suggestion=_suggest(item.statement, tables[name], kind),
+                ))
+    return findings
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+def report(findings: list[Finding], min_rows: int, known: set[str]) -> list[str]:
+    """Print findings, biggest tables first; returns the new keys at or above min_rows."""
+    new = []
+    by_table = defaultdict(list)
+    for finding in findings:
+        by_table[finding.table].append(finding)
+    for table, items in sorted(by_table.items(), key=lambda kv: -kv[1][0].rows):
+        print(f"\n{table} ({items[0].rows} rows)")
+        for f in items:
+            fresh = [k for k in f.keys() if k not in known]
+            marker = "NEW " if fresh and f.rows >= min_rows else ""
+            new.extend(fresh if f.rows >= min_rows else [])
+            print(f"  {marker}{f.kind}: {f.step}")
+            for route in f.routes:
+                print(f"      {route}")
+            print(f"      {f.sql[:160]}")
+            if f.suggestion:
+                print(f"      suggest: {f.suggestion}")
+    return new
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database", help="Existing SQLite file to use (default: seed a throwaway)")
+    parser.add_argument("--visits", type=int, default=DEFAULT_VISITS, help="Visits to seed")
+    parser.add_argument("--min-rows", type=int, default=1_000,
+                        help="Only findings on tables at least this big can fail --check")
+    parser.add_argument("--baseline", help="JSON list of accepted findings")
+    parser.add_argument("--save-baseline", help="Write every current finding here as accepted")
+    parser.add_argument("--check", action="store_true", help="Exit 1 on new findings")
+    args = parser.parse_args()
+
+    # Settings are read at import time, so the URL must be set before importing app.
+    database = args.database or f"{tempfile.mkdtemp(prefix='dogpark-advisor-')}/advisor.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{database}"
+    os.environ.setdefault("MEDIA_ROOT", f"{tempfile.mkdtemp(prefix='dogpark-advisor-')}/media")
+
+    from fastapi.testclient import TestClient
+    from sqlmodel import Session
+
+    from app.database import engine
+    from app.main import app
+
+    if not args.database:
+        from seed import generate
+
+        generate(users=max(3, args.visits // 20), parks=max(2, args.visits // 200),
+                 visits_per_week=args.visits // 2, weeks=2)
+
+    recorder = Recorder(engine)
+    with Session(engine) as session:
+        ids = _sample(session)
+    skipped = _replay(TestClient(app), recorder, ids)
+    findings = analyse(engine, recorder.statements)
+
+    known = set(json.loads(Path(args.baseline).read_text())) if args.baseline else set()
+    print(f"Replayed {len({r for c in recorder.statements.values() for r in c.routes})} routes, "
+          f"{len(recorder.statements)} distinct statements; {len(findings)} finding(s).")
+    if skipped:
+        print(f"Not replayed (no sample path parameters): {', '.join(skipped)}")
+    new = report(findings, args.min_rows, known)
+
+    if args.save_baseline:
+        keys = sorted({k for f in findings for k in f.keys()})
+        Path(args.save_baseline).write_text(json.dumps(keys, indent=2) + "\n")
+        print(f"\nBaseline of {len(keys)} finding(s) written to {args.save_baseline}")
+    if args.check and new:
+        print(f"\n{len(new)} new finding(s) on tables of {args.min_rows}+ rows:")
+        for key in new:
+            print(f"  {key}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Admin maintenance commands.
+
+Run:  python maintenance.py purge-orphans [--dry-run]
+      python maintenance.py prune-tombstones
+      python maintenance.py archive-visits
+
+purge-orphans
+    Deletes rows whose parent no longer exists: visits of deleted parks,
+    visit_dogs links to deleted visits or dogs, feed entries of deleted
+    visits, and slot stats of deleted parks; the slot stats are rebuilt if
+    any visit_dogs link went.  Versions before the set-based cascades
+    (services/cascade.py) left these behind.  Everything happens in one
+    transaction; --dry-run reports the counts and rolls back.
+
+prune-tombstones
+    Deletes delta-sync tombstones older than SYNC_TOMBSTONE_DAYS.  Clients
+    holding a sync token from before them get 410 and sync from scratch.
+
+archive-visits
+    Moves visits that ended more than VISIT_HOT_DAYS ago to visits_archive
+    (services/archive.py).  The job workers also do this every hour.
+"""
+
+import argparse
+
+from sqlmodel import Session
+
+from app.database import create_db_and_tables, engine
+from app.services import archive, cascade, sync
+
+
+def purge_orphans(dry_run: bool) -> None:
+    with Session(engine) as session:
+        deleted = cascade.purge_orphans(session)
+        if dry_run:
+            session.rollback()
+        else:
+            session.commit()
+    verb = "Would delete" if dry_run else "Deleted"
+    for table, count in deleted.items():
+        print(f"{verb} {count} orphaned row(s) from {table}")
+
+
+def prune_tombstones() -> None:
+    with Session(engine) as session:
+        deleted = sync.prune_tombstones(session)
+        session.commit()
+    print(f"Deleted {deleted} tombstone(s)")
+
+
+def archive_visits() -> None:
+    print(f"Archived {archive.archive_visits()} visit(s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Admin maintenance commands.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    purge = commands.add_parser("purge-orphans", help="Delete rows whose parent is gone")
+    purge.add_argument("--dry-run", action="store_true", help="Report counts, change nothing")
+    commands.add_parser("prune-tombstones", help="Delete old delta-sync tombstones")
+    commands.add_parser("archive-visits", help="Move old visits to visits_archive")
+    args = parser.parse_args()
+
+    create_db_and_tables()
+    if args.command == "purge-orphans":
+        purge_orphans(args.dry_run)
+    elif args.command == "prune-tombstones":
+        prune_tombstones()
+    elif args.command == "archive-visits":
+        archive_visits()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,288 @@
 """
-Seed script — populates the database with sample data.
+Seed script — generates a realistic synthetic dataset.
 
-Run:  python seed.py
+Run:  python seed.py                       # small demo database
+      python seed.py --users 20000 --visits-per-week 250000 --weeks 4   # ~1M visits
+
+The first three users are always the demo accounts from the README
+(alice is an admin); every user's password is `password123`.
+
+HOW IT STAYS FAST:
+------------------
+- One bcrypt hash is computed up front and shared by every user; hashing
+  each user separately would cost ~0.2 s apiece.
+- Rows are built as plain dicts with explicit ids and written with core
+  `INSERT`s in large batches inside one transaction per table, never as
+  ORM objects with a refresh after each commit.
+- Derived tables are filled set-based afterwards: `park_slot_stats` via
+  `park_slots.rebuild`, timeline entries with one INSERT ... SELECT, and
+  delta-sync sequence numbers with one UPDATE per table.
+
+SHAPE OF THE DATA:
+------------------
+- Parks sit in clusters around a few city centres (gaussian jitter).
+- Park popularity follows a Zipf-like law: the park ranked k gets weight
+  1/k^ZIPF_EXPONENT, so a handful of parks see most of the traffic.
+- Visit start times follow a weekday/weekend time-of-day profile with
+  morning and evening peaks.  Half the weeks are in the past, half ahead.
 """
 
+import argparse
+import random
+import time
 from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from sqlalchemy import insert, text
+from sqlalchemy import select as core_select
+from sqlmodel import Session, func, select
 
 from app.core.security import hash_password
 from app.database import create_db_and_tables, engine
-from app.models.dog import Dog
+from app.models.dog import Dog, normalize_breed
+from app.models.follow import Follow
 from app.models.park import DogPark
+from app.models.park_slot import ParkSlotStats
+from app.models.sync import number_unsequenced
+from app.models.timeline import TimelineEntry
 from app.models.user import User
 from app.models.visit import Visit, VisitDogLink
-from sqlmodel import Session
-
-create_db_and_tables()
-
-with Session(engine) as s:
-    # --- Users ---
-    alice = User(
-        email="alice@example.com",
-        username="alice",
-        hashed_password=hash_password("password123"),
-        full_name="Alice Johnson",
-        is_admin=True,
-    )
-    bob = User(
-        email="bob@example.com",
-        username="bob",
-        hashed_password=hash_password("password123"),
-        full_name="Bob Smith",
-    )
-    carol = User(
-        email="carol@example.com",
-        username="carol",
-        hashed_password=hash_password("password123"),
-        full_name="Carol Davis",
+from app.services import park_slots
+
+PASSWORD = "password123"
+BATCH_SIZE = 50_000
+ZIPF_EXPONENT = 1.1
+
+DEMO_USERS = [
+    ("alice", "Alice Johnson", True),
+    ("bob", "Bob Smith", False),
+    ("carol", "Carol Davis", False),
+]
+CITY_CENTRES = [
+    (60.1699, 24.9384),  # Helsinki
+    (60.2055, 24.6559),  # Espoo
+    (60.2934, 25.0378),  # Vantaa
+    (61.4978, 23.7610),  # Tampere
+    (60.4518, 22.2666),  # Turku
+    (65.0121, 25.4651),  # Oulu
+]
+BREEDS = [
+    "Mixed", "Labrador Retriever", "Golden Retriever", "German Shepherd", "French Bulldog",
+    "Beagle", "Border Collie", "Poodle", "Dachshund", "Finnish Lapphund", "Jack Russell Terrier",
+    "Siberian Husky", "Chihuahua", "Boxer", "Australian Shepherd",
+]
+SIZES = ["small", "medium", "large"]
+DOG_NAMES = [
+    "Buddy", "Luna", "Max", "Daisy", "Rocky", "Bella", "Charlie", "Milo", "Lucy", "Coco",
+    "Teddy", "Nala", "Oskari", "Onni", "Rex", "Ruby", "Bruno", "Rosie", "Leo", "Molly",
+]
+# Relative likelihood of a visit starting in each hour (local time ≈ UTC here).
+WEEKDAY_HOURS = [0, 0, 0, 0, 0, 1, 4, 9, 8, 4, 3, 3, 4, 3, 3, 4, 7, 10, 10, 8, 5, 3, 1, 0]
+WEEKEND_HOURS = [0, 0, 0, 0, 0, 0, 1, 3, 6, 9, 10, 10, 9, 8, 8, 8, 7, 6, 5, 4, 2, 1, 0, 0]
+DURATIONS_MIN = [30, 45, 60, 60, 90, 120]
+
+
+def _insert(conn, table, rows: list[dict]) -> None:
+    for i in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(table), rows[i : i + BATCH_SIZE])
+
+
+def _insert_raw(conn, table, columns: list[str], rows: list[tuple]) -> None:
+    """
+    Like `_insert`, for the big tables: positional tuples go straight to the
+    driver, skipping SQLAlchemy's per-row parameter processing.  Datetimes
+    must already be strings in SQLAlchemy's SQLite format (see `_ts`).
+    """
+    sql = f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    for i in range(0, len(rows), BATCH_SIZE):
+        conn.exec_driver_sql(sql, rows[i : i + BATCH_SIZE])
+
+
+def _ts(value: datetime) -> str:
+    """A naive UTC datetime as SQLAlchemy stores it in SQLite."""
+    return value.isoformat(sep=" ", timespec="microseconds")
+
+
+def _dog_counts(users: int, dogs_per_user: float, rng: random.Random) -> list[int]:
+    """Every owner gets at least one dog; the fractional part is a coin flip."""
+    whole, frac = int(dogs_per_user), dogs_per_user - int(dogs_per_user)
+    return [max(1, whole + (rng.random() < frac)) for _ in range(users)]
+
+
+def _start_times(n: int, weeks: int, now: datetime, rng: random.Random) -> list[datetime]:
+    """`n` start times over `weeks` weeks centred on now, by time-of-day profile."""
+    first_day = (now - timedelta(weeks=weeks / 2)).replace(hour=0, minute=0, second=0, microsecond=0)
+    days = rng.choices(range(weeks * 7), k=n)
+    weekday_cum = list(accumulate(WEEKDAY_HOURS))
+    weekend_cum = list(accumulate(WEEKEND_HOURS))
+    weekday_hours = rng.choices(range(24), cum_weights=weekday_cum, k=n)
+    weekend_hours = rng.choices(range(24), cum_weights=weekend_cum, k=n)
+    first_weekday = first_day.weekday()
+    return [
+        first_day + timedelta(
+            days=day,
+            hours=weekend_hours[i] if (first_weekday + day) % 7 >= 5 else weekday_hours[i],
+            minutes=rng.randrange(0, 60, 15),
+        )
+        for i, day in enumerate(days)
+    ]
+
+
+def generate(
+    users: int = 50,
+    dogs_per_user: float = 1.5,
+    parks: int = 10,
+    clusters: int = 3,
+    visits_per_week: int = 200,
+    weeks: int = 4,
+    follows_per_user: int = 5,
+    seed: int = 1,
+) -> dict[str, int]:
+    """Populate an empty database; returns row counts per table."""
+    rng = random.Random(seed)
+    create_db_and_tables()
+    with Session(engine) as session:
+        if session.exec(select(func.count()).select_from(User)).one():
+            raise SystemExit("The database already has users; seed an empty database.")
+
+    users = max(users, len(DEMO_USERS))
+    hashed = hash_password(PASSWORD)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    counts: dict[str, int] = {}
+
+    with engine.begin() as conn:
+        # Disposable data: skip fsyncs, and give index maintenance a big page cache.
+        conn.execute(text("PRAGMA synchronous = OFF"))
+        conn.execute(text("PRAGMA cache_size = -262144"))  # 256 MiB
+        conn.execute(text("PRAGMA temp_store = MEMORY"))
+
+        # --- Users ---
+        user_rows = []
+        for user_id in range(1, users + 1):
+            if user_id <= len(DEMO_USERS):
+                username, full_name, is_admin = DEMO_USERS[user_id - 1]
+            else:
+                username, full_name, is_admin = f"user{user_id}", f"User {user_id}", False
+            user_rows.append({
+                "id": user_id, "email": f"{username}@example.com", "username": username,
+                "hashed_password": hashed, "full_name": full_name, "is_active": True,
+                "is_admin": is_admin, "created_at": now, "updated_at": now,
+            })
+        _insert(conn, User.__table__, user_rows)
+        counts["users"] = len(user_rows)
+
+        # --- Dogs ---
+        dog_rows = []
+        dogs_of: list[list[int]] = [[] for _ in range(users + 1)]
+        for owner_id, n in enumerate(_dog_counts(users, dogs_per_user, rng), start=1):
+            for _ in range(n):
+                dog_id = len(dog_rows) + 1
+                breed = rng.choice(BREEDS)
+                dog_rows.append({
+                    "id": dog_id, "name": rng.choice(DOG_NAMES), "breed": breed,
+                    "breed_key": normalize_breed(breed),  # core INSERTs skip the ORM event
+                    "size": rng.choice(SIZES), "good_with_others": rng.random() < 0.85,
+                    "owner_id": owner_id, "created_at": now,
+                })
+                dogs_of[owner_id].append(dog_id)
+        _insert(conn, Dog.__table__, dog_rows)
+        counts["dogs"] = len(dog_rows)
+
+        # --- Parks ---
+        centres = CITY_CENTRES[: max(1, min(clusters, len(CITY_CENTRES)))]
+        park_rows = []
+        for park_id in range(1, parks + 1):
+            lat, lon = rng.choice(centres)
+            park_rows.append({
+                "id": park_id, "name": f"Park {park_id}", "address": f"{park_id} Bark Street",
+                "latitude": round(rng.gauss(lat, 0.03), 6),
+                "longitude": round(rng.gauss(lon, 0.06), 6),
+                "created_by_id": rng.randint(1, users), "created_at": now,
+            })
+        _insert(conn, DogPark.__table__, park_rows)
+        counts["parks"] = len(park_rows)
+
+        # --- Visits (Zipf park popularity) ---
+        n_visits = visits_per_week * weeks
+        ranked = list(range(1, parks + 1))
+        rng.shuffle(ranked)
+        park_cum = list(accumulate(1 / rank**ZIPF_EXPONENT for rank in range(1, parks + 1)))
+        park_ids = rng.choices(ranked, cum_weights=park_cum, k=n_visits)
+        user_ids = rng.choices(range(1, users + 1), k=n_visits)
+        durations = rng.choices(DURATIONS_MIN, k=n_visits)
+        starts = _start_times(n_visits, weeks, now, rng)
+        visit_rows, link_rows = [], []
+        created = _ts(now)
+        for i in range(n_visits):
+            visit_id, user_id, start = i + 1, user_ids[i], starts[i]
+            visit_rows.append((
+                visit_id, _ts(start), _ts(start + timedelta(minutes=durations[i])),
+                user_id, park_ids[i], created,
+            ))
+            owned = dogs_of[user_id]
+            for dog_id in owned if len(owned) == 1 else rng.sample(owned, rng.randint(1, len(owned))):
+                link_rows.append((visit_id, dog_id))
+        _insert_raw(conn, Visit.__table__,
+                    ["id", "start_time", "end_time", "user_id", "park_id", "created_at"], visit_rows)
+        _insert_raw(conn, VisitDogLink.__table__, ["visit_id", "dog_id"], link_rows)
+        counts["visits"], counts["visit_dogs"] = len(visit_rows), len(link_rows)
+        del visit_rows, link_rows
+
+        # --- Follows + timeline (what fan-out-on-write would have produced) ---
+        follow_pairs = set()
+        for follower_id in range(1, users + 1):
+            picks = rng.sample(range(1, users + 1), min(follows_per_user + 1, users))
+            for followee_id in [u for u in picks if u != follower_id][:follows_per_user]:
+                follow_pairs.add((follower_id, followee_id))
+        _insert(conn, Follow.__table__, [
+            {"follower_id": a, "followee_id": b, "created_at": now} for a, b in follow_pairs
+        ])
+        counts["follows"] = len(follow_pairs)
+        timeline = conn.execute(insert(TimelineEntry).from_select(
+            ["owner_id", "start_time", "visit_id", "end_time", "author_id", "park_id"],
+            core_select(Follow.follower_id, Visit.start_time, Visit.id, Visit.end_time,
+                        Visit.user_id, Visit.park_id)
+            .join(Visit, Visit.user_id == Follow.followee_id)
+            .where(Visit.end_time >= now)
+            .order_by(Follow.follower_id, Visit.start_time),  # append in primary-key order
+        ))
+        counts["timeline"] = timeline.rowcount
+        number_unsequenced(conn)  # core INSERTs skip the ORM hook
+
+    with Session(engine) as session:
+        park_slots.rebuild(session)
+        session.commit()
+        counts["park_slots"] = session.exec(select(func.count()).select_from(ParkSlotStats)).one()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset.")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--dogs-per-user", type=float, default=1.5, help="Mean dogs per user (≥1)")
+    parser.add_argument("--parks", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=3, help="City centres parks gather around")
+    parser.add_argument("--visits-per-week", type=int, default=200)
+    parser.add_argument("--weeks", type=int, default=4, help="Half in the past, half ahead")
+    parser.add_argument("--follows-per-user", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1, help="RNG seed (same seed, same data)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = generate(
+        users=args.users,
+        dogs_per_user=args.dogs_per_user,
+        parks=args.parks,
+        clusters=args.clusters,
+        visits_per_week=args.visits_per_week,
+        weeks=args.weeks,
+        follows_per_user=args.follows_per_user,
+        seed=args.seed,
     )
-    s.add_all([alice, bob, carol])
-    s.commit()
-    s.refresh(alice)
-    s.refresh(bob)
-    s.refresh(carol)
-
-    # --- Dogs ---
-    buddy = Dog(name="Buddy", breed="Golden Retriever", size="large", good_with_others=True, personality_notes="Loves fetch and swimming", owner_id=alice.id)
-    luna = Dog(name="Luna", breed="Border Collie", size="medium", good_with_others=True, personality_notes="Very energetic, loves to herd", owner_id=alice.id)
-    max_ = Dog(name="Max", breed="German Shepherd", size="large", good_with_others=False, personality_notes="Needs space, warming up slowly", owner_id=bob.id)
-    daisy = Dog(name="Daisy", breed="Beagle", size="medium", good_with_others=True, personality_notes="Friendly with everyone", owner_id=bob.id)
-    rocky = Dog(name="Rocky", breed="French Bulldog", size="small", good_with_others=True, personality_notes="Playful and snorty", owner_id=carol.id)
-    bella = Dog(name="Bella", breed="Labrador", size="large", good_with_others=True, personality_notes="Gentle giant, great with puppies", owner_id=carol.id)
-    s.add_all([buddy, luna, max_, daisy, rocky, bella])
-    s.commit()
-    for d in [buddy, luna, max_, daisy, rocky, bella]:
-        s.refresh(d)
-
-    # --- Parks ---
-    central = DogPark(name="Central Bark", address="100 Park Avenue", description="Large open field with shaded areas and water fountains", created_by_id=alice.id)
-    riverside = DogPark(name="Riverside Dog Run", address="55 River Road", description="Fenced area along the river, separate small-dog section", created_by_id=bob.id)
-    hilltop = DogPark(name="Hilltop Off-Leash Park", address="200 Summit Drive", description="Hilly terrain with trails, great for active dogs", created_by_id=carol.id)
-    s.add_all([central, riverside, hilltop])
-    s.commit()
-    for p in [central, riverside, hilltop]:
-        s.refresh(p)
-
-    # --- Visits ---
-    now = datetime.now(timezone.utc)
-
-    v1 = Visit(start_time=now + timedelta(hours=2), end_time=now + timedelta(hours=4), notes="Morning walk with Buddy and Luna", user_id=alice.id, park_id=central.id)
-    v2 = Visit(start_time=now + timedelta(hours=3), end_time=now + timedelta(hours=5), notes="Daisy needs socialization practice", user_id=bob.id, park_id=central.id)
-    v3 = Visit(start_time=now + timedelta(hours=6), end_time=now + timedelta(hours=8), notes="Evening run", user_id=carol.id, park_id=riverside.id)
-    v4 = Visit(start_time=now + timedelta(days=1, hours=1), end_time=now + timedelta(days=1, hours=3), notes="Weekend playdate", user_id=alice.id, park_id=hilltop.id)
-    v5 = Visit(start_time=now + timedelta(days=1, hours=4), end_time=now + timedelta(days=1, hours=6), user_id=bob.id, park_id=riverside.id)
-    s.add_all([v1, v2, v3, v4, v5])
-    s.commit()
-    for v in [v1, v2, v3, v4, v5]:
-        s.refresh(v)
-
-    # --- Visit ↔ Dog links ---
-    s.add_all([
-        VisitDogLink(visit_id=v1.id, dog_id=buddy.id),
-        VisitDogLink(visit_id=v1.id, dog_id=luna.id),
-        VisitDogLink(visit_id=v2.id, dog_id=daisy.id),
-        VisitDogLink(visit_id=v3.id, dog_id=rocky.id),
-        VisitDogLink(visit_id=v3.id, dog_id=bella.id),
-        VisitDogLink(visit_id=v4.id, dog_id=buddy.id),
-        VisitDogLink(visit_id=v5.id, dog_id=max_.id),
-    ])
-    s.commit()
-
-    print("Seeded successfully!")
-    print(f"  Users:  {alice.id}, {bob.id}, {carol.id}")
-    print(f"  Dogs:   {buddy.id}, {luna.id}, {max_.id}, {daisy.id}, {rocky.id}, {bella.id}")
-    print(f"  Parks:  {central.id}, {riverside.id}, {hilltop.id}")
-    print(f"  Visits: {v1.id}, {v2.id}, {v3.id}, {v4.id}, {v5.id}")
+    print(f"Seeded successfully in {time.perf_counter() - started:.1f}s!")
+    for table, n in counts.items():
+        print(f"  {table:<11} {n:>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Shared fixtures for the API tests.
+
+The database is a temp file, created before `app` is imported (settings are
+read at import time).  `dataset` is parametrised over two sizes and scoped
+to the session, so pytest groups the tests by size and seeds each one once:
+every test runs against 10 visits and again against 10,000.
+"""
+
+import os
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+_tmpdir = tempfile.mkdtemp(prefix="dogpark-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/test.db"
+os.environ["MEDIA_ROOT"] = f"{_tmpdir}/media"
+os.environ["RATE_LIMITS_ENABLED"] = "false"  # test_rate_limit.py turns them on
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+from app.core.security import create_access_token  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from seed import generate  # noqa: E402
+
+DATASET_SIZES = [10, 10_000]
+
+
+@dataclass
+class Dataset:
+    visits: int
+    admin_headers: dict[str, str]  # alice, user 1
+    user_headers: dict[str, str]   # bob, user 2
+
+
+@pytest.fixture(scope="session", params=DATASET_SIZES, ids=lambda n: f"{n}-visits")
+def dataset(request) -> Dataset:
+    visits = request.param
+    with engine.begin() as conn:
+        SQLModel.metadata.drop_all(conn)
+        conn.exec_driver_sql("PRAGMA user_version = 0")  # so generate() recreates the schema
+    generate(
+        users=max(3, visits // 20),
+        parks=max(2, visits // 200),
+        visits_per_week=visits // 2,
+        weeks=2,
+    )
+    return Dataset(
+        visits=visits,
+        admin_headers={"Authorization": f"Bearer {create_access_token(1)}"},
+        user_headers={"Authorization": f"Bearer {create_access_token(2)}"},
+    )
+
+
+@pytest.fixture(scope="session")
+def client() -> TestClient:
+    # No `with`: the lifespan (job workers) stays off; `dataset` creates tables.
+    return TestClient(app)
+
+
+@dataclass
+class QueryCount:
+    statements: int = 0
+    elapsed_ms: float = 0.0
+    executed: list[tuple[str, object]] = field(default_factory=list)  # (SQL, parameters)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCount]:
+    """Count SQL statements sent to the engine (an executemany counts once)."""
+    result = QueryCount()
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        result.statements += 1
+        result.executed.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result.elapsed_ms = (time.perf_counter() - start) * 1000
+        event.remove(engine, "before_cursor_execute", on_execute)
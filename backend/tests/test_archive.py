@@ -0,0 +1,128 @@
+"""
+Hot/cold visit partitioning (services/archive.py): moving visits keeps
+ids, links and history reads intact.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, func, select
+
+from app.database import engine
+from app.models import Visit, VisitArchive, VisitDogLink, VisitDogLinkArchive
+from app.services import archive
+
+API = "/api/v1"
+
+
+def _scalar(stmt):
+    with Session(engine) as session:
+        return session.exec(stmt).one()
+
+
+def test_new_visits_never_reuse_an_archived_id(client, dataset):
+    headers = dataset.user_headers
+    newest = _scalar(select(func.max(Visit.id)))
+    links = _scalar(select(func.count()).where(VisitDogLink.visit_id == newest))
+    with Session(engine) as session:
+        archive._move(session, 0, 1, [newest])  # as archive_visits() would
+        session.commit()
+    # The links went with it.
+    assert _scalar(select(func.count()).where(VisitDogLink.visit_id == newest)) == 0
+    assert _scalar(select(func.count()).where(VisitDogLinkArchive.visit_id == newest)) == links
+
+    start = datetime.now(timezone.utc) + timedelta(days=400)
+    created = client.post(f"{API}/visits/", headers=headers, json={
+        "park_id": 1,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(),
+        "dog_ids": [],
+    })
+    assert created.status_code == 201, created.text
+    assert created.json()["id"] > newest and created.json()["dogs"] == []
+
+    mine = client.get(f"{API}/visits/my", headers=headers).json()
+    assert len({v["id"] for v in mine}) == len(mine)
+    assert _scalar(select(func.count()).where(VisitArchive.id == newest)) == 1
+
+    client.delete(f"{API}/visits/{created.json()['id']}", headers=headers)
+    with Session(engine) as session:
+        archive.restore(session, newest)
+        session.commit()
+
+
+def test_history_spans_the_archive(client, dataset):
+    headers = dataset.user_headers
+    before = client.get(f"{API}/visits/my", headers=headers).json()
+    with Session(engine) as session:  # visits already archived by other tests stay put
+        archived = set(session.exec(select(VisitArchive.id)))
+    assert archive.archive_visits(before=datetime.now(timezone.utc)) > 0
+    # History reads see archived visits exactly as before.
+    assert client.get(f"{API}/visits/my", headers=headers).json() == before
+
+    visit_id = _scalar(select(func.min(VisitArchive.id)).where(VisitArchive.user_id == 2))
+    assert client.get(f"{API}/visits/{visit_id}", headers=headers).status_code == 200
+    # Writing to an archived visit moves it back to the hot table.
+    client.patch(f"{API}/visits/{visit_id}", headers=headers, json={"notes": "Muddy"})
+    assert _scalar(select(Visit.notes).where(Visit.id == visit_id)) == "Muddy"
+    assert _scalar(select(func.count()).where(VisitArchive.id == visit_id)) == 0
+
+    with Session(engine) as session:
+        moved = [i for i in session.exec(select(VisitArchive.id)) if i not in archived]
+        archive._move(session, 1, 0, moved)
+        session.commit()
+
+
+def test_strangers_cannot_restore_an_archived_visit(client, dataset):
+    user_id = 2  # bob, dataset.user_headers
+    theirs = _scalar(select(func.max(Visit.id)).where(Visit.user_id != user_id))
+    with Session(engine) as session:
+        archive._move(session, 0, 1, [theirs])
+        session.commit()
+
+    for method in ("PATCH", "DELETE"):
+        response = client.request(method, f"{API}/visits/{theirs}",
+                                  headers=dataset.user_headers, json={"notes": "mine now"})
+        assert response.status_code == 403, response.text
+    # The owner check came first: it's still archived.
+    assert _scalar(select(func.count()).where(VisitArchive.id == theirs)) == 1
+    assert _scalar(select(func.count()).where(Visit.id == theirs)) == 0
+
+    with Session(engine) as session:
+        archive.restore(session, theirs)
+        session.commit()
+
+
+
+def test_conflicts_include_archived_visits(client, dataset):
+    headers = dataset.user_headers
+    dog = client.post(f"{API}/dogs/", headers=headers, json={"name": "Old Timer"}).json()["id"]
+    start = datetime.now(timezone.utc) - timedelta(days=400)
+    visit = {
+        "park_id": 1,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=2)).isoformat(),
+        "dog_ids": [dog],
+    }
+    old = client.post(f"{API}/visits/", headers=headers, json=visit).json()["id"]
+    with Session(engine) as session:
+        archive._move(session, 0, 1, [old])
+        session.commit()
+
+    clash = client.post(f"{API}/visits/", headers=headers, json={
+        **visit, "start_time": (start + timedelta(hours=1)).isoformat(),
+    })
+    assert clash.status_code == 409, clash.text
+    assert [c["visit_id"] for c in clash.json()["detail"]["conflicts"]] == [old]
+
+    # Moving another visit onto it is caught the same way.
+    later = client.post(f"{API}/visits/", headers=headers, json={
+        **visit, "start_time": (start + timedelta(hours=3)).isoformat(),
+        "end_time": (start + timedelta(hours=4)).isoformat(),
+    }).json()["id"]
+    moved = client.patch(f"{API}/visits/{later}", headers=headers,
+                         json={"start_time": (start + timedelta(hours=1)).isoformat()})
+    assert moved.status_code == 409, moved.text
+
+    for visit_id in (later, old):
+        assert client.delete(f"{API}/visits/{visit_id}", headers=headers).status_code == 204
+    client.delete(f"{API}/dogs/{dog}", headers=headers)
@@ -0,0 +1,106 @@
+"""
+The batch endpoint (routers/batch.py, services/batch.py): per-item results,
+the size limit, trailing-slash redirects, rolling back a failed item, and
+Idempotency-Key on the batch as a whole.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, col, func, select
+
+from app.core.config import settings
+from app.database import engine
+from app.models import Dog, Visit, VisitDogLink
+
+API = "/api/v1"
+
+
+def _batch(client, headers, *requests):
+    return client.post(f"{API}/batch", headers=headers, json={"requests": list(requests)})
+
+
+def test_mixed_success_and_failure(client, dataset):
+    response = _batch(
+        client, dataset.user_headers,
+        {"method": "GET", "path": "/users/me"},
+        {"method": "GET", "path": "/dogs/999999999"},
+        {"method": "GET", "path": "/no-such-route"},
+        {"method": "GET", "path": "no-slash"},
+        {"method": "POST", "path": "/batch", "body": {"requests": []}},
+        {"method": "GET", "path": "/visits/dashboard-stats"},
+    )
+    assert response.status_code == 200, response.text
+    results = response.json()
+    assert [r["status"] for r in results] == [200, 404, 404, 400, 400, 200]
+    assert results[0]["body"]["id"] == 2  # bob, the batch's caller
+    assert results[1]["body"] == {"detail": "Dog not found"}
+
+
+def test_batch_size_limit(client, dataset):
+    item = {"method": "GET", "path": "/users/me"}
+    limit = settings.BATCH_MAX_REQUESTS
+    assert _batch(client, dataset.user_headers, *[item] * limit).status_code == 200
+    assert _batch(client, dataset.user_headers, *[item] * (limit + 1)).status_code == 413
+    assert _batch(client, dataset.user_headers).status_code == 400
+
+
+def test_follows_trailing_slash_redirects(client, dataset):
+    slash, no_slash = _batch(
+        client, dataset.user_headers,
+        {"method": "GET", "path": "/dogs/"},
+        {"method": "GET", "path": "/dogs"},
+    ).json()
+    assert no_slash["status"] == 200 and no_slash["body"] == slash["body"]
+
+
+def test_failed_item_leaves_nothing_for_the_next_to_commit(client, dataset):
+    headers = dataset.user_headers
+    mine = client.post(f"{API}/dogs/", headers=headers, json={"name": "Batch Dog"}).json()["id"]
+    theirs = client.post(f"{API}/dogs/", headers=dataset.admin_headers,
+                         json={"name": "Alice's Dog"}).json()["id"]  # checked after `mine`
+
+    def links() -> int:
+        with Session(engine) as session:
+            return session.exec(
+                select(func.count()).where(col(VisitDogLink.dog_id) == mine)
+            ).one()
+
+    start = datetime.now(timezone.utc) + timedelta(days=500)
+    results = _batch(
+        client, headers,
+        # Links `mine`, then fails on `theirs`: the pending link must not survive...
+        {"method": "POST", "path": "/visits/", "body": {
+            "park_id": 1,
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+            "dog_ids": [mine, theirs],
+        }},
+        # ...into this item's commit.
+        {"method": "POST", "path": "/dogs/", "body": {"name": "Batch Dog 2"}},
+    ).json()
+    assert [r["status"] for r in results] == [403, 201]
+    assert links() == 0
+    with Session(engine) as session:  # nor did the visit, flushed before the dogs were checked
+        assert session.exec(select(func.count()).where(
+            Visit.user_id == 2, Visit.start_time >= start,
+            Visit.start_time < start + timedelta(minutes=1),
+        )).one() == 0
+
+    client.delete(f"{API}/dogs/{mine}", headers=headers)
+    client.delete(f"{API}/dogs/{results[1]['body']['id']}", headers=headers)
+    client.delete(f"{API}/dogs/{theirs}", headers=dataset.admin_headers)
+
+
+def test_idempotency_key_covers_the_whole_batch(client, dataset):
+    headers = {**dataset.user_headers, "Idempotency-Key": f"batch-{dataset.visits}"}
+    item = {"method": "POST", "path": "/dogs/", "body": {"name": "Once Only"}}
+    first = _batch(client, headers, item)
+    retry = _batch(client, headers, item)
+    assert retry.headers["idempotency-replayed"] == "true"
+    assert retry.json() == first.json()
+
+    with Session(engine) as session:
+        assert session.exec(
+            select(func.count()).where(Dog.owner_id == 2, Dog.name == "Once Only")
+        ).one() == 1
+    client.delete(f"{API}/dogs/{first.json()[0]['body']['id']}", headers=headers)
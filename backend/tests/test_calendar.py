@@ -0,0 +1,74 @@
+"""
+Calendar feeds (services/calendar.py): conditional GETs, calendar tokens
+vs access tokens, rotating the links, and renames stamping park feeds.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session
+
+from app.database import engine
+from app.models import DogPark, User
+from app.services import calendar
+from conftest import count_queries
+
+API = "/api/v1"
+
+
+@pytest.fixture
+def token(client, dataset):
+    """Bob's calendar token; his links are back at version 0 afterwards."""
+    yield client.get(f"{API}/users/me/calendar", headers=dataset.user_headers).json()["token"]
+    with Session(engine) as session:  # the version other tests' tokens carry
+        user = session.get(User, 2)
+        user.calendar_token_version = 0
+        session.add(user)
+        session.commit()
+
+
+def test_feeds_revalidate_without_reading_visits(client, token):
+    feed = client.get(f"{API}/visits/my.ics", params={"token": token})
+    assert feed.headers["content-type"].startswith("text/calendar")
+    assert feed.text.startswith("BEGIN:VCALENDAR\r\n") and feed.text.endswith("END:VCALENDAR\r\n")
+    with count_queries() as usage:
+        unchanged = client.get(f"{API}/visits/my.ics", params={"token": token},
+                               headers={"If-None-Match": feed.headers["etag"]})
+    assert unchanged.status_code == 304
+    assert not any("FROM visits" in sql for sql, _ in usage.executed)
+
+    park = client.get(f"{API}/parks/1/calendar.ics", params={"token": token})
+    assert park.status_code == 200
+    unchanged = client.get(f"{API}/parks/1/calendar.ics", params={"token": token},
+                           headers={"If-Modified-Since": park.headers["last-modified"]})
+    assert unchanged.status_code == 304
+
+
+def test_calendar_and_access_tokens_dont_mix(client, dataset, token):
+    bearer = dataset.user_headers["Authorization"].removeprefix("Bearer ")
+    assert client.get(f"{API}/visits/my.ics", params={"token": bearer}).status_code == 401
+    assert client.get(f"{API}/users/me",
+                      headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+
+def test_rotating_revokes_earlier_links(client, dataset, token):
+    rotated = client.post(f"{API}/users/me/calendar/rotate", headers=dataset.user_headers).json()
+    assert rotated["token"] != token
+    assert client.get(f"{API}/visits/my.ics", params={"token": token}).status_code == 401
+    assert client.get(f"{API}/visits/my.ics", params={"token": rotated["token"]}).status_code == 200
+
+
+def test_rename_stamps_park_feeds(client, dataset):
+    start = datetime.now(timezone.utc) + timedelta(days=300)
+    visit = client.post(f"{API}/visits/", headers=dataset.user_headers, json={
+        "park_id": 1, "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(), "dog_ids": [],
+    }).json()
+    with Session(engine) as session:
+        before = session.get(DogPark, 1).visits_changed_at
+        calendar.user_renamed(session, session.get(User, 2))
+        session.commit()
+        session.expire_all()
+        assert session.get(DogPark, 1).visits_changed_at > before
+        assert session.get(User, 2).visits_changed_at > before
+    client.delete(f"{API}/visits/{visit['id']}", headers=dataset.user_headers)
@@ -0,0 +1,71 @@
+"""
+The orphan purge (services/cascade.py, `python maintenance.py purge-orphans`):
+rows left behind by deletes that skipped the cascades, as older versions'
+did, are counted, kept by --dry-run, and purged once.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, col, delete, select
+
+import maintenance
+from app.database import engine
+from app.models import Dog, ParkSlotStats, Visit, VisitDogLink
+from app.services import cascade
+
+API = "/api/v1"
+_GONE = 999_999  # a park id that doesn't exist
+
+
+def _slot_dogs(park_id: int, slot: datetime) -> int:
+    with Session(engine) as session:
+        stats = session.get(ParkSlotStats, (park_id, slot))
+        return stats.dog_count if stats else 0
+
+
+def test_purge_orphans(client, dataset, capsys):
+    headers = dataset.user_headers
+    dog = client.post(f"{API}/dogs/", headers=headers, json={"name": "Orphan Maker"}).json()["id"]
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    start += timedelta(days=480)
+    visit = client.post(f"{API}/visits/", headers=headers, json={
+        "park_id": 1, "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(), "dog_ids": [dog],
+    }).json()["id"]
+    assert _slot_dogs(1, start) == 1
+
+    # Deletes that skip the cascade, with nothing enforcing foreign keys.
+    with Session(engine) as session:
+        session.connection().exec_driver_sql("PRAGMA foreign_keys=OFF")
+        session.exec(delete(Dog).where(col(Dog.id) == dog))  # leaves its visit_dogs link
+        lost = Visit(park_id=_GONE, user_id=2, start_time=start,
+                     end_time=start + timedelta(hours=1))
+        session.add(lost)
+        session.flush()
+        lost_id = lost.id
+        session.add(VisitDogLink(visit_id=lost_id, dog_id=1))
+        session.add(ParkSlotStats(park_id=_GONE, slot_start=start, dog_count=1, medium_count=1))
+        session.commit()
+    expected = {
+        "visits": 1, "visits_archive": 0, "visit_dogs": 2, "visit_dogs_archive": 0,
+        "timeline_entries": 0, "park_slot_stats": 1,
+    }
+
+    maintenance.purge_orphans(dry_run=True)
+    assert "Would delete 2 orphaned row(s) from visit_dogs" in capsys.readouterr().out
+    with Session(engine) as session:
+        assert session.get(Visit, lost_id) is not None
+        assert session.exec(select(VisitDogLink).where(VisitDogLink.dog_id == dog)).first()
+    assert _slot_dogs(1, start) == 1
+
+    with Session(engine) as session:
+        assert cascade.purge_orphans(session) == expected
+        session.commit()
+    # The deleted dog no longer counts in its visit's slot.
+    assert _slot_dogs(1, start) == 0
+    with Session(engine) as session:
+        assert set(cascade.purge_orphans(session).values()) == {0}
+        session.commit()
+
+    assert client.delete(f"{API}/visits/{visit}", headers=headers).status_code == 204
+
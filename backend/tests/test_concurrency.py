@@ -0,0 +1,168 @@
+"""
+Concurrency limits (core/concurrency.py): route classes, the heavy class's
+adaptive (AIMD) limit, and shedding with 503 + Retry-After.
+
+The limiters are driven directly on a private event loop, around a stub
+app that holds its slot until told to finish; the last test goes through
+the app's own middleware stack.
+"""
+
+import asyncio
+
+import pytest
+
+from app.core import concurrency, metrics
+from app.core.config import settings
+
+API = "/api/v1"
+
+
+@pytest.fixture
+def private_metrics(monkeypatch):
+    """Keep these limiters' gauges out of the app's /metrics."""
+    monkeypatch.setattr(metrics, "_callbacks", {})
+
+
+@pytest.mark.parametrize(("method", "path", "expected"), [
+    ("GET", "/health", None),
+    ("GET", "/metrics", None),
+    ("POST", f"{API}/auth/login", "auth"),
+    ("POST", f"{API}/users/", "auth"),
+    ("GET", f"{API}/visits/", "heavy"),
+    ("GET", f"{API}/visits/feed", "heavy"),
+    ("GET", f"{API}/visits/my", "heavy"),
+    ("GET", f"{API}/visits/my.ics", "heavy"),
+    ("GET", f"{API}/visits/dashboard-stats", "heavy"),
+    ("GET", f"{API}/parks/1/calendar.ics", "heavy"),
+    ("GET", f"{API}/sync/", "heavy"),
+    ("POST", f"{API}/batch", "heavy"),
+    ("GET", f"{API}/visits/12", "default"),
+    ("GET", f"{API}/visits/mine", "default"),
+    ("POST", f"{API}/visits/", "default"),
+    ("GET", f"{API}/users/me", "default"),
+])
+def test_classify(method, path, expected):
+    assert concurrency.classify(method, path) == expected
+
+
+def test_adaptive_limit(private_metrics):
+    limiter = concurrency.Limiter("aimd", 8, min_limit=2, target=0.5)
+    limiter.limit = 4.0
+
+    limiter.in_flight = 1
+    limiter.release(0.1, failed=False)  # fast: + 1/limit
+    assert limiter.limit == pytest.approx(4.25)
+
+    limiter.in_flight = 1
+    limiter.release(0.9, failed=False)  # slow: x 0.9
+    assert limiter.limit == pytest.approx(4.25 * 0.9)
+    limiter.in_flight = 1
+    limiter.release(0.9, failed=False)  # ...at most once per target interval
+    assert limiter.limit == pytest.approx(4.25 * 0.9)
+
+    limiter._last_decrease = 0.0
+    limiter.in_flight = 1
+    limiter.release(0.1, failed=True)  # a 5xx counts as slow, however fast
+    assert limiter.limit == pytest.approx(4.25 * 0.81)
+
+    # Bounded on both sides.
+    limiter.limit = 2.0
+    limiter._last_decrease = 0.0
+    limiter.in_flight = 1
+    limiter.release(0.9, failed=False)
+    assert limiter.limit == 2
+    limiter.limit = 8.0
+    limiter.in_flight = 1
+    limiter.release(0.1, failed=False)
+    assert limiter.limit == 8
+
+
+def test_fixed_limits_never_adapt(private_metrics):
+    limiter = concurrency.Limiter("fixed", 4)
+    limiter.in_flight = 1
+    limiter.release(10.0, failed=True)
+    assert limiter.limit == 4 and limiter.in_flight == 0
+
+
+async def _request(middleware, path: str) -> dict:
+    """Run one GET through `middleware`; the response's status and headers."""
+    response: dict = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = dict(message["headers"])
+
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+    await middleware(scope, receive, send)
+    return response
+
+
+def _shed() -> dict[str, float]:
+    merged = metrics._merged()
+    return {
+        reason: merged.get((concurrency.SHED, ("heavy", reason)), 0.0)
+        for reason in ("queue_full", "timeout")
+    }
+
+
+def test_over_the_limit_is_shed_with_retry_after(monkeypatch, private_metrics):
+    monkeypatch.setattr(settings, "CONCURRENCY_QUEUE_SIZE", 1)
+    monkeypatch.setattr(settings, "CONCURRENCY_QUEUE_TIMEOUT", 0.05)
+
+    async def scenario():
+        finish = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await finish.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = concurrency.ConcurrencyLimitMiddleware(app)
+        heavy = middleware.limiters["heavy"]
+        heavy.limit = 1.0
+
+        holder = asyncio.create_task(_request(middleware, f"{API}/visits/feed"))
+        await asyncio.sleep(0)
+        assert heavy.in_flight == 1
+        waiter = asyncio.create_task(_request(middleware, f"{API}/visits/my"))
+        await asyncio.sleep(0)
+        # The queue (one place) is taken: shed at once.
+        full = await _request(middleware, f"{API}/visits/")
+        # The waiter gave up after CONCURRENCY_QUEUE_TIMEOUT.
+        timed_out = await waiter
+        # Other classes are unaffected, and so is /health.
+        default = asyncio.create_task(_request(middleware, f"{API}/visits/12"))
+        health = asyncio.create_task(_request(middleware, "/health"))
+        finish.set()
+        return full, timed_out, await holder, await default, await health, heavy
+
+    before = _shed()
+    full, timed_out, held, default, health, heavy = asyncio.run(scenario())
+
+    for response in (full, timed_out):
+        assert response["status"] == 503
+        assert response["headers"][b"retry-after"] == b"1"
+    assert [held["status"], default["status"], health["status"]] == [200, 200, 200]
+    assert heavy.in_flight == 0
+    assert _shed() == {
+        "queue_full": before["queue_full"] + 1, "timeout": before["timeout"] + 1,
+    }
+
+
+def test_shed_responses_carry_cors_headers(client, monkeypatch):
+    stack = client.app.middleware_stack or client.app.build_middleware_stack()
+    client.app.middleware_stack = stack
+    while not isinstance(stack, concurrency.ConcurrencyLimitMiddleware):
+        stack = stack.app
+    monkeypatch.setattr(stack.limiters["heavy"], "limit", 0.0)  # every request must queue...
+    monkeypatch.setattr(settings, "CONCURRENCY_QUEUE_SIZE", 0)  # ...and can't
+
+    origin = "http://localhost:5173"
+    response = client.get(f"{API}/visits/feed", headers={"Origin": origin})
+    assert response.status_code == 503
+    assert response.headers["access-control-allow-origin"] == origin
+    assert "retry-after" in response.headers["access-control-expose-headers"].lower()
@@ -0,0 +1,146 @@
+"""
+Idempotency keys (core/idempotency.py): replays, key reuse, duplicates
+that arrive while the first request is still running, and claim leases.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session, col, delete, update
+
+from app.core import idempotency
+from app.core.config import settings
+from app.database import engine
+from app.models import IdempotencyKey
+from app.models.park import DogPark
+from conftest import count_queries
+
+API = "/api/v1"
+PARK = {"name": "Idempotent Park", "address": "3 Retry Row"}
+
+
+@pytest.fixture
+def key(request, dataset):
+    """A key of bob's (user 2), and the parks created with it removed afterwards."""
+    yield f"{request.node.name}-{dataset.visits}"
+    with Session(engine) as session:
+        session.exec(delete(IdempotencyKey).where(col(IdempotencyKey.user_id) == 2))
+        session.exec(delete(DogPark).where(col(DogPark.name) == PARK["name"]))
+        session.commit()
+
+
+def _back_to_running(key: str, lease: timedelta) -> None:
+    """Turn a stored response back into the claim of a first request still running."""
+    with Session(engine) as session:
+        session.exec(update(IdempotencyKey).where(
+            col(IdempotencyKey.user_id) == 2, col(IdempotencyKey.key) == key,
+        ).values(status_code=None, body=None, expires_at=datetime.now(timezone.utc) + lease))
+        session.commit()
+
+
+def test_only_the_routes_themselves_are_covered():
+    assert idempotency.IDEMPOTENT_ROUTES.match(f"{API}/parks/")
+    # "/parks" is a 307 to "/parks/"; storing the redirect would replay it forever.
+    assert not idempotency.IDEMPOTENT_ROUTES.match(f"{API}/parks")
+    assert not idempotency.IDEMPOTENT_ROUTES.match(f"{API}/parks/1")
+
+
+def test_replay_headers(client, dataset, key):
+    headers = {**dataset.user_headers, "Idempotency-Key": key}
+    first = client.post(f"{API}/parks/", headers=headers, json=PARK)
+    assert first.status_code == 201 and "idempotency-replayed" not in first.headers
+
+    retry = client.post(f"{API}/parks/", headers=headers, json=PARK)
+    assert retry.status_code == 201 and retry.json() == first.json()
+    assert retry.headers["idempotency-replayed"] == "true"
+    assert retry.headers["content-type"] == "application/json"
+    assert int(retry.headers["content-length"]) == len(retry.content)
+
+
+def test_replay_is_one_lookup(client, dataset, key):
+    headers = {**dataset.user_headers, "Idempotency-Key": key}
+    first = client.post(f"{API}/parks/", headers=headers, json=PARK)
+    # The retry is answered from the stored response: no second park.
+    with count_queries() as usage:
+        retry = client.post(f"{API}/parks/", headers=headers, json=PARK)
+    assert retry.json() == first.json() and usage.statements == 1
+
+
+def test_redirected_post_is_stored_once(client, dataset, key):
+    headers = {**dataset.user_headers, "Idempotency-Key": key}
+    first = client.post(f"{API}/parks", headers=headers, json=PARK)  # follows the 307
+    assert first.status_code == 201
+    retry = client.post(f"{API}/parks", headers=headers, json=PARK)
+    assert retry.status_code == 201 and retry.json() == first.json()
+
+
+def test_fingerprint_mismatch_is_422(client, dataset, key):
+    headers = {**dataset.user_headers, "Idempotency-Key": key}
+    assert client.post(f"{API}/parks/", headers=headers, json=PARK).status_code == 201
+    other = client.post(f"{API}/parks/", headers=headers, json={**PARK, "address": "Elsewhere"})
+    assert other.status_code == 422
+    # Same body, another route: also a different request.
+    assert client.post(f"{API}/dogs/", headers=headers, json=PARK).status_code == 422
+
+
+def test_concurrent_duplicate_is_409(client, dataset, key, monkeypatch):
+    monkeypatch.setattr(settings, "IDEMPOTENCY_WAIT_SECONDS", 0.1)
+    headers = {**dataset.user_headers, "Idempotency-Key": key}
+    client.post(f"{API}/parks/", headers=headers, json=PARK)
+    _back_to_running(key, lease=timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS))
+    duplicate = client.post(f"{API}/parks/", headers=headers, json=PARK)
+    assert duplicate.status_code == 409 and duplicate.headers["retry-after"] == "1"
+
+
+def test_claims_are_leases_not_the_ttl(client, dataset, key):
+    headers = {**dataset.user_headers, "Idempotency-Key": key}
+    first = client.post(f"{API}/parks/", headers=headers, json=PARK)
+    # A first request that died: its claim lapses and the key can be used again.
+    _back_to_running(key, lease=timedelta(seconds=-1))
+    taken_over = client.post(f"{API}/parks/", headers=headers, json=PARK)
+    assert taken_over.status_code == 201 and "idempotency-replayed" not in taken_over.headers
+    assert taken_over.json()["id"] != first.json()["id"]
+
+    # The stored response is kept for the full TTL.
+    with Session(engine) as session:
+        row = session.get(IdempotencyKey, (2, key))
+        assert row.status_code == 201
+        ttl = row.expires_at - datetime.now(timezone.utc)
+        assert ttl > timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS) - timedelta(minutes=1)
+
+
+def test_claim_lease_length(client, dataset, key, monkeypatch):
+    leases = []
+    claim = idempotency._claim
+
+    def spy(user_id, key, fingerprint, lease):
+        leases.append(lease - datetime.now(timezone.utc))
+        return claim(user_id, key, fingerprint, lease)
+
+    monkeypatch.setattr(idempotency, "_claim", spy)
+    headers = {**dataset.user_headers, "Idempotency-Key": key}
+    assert client.post(f"{API}/parks/", headers=headers, json=PARK).status_code == 201
+    assert 0 < leases[0].total_seconds() <= settings.IDEMPOTENCY_LEASE_SECONDS
+
+
+def test_lapsed_claim_cant_touch_its_successor(dataset, key):
+    now = datetime.now(timezone.utc)
+    lapsed = now - timedelta(seconds=1)
+    assert idempotency._claim(2, key, "a" * 64, lapsed) is None
+    # Its lease ran out; a retry (of another body, even) takes the key over.
+    successor = now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+    assert idempotency._claim(2, key, "b" * 64, successor) is None
+
+    def row() -> IdempotencyKey:
+        with Session(engine) as session:
+            return session.get(IdempotencyKey, (2, key))
+
+    # The first request finishing, or failing, leaves the successor's claim alone.
+    idempotency._finish(2, key, "a" * 64, lapsed, 201, b"{}")
+    idempotency._finish(2, key, "a" * 64, lapsed, 500, b"")
+    claimed = row()
+    assert claimed.fingerprint == "b" * 64 and claimed.status_code is None
+    assert claimed.expires_at == successor
+
+    idempotency._finish(2, key, "b" * 64, successor, 201, b"{}")
+    assert row().status_code == 201
@@ -0,0 +1,66 @@
+"""
+The index advisor's CI gate (index_advisor.py --check): a new scan of a
+table of --min-rows or more fails it; one listed in the baseline doesn't.
+
+`report` returns the findings --check exits 1 on.
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event, func
+from sqlmodel import Session, select
+
+import index_advisor
+from app.database import engine
+from app.models import Visit
+
+API = "/api/v1"
+BASELINE = Path(index_advisor.__file__).with_name("index_advisor_baseline.json")
+
+
+@pytest.fixture
+def recorder():
+    recorder = index_advisor.Recorder(engine)
+    yield recorder
+    event.remove(engine, "before_cursor_execute", recorder._on_execute)
+
+
+def _capture(recorder, route: str, make_request) -> None:
+    recorder.route = route
+    try:
+        make_request()
+    finally:
+        recorder.route = None
+
+
+def test_new_scans_fail_the_check(recorder, dataset):
+    def scan_visits() -> None:
+        with Session(engine) as session:
+            session.exec(select(Visit).where(Visit.notes == "no index on notes")).all()
+
+    _capture(recorder, "GET /api/v1/new-route", scan_visits)
+    findings = index_advisor.analyse(engine, recorder.statements)
+    assert [(f.table, f.kind) for f in findings] == [("visits", "full scan")]
+    with Session(engine) as session:
+        rows = session.exec(select(func.count()).select_from(Visit)).one()
+
+    known = set(json.loads(BASELINE.read_text()))
+    assert index_advisor.report(findings, rows, known) == [
+        "GET /api/v1/new-route | visits | full scan"
+    ]
+    # Smaller than --min-rows: reported, but not failing.
+    assert index_advisor.report(findings, rows + 1, known) == []
+
+
+def test_baselined_scans_pass_the_check(client, recorder, dataset):
+    route = "GET /api/v1/parks/"
+    _capture(recorder, route,
+             lambda: client.get(f"{API}/parks/", headers=dataset.user_headers))
+    findings = index_advisor.analyse(engine, recorder.statements)
+    assert f"{route} | dog_parks | full scan" in {k for f in findings for k in f.keys()}
+
+    known = set(json.loads(BASELINE.read_text()))
+    assert index_advisor.report(findings, 0, known) == []
+    assert index_advisor.report(findings, 0, set()) != []  # only the baseline lets it pass
@@ -0,0 +1,93 @@
+"""
+The job queue (services/jobs.py): reclaimed jobs, attempt limits and the
+single hourly housekeeping job.
+
+Jobs here are enqueued due a year ago, so `run_one()` claims them ahead of
+anything else earlier tests left queued.
+"""
+
+from sqlmodel import Session, col, delete, select
+
+from app.database import engine
+from app.models import Job
+from app.services import jobs
+
+_OVERDUE = -365 * 24 * 3600.0
+
+
+def _enqueue(task: str, key: str, **kwargs) -> Job:
+    with Session(engine) as session:
+        jobs.enqueue(session, task, idempotency_key=key, delay=_OVERDUE, **kwargs)
+        session.commit()
+        return session.exec(select(Job).where(Job.idempotency_key == key)).one()
+
+
+def _job(key: str) -> Job:
+    with Session(engine) as session:
+        return session.exec(select(Job).where(Job.idempotency_key == key)).one()
+
+
+def _expire_lease(job_id: int) -> None:
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        job.locked_until = job.run_at
+        session.add(job)
+        session.commit()
+
+
+def _cleanup(*keys: str) -> None:
+    with Session(engine) as session:
+        session.exec(delete(Job).where(col(Job.idempotency_key).in_(keys)))
+        session.commit()
+
+
+def test_a_reclaimed_job_keeps_the_new_owners_outcome(dataset):
+    calls = []
+
+    @jobs.job_handler("tests.slow")
+    def slow(session: Session) -> None:
+        calls.append(len(calls))
+        if len(calls) == 1:
+            # Worker 1 overruns its deadline; worker 2 reclaims and finishes the job...
+            _expire_lease(job.id)
+            assert jobs.run_one()
+            # ...then worker 1 fails, too late for its outcome to count.
+            raise RuntimeError("worker 1 gave up")
+
+    job = _enqueue("tests.slow", "tests:slow")
+    assert jobs.run_one()
+    assert calls == [0, 1]
+    finished = _job("tests:slow")
+    assert (finished.status, finished.attempts, finished.last_error) == ("done", 2, None)
+    assert finished.claim_token is None and finished.locked_until is None
+    _cleanup("tests:slow")
+
+
+def test_no_reclaim_past_max_attempts(dataset):
+    @jobs.job_handler("tests.lost")
+    def lost(session: Session) -> None:
+        _expire_lease(job.id)  # its worker "died" on the last attempt
+
+    job = _enqueue("tests.lost", "tests:lost", max_attempts=1)
+    assert jobs.run_one()
+    with Session(engine) as session:  # as if the outcome was never written
+        row = session.get(Job, job.id)
+        row.status, row.locked_until = "running", row.run_at
+        session.add(row)
+        session.commit()
+
+    jobs.run_one()  # whatever else is due, not this one
+    assert _job("tests:lost").status == "running"
+    assert jobs.fail_abandoned() >= 1
+    abandoned = _job("tests:lost")
+    assert abandoned.status == "failed" and abandoned.last_error.startswith("Abandoned")
+    _cleanup("tests:lost")
+
+
+def test_housekeeping_runs_once_per_hour(dataset):
+    for _ in range(3):  # three workers polling
+        jobs.schedule_housekeeping()
+    with Session(engine) as session:
+        hourly = session.exec(select(Job).where(Job.task == jobs.HOUSEKEEPING)).all()
+    assert len(hourly) == 1
+    _cleanup(hourly[0].idempotency_key)
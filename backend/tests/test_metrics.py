@@ -0,0 +1,75 @@
+"""
+Metrics (core/metrics.py): the /metrics exposition after real requests,
+and per-thread shards outliving their threads.
+"""
+
+import threading
+
+from app.core import metrics
+from app.database import engine
+
+API = "/api/v1"
+
+_THREADS = metrics.Counter("test_thread_writes_total", "Writes from short-lived threads")
+
+
+def test_exited_threads_shards_are_folded_away():
+    def write() -> None:
+        _THREADS.inc()
+        _THREADS.inc()
+
+    before = metrics._merged().get((_THREADS, ()), 0.0)
+    threads = [threading.Thread(target=write) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+        thread.join()  # one at a time, as a threadpool scaling up and down would
+
+    merged = metrics._merged()
+    assert merged[(_THREADS, ())] == before + 100  # nothing lost
+    assert not any(thread in threads for thread, _ in metrics._shards)
+    assert len(metrics._shards) <= threading.active_count()
+
+
+def _scrape(client) -> dict[str, float]:
+    """Every sample of /metrics: series (name and labels) -> value."""
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            series, value = line.rsplit(" ", 1)
+            samples[series] = float(value)
+    return samples
+
+
+def test_request_latency_by_route_template(client, dataset):
+    route = 'method="GET",route="/api/v1/parks/{park_id}",status="200"'
+    before = _scrape(client).get(f"http_request_duration_seconds_count{{{route}}}", 0)
+    assert client.get(f"{API}/parks/1", headers=dataset.user_headers).status_code == 200
+    client.get(f"{API}/no-such-route")
+    samples = _scrape(client)
+
+    buckets = [
+        value for series, value in samples.items()
+        if series.startswith(f"http_request_duration_seconds_bucket{{{route},le=")
+    ]
+    bounds = [*(repr(float(b)) for b in metrics.HTTP_REQUEST_SECONDS.buckets), "+Inf"]
+    assert len(buckets) == len(bounds)
+    assert buckets == sorted(buckets)  # cumulative
+    count = samples[f"http_request_duration_seconds_count{{{route}}}"]
+    assert buckets[-1] == count == before + 1
+    assert samples[f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}'] == count
+    # Unmatched paths share one series instead of one per URL.
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}' \
+        in samples
+
+
+def test_db_pool_and_cache_series(client, dataset):
+    miss = 'cache_requests_total{cache="thumbnails",result="miss"}'
+    before = _scrape(client).get(miss, 0)
+    client.get(f"{API}/media/thumbs/{'0' * 64}.png")  # no thumbnail: a miss (and a 404)
+    samples = _scrape(client)
+    assert samples[miss] == before + 1
+    assert samples['db_query_duration_seconds_count{operation="SELECT"}'] > 0
+    if hasattr(engine.pool, "checkedout"):
+        assert samples["db_pool_checked_out_connections"] >= 0
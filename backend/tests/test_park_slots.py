@@ -0,0 +1,166 @@
+"""
+Slot aggregates (services/park_slots.py): after every kind of visit or dog
+write, the incrementally maintained rows must equal what `rebuild()`
+computes from scratch.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session, select
+
+from app.database import engine
+from app.models import ParkSlotStats
+from app.services import park_slots
+
+API = "/api/v1"
+_COUNTERS = ("dog_count", "small_count", "medium_count", "large_count", "unsocial_count")
+
+
+def _live_rows() -> dict:
+    """Live slots with any dog in them: (park_id, slot_start) -> counters."""
+    with Session(engine) as session:
+        rows = session.exec(
+            select(ParkSlotStats).where(ParkSlotStats.slot_start >= park_slots.live_from())
+        ).all()
+    assert all(getattr(row, name) >= 0 for row in rows for name in _COUNTERS)
+    return {
+        (row.park_id, park_slots.to_utc_naive(row.slot_start)): tuple(
+            getattr(row, name) for name in _COUNTERS
+        )
+        for row in rows
+        if any(getattr(row, name) for name in _COUNTERS)
+    }
+
+
+def assert_matches_rebuild() -> None:
+    incremental = _live_rows()
+    with Session(engine) as session:
+        park_slots.rebuild(session)
+        session.commit()
+    assert incremental == _live_rows()
+
+
+@pytest.fixture
+def dogs(client, dataset):
+    """Two of bob's dogs, deleted again afterwards."""
+    headers = dataset.user_headers
+    made = [
+        client.post(f"{API}/dogs/", headers=headers, json=body).json()["id"]
+        for body in ({"name": "Slot Small", "size": "small"},
+                     {"name": "Slot Grumpy", "size": "large", "good_with_others": False})
+    ]
+    assert_matches_rebuild()  # start from a clean slate
+    yield made
+    for dog_id in made:
+        client.delete(f"{API}/dogs/{dog_id}", headers=headers)
+    assert_matches_rebuild()
+
+
+def _visit(client, headers, start: datetime, hours: float, dog_ids: list[int],
+           park_id: int = 1) -> int:
+    response = client.post(f"{API}/visits/", headers=headers, json={
+        "park_id": park_id,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=hours)).isoformat(),
+        "dog_ids": dog_ids,
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def test_visit_writes_match_rebuild(client, dataset, dogs):
+    headers = dataset.user_headers
+    small, grumpy = dogs
+    start = datetime.now(timezone.utc).replace(minute=15) + timedelta(days=350)
+
+    visit_id = _visit(client, headers, start, 2.5, [small])
+    assert_matches_rebuild()
+
+    # New times.
+    client.patch(f"{API}/visits/{visit_id}", headers=headers, json={
+        "start_time": (start + timedelta(hours=1)).isoformat(),
+        "end_time": (start + timedelta(hours=4)).isoformat(),
+    })
+    assert_matches_rebuild()
+
+    # New dogs.
+    client.patch(f"{API}/visits/{visit_id}", headers=headers, json={"dog_ids": [grumpy]})
+    assert_matches_rebuild()
+
+    # A dog's attributes change.
+    client.patch(f"{API}/dogs/{grumpy}", headers=headers, json={"size": "medium"})
+    assert_matches_rebuild()
+
+    client.delete(f"{API}/visits/{visit_id}", headers=headers)
+    assert_matches_rebuild()
+
+
+def test_rejected_edit_changes_no_slots(client, dataset, dogs):
+    headers = dataset.user_headers
+    start = datetime.now(timezone.utc) + timedelta(days=360)
+    visit_id = _visit(client, headers, start, 2, [dogs[0]])
+    before = _live_rows()
+
+    theirs = client.post(f"{API}/dogs/", headers=dataset.admin_headers,
+                         json={"name": "Not Bob's"}).json()["id"]
+    rejected = client.patch(f"{API}/visits/{visit_id}", headers=headers,
+                            json={"dog_ids": [dogs[1], theirs]})
+    assert rejected.status_code == 403
+    assert _live_rows() == before
+    assert [d["id"] for d in client.get(f"{API}/visits/{visit_id}", headers=headers)
+            .json()["dogs"]] == [dogs[0]]
+
+    client.delete(f"{API}/visits/{visit_id}", headers=headers)
+    client.delete(f"{API}/dogs/{theirs}", headers=dataset.admin_headers)
+    assert_matches_rebuild()
+
+
+def test_past_visits_never_go_negative(client, dataset, dogs):
+    headers = dataset.user_headers
+    now = datetime.now(timezone.utc)
+    past = _visit(client, headers, now - timedelta(days=2), 2, [dogs[0]])
+    ongoing = _visit(client, headers, now - timedelta(hours=3), 5, [dogs[1]])
+    with Session(engine) as session:  # the past visit's slots are gone, as after a while
+        park_slots.rebuild(session)
+        session.commit()
+
+    client.patch(f"{API}/visits/{ongoing}", headers=headers, json={"dog_ids": [dogs[0]]})
+    assert_matches_rebuild()
+    for visit_id in (past, ongoing):
+        assert client.delete(f"{API}/visits/{visit_id}", headers=headers).status_code == 204
+    assert_matches_rebuild()  # and `_live_rows` checked nothing went below zero
+
+
+def test_empty_hours_outrank_an_unsocial_dog(client, dataset, dogs):
+    headers = dataset.user_headers
+    small, grumpy = dogs
+    park = client.post(f"{API}/parks/", headers=headers,
+                       json={"name": "Quiet Park", "address": "1 Empty Lane"}).json()["id"]
+    now = park_slots.live_from().replace(tzinfo=timezone.utc)
+    # Grumpy fills the next 23 hours; the small dog plans the 24th itself.
+    _visit(client, headers, now, 23, [grumpy], park_id=park)
+    _visit(client, headers, now + timedelta(hours=23), 1, [small], park_id=park)
+
+    recommended = client.get(f"{API}/dogs/{small}/recommendations", headers=headers,
+                             params={"park_id": park, "days": 1, "limit": 24}).json()
+    assert len(recommended) == 24
+    best, *rest = recommended
+    # Not scored against itself: the hour it's already booked is empty.
+    assert best["slot_start"].startswith((now + timedelta(hours=23)).strftime("%Y-%m-%dT%H"))
+    assert best["score"] == 100 and best["dog_count"] == 0
+    assert all(slot["unsocial_count"] == 1 and slot["score"] < 100 for slot in rest)
+
+    client.delete(f"{API}/parks/{park}", headers=headers)
+
+
+def test_prune_drops_past_slots(dataset):
+    slot = park_slots.live_from() - timedelta(days=1)
+    with Session(engine) as session:
+        session.add(ParkSlotStats(park_id=1, slot_start=slot, dog_count=1, medium_count=1))
+        session.commit()
+        assert park_slots.prune(session) >= 1
+        session.commit()
+        assert session.exec(
+            select(ParkSlotStats).where(ParkSlotStats.slot_start < park_slots.live_from())
+        ).first() is None
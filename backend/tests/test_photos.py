@@ -0,0 +1,114 @@
+"""
+Dog photos (services/photos.py, routers/media.py): content-addressed
+uploads, rejected bodies, immutable caching and the thumbnail job.
+"""
+
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from PIL import Image
+from sqlmodel import Session, col, delete, select
+
+from app.core.config import settings
+from app.database import engine
+from app.models import Job
+from app.services import jobs, photos
+
+API = "/api/v1"
+
+
+def _png(color: tuple[int, int, int], size=(640, 480)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _upload(client, headers, dog_id: int, body: bytes, filename="dog.png"):
+    return client.post(f"{API}/dogs/{dog_id}/photo", headers=headers,
+                       files={"file": (filename, body, "image/png")})
+
+
+@pytest.fixture
+def dog(client, dataset):
+    """One of bob's dogs, deleted again afterwards with any thumbnail jobs left queued."""
+    dog_id = client.post(f"{API}/dogs/", headers=dataset.user_headers,
+                         json={"name": "Photogenic"}).json()["id"]
+    yield dog_id
+    client.delete(f"{API}/dogs/{dog_id}", headers=dataset.user_headers)
+    with Session(engine) as session:
+        session.exec(delete(Job).where(
+            col(Job.task) == "photos.thumbnail", col(Job.status) == "queued",
+        ))
+        session.commit()
+
+
+def test_same_bytes_are_stored_once(client, dataset, dog):
+    headers = dataset.user_headers
+    other = client.post(f"{API}/dogs/", headers=headers, json={"name": "Lookalike"}).json()["id"]
+    body = _png((dataset.visits % 256, 1, 2))
+
+    first = _upload(client, headers, dog, body)
+    second = _upload(client, headers, other, body, filename="copy.png")
+    assert first.status_code == second.status_code == 200, first.text
+    assert first.json()["photo_url"] == second.json()["photo_url"]
+
+    name = first.json()["photo_url"].rsplit("/", 1)[1]
+    digest = name.split(".")[0]
+    assert [p.name for p in photos.photo_path(name).parent.glob(f"{digest}.*")] == [name]
+    assert not any((photos.media_root() / "tmp").iterdir())  # no temp files left behind
+    client.delete(f"{API}/dogs/{other}", headers=headers)
+
+
+def test_rejected_uploads(client, dataset, dog, monkeypatch):
+    headers = dataset.user_headers
+    assert _upload(client, headers, dog, b"just some text, honestly").status_code == 415
+    assert client.post(f"{API}/dogs/{dog}/photo", headers=headers,
+                       json={"file": "nope"}).status_code == 400
+
+    monkeypatch.setattr(settings, "PHOTO_MAX_BYTES", 1000)
+    assert _upload(client, headers, dog, _png((9, 9, 9))).status_code == 413
+    assert client.get(f"{API}/dogs/{dog}", headers=headers).json()["photo_url"] is None
+    assert not any((photos.media_root() / "tmp").iterdir())
+
+
+def test_photos_are_immutable_and_revalidate_to_304(client, dataset, dog):
+    url = _upload(client, dataset.user_headers, dog, _png((3, dataset.visits % 256, 5))).json()[
+        "photo_url"]
+    photo = client.get(url)
+    assert photo.status_code == 200 and photo.headers["content-type"] == "image/png"
+    assert photo.headers["cache-control"] == "public, max-age=31536000, immutable"
+
+    again = client.get(url, headers={"If-None-Match": photo.headers["etag"]})
+    assert again.status_code == 304 and again.content == b""
+
+
+def test_thumbnail_job(client, dataset, dog):
+    dog_json = _upload(client, dataset.user_headers, dog, _png((7, 8, dataset.visits % 256))).json()
+    name = dog_json["photo_url"].rsplit("/", 1)[1]
+    assert dog_json["photo_thumbnail_url"] == f"{API}/media/thumbs/{name}"
+
+    # Until the job has run, the thumbnail URL serves the original, uncached.
+    pending = client.get(dog_json["photo_thumbnail_url"])
+    assert pending.headers["content-type"] == "image/png"
+    assert pending.headers["cache-control"] == "no-cache"
+
+    key = f"thumbnail:{name}"
+    with Session(engine) as session:  # make it the first job due
+        job = session.exec(select(Job).where(Job.idempotency_key == key)).one()
+        assert job.task == "photos.thumbnail"
+        job.run_at = datetime.now(timezone.utc) - timedelta(days=365)
+        session.add(job)
+        session.commit()
+    assert jobs.run_one()
+    with Session(engine) as session:
+        assert session.exec(select(Job.status).where(Job.idempotency_key == key)).one() == "done"
+        session.exec(delete(Job).where(col(Job.idempotency_key) == key))
+        session.commit()
+
+    assert photos.thumbnail_path(name.split(".")[0]).exists()
+    thumb = client.get(dog_json["photo_thumbnail_url"])
+    assert thumb.headers["content-type"] == "image/jpeg"
+    assert thumb.headers["cache-control"] == "public, max-age=31536000, immutable"
+    with Image.open(io.BytesIO(thumb.content)) as image:
+        assert max(image.size) == settings.THUMBNAIL_SIZE
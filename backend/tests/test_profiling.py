@@ -0,0 +1,50 @@
+"""
+On-demand profiling (core/profiling.py): only admins get a profile, and
+asking for one costs no extra rate-limit token.
+
+The middleware is only installed with PROFILING_ENABLED, so the tests wrap
+the app in it themselves.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import rate_limit
+from app.core.config import settings
+from app.core.profiling import ProfilingMiddleware
+
+API = "/api/v1"
+PROFILE = {"X-Profile": "1"}
+
+
+@pytest.fixture
+def profiled(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILE_EVERY_N", 0)
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+    return TestClient(ProfilingMiddleware(client.app))
+
+
+def test_only_admins_are_profiled(profiled, dataset, tmp_path):
+    ignored = profiled.get(f"{API}/users/me", headers={**dataset.user_headers, **PROFILE})
+    assert ignored.status_code == 200
+    assert "x-profile-summary" not in ignored.headers
+    assert list(tmp_path.iterdir()) == []
+
+    response = profiled.get(f"{API}/users/me", headers={**dataset.admin_headers, **PROFILE})
+    assert response.status_code == 200
+    summary = response.headers["x-profile-summary"]
+    assert summary.startswith("samples=")
+    [written] = tmp_path.iterdir()
+    assert f"file={written.name};" in summary
+
+
+def test_profiling_takes_no_rate_limit_token(profiled, dataset, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMITS_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "_store", rate_limit.MemoryStore(max_keys=100))
+    monkeypatch.setattr(rate_limit, "_limits", {
+        **rate_limit._limits, "reads": rate_limit.parse_limit("1/hour"),
+    })
+    headers = {**dataset.admin_headers, **PROFILE}
+    response = profiled.get(f"{API}/users/me", headers=headers)
+    assert response.status_code == 200 and "x-profile-summary" in response.headers
+    assert profiled.get(f"{API}/users/me", headers=headers).status_code == 429
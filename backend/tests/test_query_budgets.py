@@ -0,0 +1,309 @@
+"""
+Query budgets: every auth/users/dogs/parks/visits/sync route, at 10 and 10,000 visits.
+
+Each route declares the most SQL statements it may issue and a rough
+latency ceiling.  Both must hold at either dataset size, so a loop that
+queries once per row (N+1) fails here instead of in production.  When a
+route legitimately needs another statement, raise its budget in the same
+change and say why in the review.
+"""
+
+import io
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from fastapi.routing import APIRoute
+from PIL import Image
+from sqlmodel import Session, col, select
+
+from app.database import engine
+from app.main import app
+from app.models import Dog, Follow, User, Visit
+from app.services import archive
+from conftest import count_queries
+
+API = "/api/v1"
+
+
+@dataclass(frozen=True)
+class Budget:
+    statements: int
+    ms: float = 250.0
+
+
+BCRYPT_MS = 2_000.0  # routes that hash or verify a password
+
+BUDGETS: dict[tuple[str, str], Budget] = {
+    # --- auth ---
+    ("POST", "/auth/register"): Budget(3, BCRYPT_MS),
+    ("POST", "/auth/login"): Budget(1, BCRYPT_MS),
+    # --- users ---
+    ("GET", "/users/me"): Budget(1),
+    ("PATCH", "/users/me"): Budget(3),
+    ("POST", "/users/me/change-password"): Budget(2, BCRYPT_MS),
+    ("GET", "/users/me/calendar"): Budget(1),
+    ("POST", "/users/me/calendar/rotate"): Budget(3),  # bump the version, reload the user
+    ("GET", "/users/me/following"): Budget(2),
+    ("GET", "/users/me/followers"): Budget(2),
+    ("POST", "/users/{user_id}/follow"): Budget(5),
+    ("DELETE", "/users/{user_id}/follow"): Budget(4),
+    ("GET", "/users/"): Budget(3),
+    ("POST", "/users/"): Budget(4, BCRYPT_MS),
+    ("POST", "/users/import"): Budget(3, BCRYPT_MS),
+    ("PATCH", "/users/{user_id}"): Budget(5),
+    ("DELETE", "/users/{user_id}"): Budget(3),
+    # --- dogs ---
+    ("GET", "/dogs/"): Budget(2),
+    ("GET", "/dogs/search"): Budget(2),
+    ("POST", "/dogs/"): Budget(4),  # + reserves a sync sequence number
+    ("GET", "/dogs/{dog_id}"): Budget(2),
+    ("PATCH", "/dogs/{dog_id}"): Budget(7),
+    ("POST", "/dogs/{dog_id}/photo"): Budget(6),
+    ("DELETE", "/dogs/{dog_id}"): Budget(8),  # + DELETE of hot and archived links; + tombstone
+    ("GET", "/dogs/{dog_id}/recommendations"): Budget(5),  # + parks; + its own visits
+    # --- parks ---
+    ("GET", "/parks/"): Budget(2),
+    ("POST", "/parks/"): Budget(4),
+    ("GET", "/parks/{park_id}"): Budget(2),
+    ("PATCH", "/parks/{park_id}"): Budget(7),  # + stamps its visitors' calendar feeds
+    ("DELETE", "/parks/{park_id}"): Budget(13),  # one DELETE per dependent table; tombstones
+    ("GET", "/parks/{park_id}/calendar.ics"): Budget(3),
+    # --- visits ---
+    ("POST", "/visits/"): Budget(17),  # + calendar stamps; re-sequenced; overlap check
+    ("GET", "/visits/"): Budget(6),  # history: hot + archive
+    ("GET", "/visits/my"): Budget(4),  # hot + archive
+    ("GET", "/visits/my.ics"): Budget(2),
+    ("GET", "/visits/upcoming-activity"): Budget(5),
+    ("GET", "/visits/dashboard-stats"): Budget(3),
+    ("GET", "/visits/feed"): Budget(4),
+    ("GET", "/visits/{visit_id}"): Budget(6),  # + the archive, if it isn't hot
+    ("PATCH", "/visits/{visit_id}"): Budget(22),  # re-sequenced once dogs change; overlap check
+    ("DELETE", "/visits/{visit_id}"): Budget(11),  # + tombstone
+    # --- sync ---
+    ("GET", "/sync/"): Budget(7),  # one range read per table (and archive) + tombstones
+}
+
+
+def call(client, method: str, template: str, *, status: int = 200, path=None, **kwargs):
+    """Request `template` (formatted with `path`) and enforce its budget."""
+    budget = BUDGETS[(method, template)]
+    with count_queries() as usage:
+        resp = client.request(method, API + template.format(**(path or {})), **kwargs)
+    assert resp.status_code == status, resp.text
+    assert usage.statements <= budget.statements, (
+        f"{method} {template}: {usage.statements} SQL statements, budget {budget.statements}"
+    )
+    assert usage.elapsed_ms <= budget.ms, (
+        f"{method} {template}: {usage.elapsed_ms:.0f} ms, budget {budget.ms:.0f} ms"
+    )
+    return resp
+
+
+def _first(stmt):
+    with Session(engine) as session:
+        return session.exec(stmt).first()
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "brown").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# The budget table itself
+# ---------------------------------------------------------------------------
+def test_every_route_has_a_budget():
+    prefixes = tuple(f"{API}/{name}/" for name in ("auth", "users", "dogs", "parks", "visits", "sync"))
+    routes = {
+        (method, route.path.removeprefix(API))
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.path.startswith(prefixes)
+        for method in route.methods
+    }
+    assert routes == set(BUDGETS)
+
+
+# ---------------------------------------------------------------------------
+# auth
+# ---------------------------------------------------------------------------
+def test_auth(client, dataset):
+    call(client, "POST", "/auth/register", status=201, json={
+        "email": "budget@example.com", "username": "budget", "password": "budgetpass",
+    })
+    call(client, "POST", "/auth/login", data={"username": "budget", "password": "budgetpass"})
+
+
+# ---------------------------------------------------------------------------
+# users
+# ---------------------------------------------------------------------------
+def test_users_me(client, dataset):
+    headers = dataset.user_headers
+    call(client, "GET", "/users/me", headers=headers)
+    call(client, "PATCH", "/users/me", headers=headers, json={"full_name": "Bob Budget"})
+    call(client, "POST", "/users/me/change-password", status=204, headers=headers, json={
+        "current_password": "password123", "new_password": "password123",
+    })
+    call(client, "GET", "/users/me/following", headers=headers)
+    call(client, "GET", "/users/me/followers", headers=headers)
+
+
+def test_follow_and_unfollow(client, dataset):
+    followed = select(Follow.followee_id).where(Follow.follower_id == 2)
+    target = _first(select(User.id).where(User.id != 2, col(User.id).not_in(followed)))
+    headers = dataset.user_headers
+    call(client, "POST", "/users/{user_id}/follow", status=204, path={"user_id": target},
+         headers=headers)
+    call(client, "DELETE", "/users/{user_id}/follow", status=204, path={"user_id": target},
+         headers=headers)
+
+
+def test_admin_users(client, dataset):
+    headers = dataset.admin_headers
+    first = call(client, "GET", "/users/", headers=headers).json()
+    call(client, "GET", "/users/", headers=headers,
+         params={"q": "user", "is_active": True, "cursor": first["next_cursor"] or "0"})
+
+    created = call(client, "POST", "/users/", status=201, headers=headers, json={
+        "email": "admin-made@example.com", "username": "admin-made", "password": "password123",
+    }).json()
+    call(client, "PATCH", "/users/{user_id}", path={"user_id": created["id"]}, headers=headers,
+         json={"email": "admin-made-2@example.com"})
+    call(client, "DELETE", "/users/{user_id}", status=204, path={"user_id": created["id"]},
+         headers=headers)
+
+    csv = b"email,username,password\nimported@example.com,imported,password123\n"
+    result = call(client, "POST", "/users/import", content=csv,
+                  headers={**headers, "content-type": "text/csv"}).json()
+    assert result["created"] == 1
+
+
+# ---------------------------------------------------------------------------
+# dogs
+# ---------------------------------------------------------------------------
+def test_dogs(client, dataset):
+    headers = dataset.user_headers
+    call(client, "GET", "/dogs/", headers=headers)
+    call(client, "GET", "/dogs/search", headers=headers)
+    call(client, "GET", "/dogs/search", headers=headers,
+         params={"breed": "beagle", "good_with_others": True, "park_id": 1})
+
+    dog = _first(select(Dog).where(Dog.owner_id == 2).order_by(Dog.id))
+    call(client, "GET", "/dogs/{dog_id}", path={"dog_id": dog.id}, headers=headers)
+    # A size change moves the dog between slot counters for all its upcoming visits.
+    call(client, "PATCH", "/dogs/{dog_id}", path={"dog_id": dog.id}, headers=headers,
+         json={"size": "small" if dog.size != "small" else "large"})
+    call(client, "GET", "/dogs/{dog_id}/recommendations", path={"dog_id": dog.id},
+         headers=headers)
+
+    created = call(client, "POST", "/dogs/", status=201, headers=headers,
+                   json={"name": "Budget", "breed": "Beagle", "size": "small"}).json()
+    call(client, "POST", "/dogs/{dog_id}/photo", path={"dog_id": created["id"]},
+         headers=headers, files={"file": ("dog.png", _png(), "image/png")})
+    call(client, "DELETE", "/dogs/{dog_id}", status=204, path={"dog_id": created["id"]},
+         headers=headers)
+
+
+# ---------------------------------------------------------------------------
+# parks
+# ---------------------------------------------------------------------------
+def test_parks(client, dataset):
+    headers = dataset.user_headers
+    call(client, "GET", "/parks/", headers=headers)
+    call(client, "GET", "/parks/{park_id}", path={"park_id": 1}, headers=headers)
+
+    created = call(client, "POST", "/parks/", status=201, headers=headers,
+                   json={"name": "Budget Park", "address": "1 Budget Road"}).json()
+    call(client, "PATCH", "/parks/{park_id}", path={"park_id": created["id"]}, headers=headers,
+         json={"description": "Fenced"})
+    call(client, "DELETE", "/parks/{park_id}", status=204, path={"park_id": created["id"]},
+         headers=headers)
+
+
+# ---------------------------------------------------------------------------
+# visits
+# ---------------------------------------------------------------------------
+def test_visit_reads(client, dataset):
+    headers = dataset.user_headers
+    call(client, "GET", "/visits/", headers=headers, params={"park_id": 1, "upcoming": True})
+    call(client, "GET", "/visits/my", headers=headers)
+    call(client, "GET", "/visits/upcoming-activity", headers=headers)
+    call(client, "GET", "/visits/dashboard-stats", headers=headers)
+    call(client, "GET", "/visits/feed", headers=headers)
+    visit_id = _first(select(Visit.id).where(Visit.user_id == 2))
+    call(client, "GET", "/visits/{visit_id}", path={"visit_id": visit_id}, headers=headers)
+
+
+def test_visit_writes(client, dataset):
+    headers = dataset.user_headers
+    dog_ids = [d.id for d in [_first(select(Dog).where(Dog.owner_id == 2).order_by(Dog.id))]]
+    start = datetime.now(timezone.utc) + timedelta(days=1)
+    visit = call(client, "POST", "/visits/", status=201, headers=headers, json={
+        "park_id": 1,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=2)).isoformat(),
+        "dog_ids": dog_ids,
+    }).json()
+    # The same dog can't be somewhere else at the same time.
+    with count_queries() as usage:
+        clash = call(client, "POST", "/visits/", status=409, headers=headers, json={
+            "park_id": 2,
+            "start_time": (start + timedelta(hours=1)).isoformat(),
+            "end_time": (start + timedelta(hours=4)).isoformat(),
+            "dog_ids": dog_ids,
+        }).json()["detail"]
+    assert [c["visit_id"] for c in clash["conflicts"]] == [visit["id"]]
+    # ...checked after the INSERT, i.e. holding the write lock.
+    statements = [sql for sql, _ in usage.executed]
+    insert = next(i for i, sql in enumerate(statements) if sql.startswith("INSERT INTO visits "))
+    check = next(i for i, sql in enumerate(statements) if "JOIN visit_dogs" in sql)
+    assert insert < check
+    call(client, "PATCH", "/visits/{visit_id}", path={"visit_id": visit["id"]}, headers=headers,
+         json={"end_time": (start + timedelta(hours=3)).isoformat(), "dog_ids": dog_ids})
+    call(client, "DELETE", "/visits/{visit_id}", status=204, path={"visit_id": visit["id"]},
+         headers=headers)
+
+
+def test_calendar_feeds(client, dataset):
+    links = call(client, "GET", "/users/me/calendar", headers=dataset.user_headers).json()
+    token = {"token": links["token"]}
+    call(client, "GET", "/visits/my.ics", params=token)
+    call(client, "GET", "/parks/{park_id}/calendar.ics", path={"park_id": 1}, params=token)
+    call(client, "POST", "/users/me/calendar/rotate", headers=dataset.user_headers)
+    with Session(engine) as session:  # back to version 0, which other tests' tokens carry
+        user = session.get(User, 2)
+        user.calendar_token_version = 0
+        session.add(user)
+        session.commit()
+
+
+# ---------------------------------------------------------------------------
+# sync
+# ---------------------------------------------------------------------------
+def test_sync(client, dataset):
+    headers = dataset.user_headers
+    call(client, "GET", "/sync/", headers=headers, params={"limit": 5})
+    page = {"token": None, "has_more": True}
+    while page["has_more"]:  # a full sync, a page at a time
+        page = call(client, "GET", "/sync/", headers=headers, params={"since": page["token"]}).json()
+    call(client, "GET", "/sync/", headers=headers, params={"since": page["token"]})
+    call(client, "GET", "/sync/", status=400, headers=headers, params={"since": "nope"})
+
+
+# ---------------------------------------------------------------------------
+# archived visits
+# ---------------------------------------------------------------------------
+def test_archived_visit_reads(client, dataset):
+    headers = dataset.user_headers
+    with Session(engine) as session:  # bob's past visits, as the archiver would move them
+        ids = list(session.exec(select(Visit.id).where(
+            Visit.user_id == 2, Visit.end_time < datetime.now(timezone.utc),
+        )))
+        archive._move(session, 0, 1, ids)
+        session.commit()
+    call(client, "GET", "/visits/", headers=headers, params={"park_id": 1})
+    call(client, "GET", "/visits/my", headers=headers)
+    call(client, "GET", "/visits/{visit_id}", path={"visit_id": ids[0]}, headers=headers)
+    with Session(engine) as session:
+        archive._move(session, 1, 0, ids)
+        session.commit()
@@ -0,0 +1,60 @@
+"""
+Query plans: the hot visit queries seek an index instead of scanning `visits`.
+
+Each request below is made and every statement it sent that reads `visits`
+is run again under EXPLAIN QUERY PLAN.  `SEARCH visits USING INDEX ...` is
+what we want; a `SCAN visits` step (a full table scan, or a walk of a
+whole index) fails.  Where the index also provides the order, the plan
+must not sort in a temp B-tree either.
+"""
+
+import pytest
+
+from app.core.security import create_calendar_token
+from app.database import engine
+from conftest import count_queries
+
+API = "/api/v1"
+
+# (path, query parameters, the index delivers rows in ORDER BY order)
+HOT_QUERIES = [
+    ("/visits/", {"park_id": 1}, True),
+    ("/visits/", {"park_id": 1, "upcoming": True}, True),
+    ("/visits/", {"upcoming": True}, False),
+    ("/visits/my", {}, True),
+    ("/visits/upcoming-activity", {}, False),
+    ("/visits/dashboard-stats", {}, False),
+    # Seeks (user_id, end_time) to the feed's window, then sorts just that.
+    ("/visits/my.ics", {"token": None}, False),
+    ("/parks/1/calendar.ics", {"token": None}, True),
+]
+
+
+def _plans(executed) -> list[tuple[str, list[str]]]:
+    """(SQL, plan steps) for every captured statement that reads `visits`."""
+    plans = []
+    with engine.connect() as conn:
+        for sql, parameters in executed:
+            if " visits" not in sql or not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            steps = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters).all()
+            plans.append((sql, [step[3] for step in steps]))
+    return plans
+
+
+@pytest.mark.parametrize("path, params, ordered", HOT_QUERIES)
+def test_visit_queries_use_an_index(client, dataset, path, params, ordered):
+    if "token" in params:
+        params = {"token": create_calendar_token(2)}
+    with count_queries() as usage:
+        resp = client.get(API + path, params=params, headers=dataset.user_headers)
+    assert resp.status_code == 200, resp.text
+
+    plans = _plans(usage.executed)
+    assert plans, f"{path} sent no query on visits"
+    for sql, steps in plans:
+        detail = f"{path}\n{sql}\n" + "\n".join(steps)
+        assert any(s.startswith("SEARCH visits") for s in steps), detail
+        assert not any(s.startswith("SCAN visits") for s in steps), detail
+        if ordered and "ORDER BY" in sql:
+            assert not any("TEMP B-TREE FOR ORDER BY" in s for s in steps), detail
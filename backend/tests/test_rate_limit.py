@@ -0,0 +1,109 @@
+"""
+Rate limits (core/rate_limit.py): 429 with Retry-After, per-IP buckets on
+the auth routes, separate read and write buckets, and batch sub-requests
+charged one by one.
+
+conftest.py turns the limits off for every other test; the `limits`
+fixture turns them on with tiny buckets and a fresh store.
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.core import rate_limit
+from app.core.config import settings
+
+API = "/api/v1"
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMITS_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "_store", rate_limit.MemoryStore(max_keys=100))
+    monkeypatch.setattr(rate_limit, "_limits", {
+        "auth": rate_limit.parse_limit("2/hour"),
+        "reads": rate_limit.parse_limit("3/hour"),
+        "writes": rate_limit.parse_limit("2/hour"),
+    })
+
+
+def test_parse_limit():
+    assert rate_limit.parse_limit("60/minute") == (1.0, 60)
+    assert rate_limit.parse_limit("10/second") == (10.0, 10)
+
+
+def test_memory_store_refills_and_evicts():
+    store = rate_limit.MemoryStore(max_keys=2)
+    assert store.take("a", 1.0, 1, now=0.0) == 0.0
+    assert store.take("a", 1.0, 1, now=0.25) == pytest.approx(0.75)
+    assert store.take("a", 1.0, 1, now=1.0) == 0.0  # refilled
+    store.take("b", 1.0, 1, now=1.0)
+    store.take("c", 1.0, 1, now=1.0)  # evicts "a", the least recently seen
+    assert store.take("a", 1.0, 1, now=1.0) == 0.0
+
+
+def test_store_is_made_once(monkeypatch):
+    made = []
+
+    def slow_store() -> rate_limit.Store:
+        time.sleep(0.05)  # long enough for every thread to find no store yet
+        made.append(rate_limit.MemoryStore(max_keys=100))
+        return made[-1]
+
+    monkeypatch.setattr(settings, "RATE_LIMITS_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "_store", None)
+    monkeypatch.setattr(rate_limit, "_make_store", slow_store)
+    threads = [threading.Thread(target=rate_limit.check, args=("reads", f"user:{i}"))
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(made) == 1 and rate_limit._store is made[0]
+
+
+def test_reads_429_with_retry_after(client, dataset, limits):
+    headers = dataset.user_headers
+    for _ in range(3):
+        assert client.get(f"{API}/users/me", headers=headers).status_code == 200
+    refused = client.get(f"{API}/users/me", headers=headers)
+    assert refused.status_code == 429
+    # 3/hour refills one token every 1200 s.
+    assert 1 <= int(refused.headers["retry-after"]) <= 1200
+
+    # Another user has their own bucket.
+    assert client.get(f"{API}/users/me", headers=dataset.admin_headers).status_code == 200
+
+
+def test_reads_and_writes_are_separate_buckets(client, dataset, limits):
+    headers = dataset.user_headers
+    for _ in range(3):
+        client.get(f"{API}/users/me", headers=headers)
+    assert client.get(f"{API}/users/me", headers=headers).status_code == 429
+
+    dog = client.post(f"{API}/dogs/", headers=headers, json={"name": "Bucket"})
+    assert dog.status_code == 201, dog.text
+    assert client.delete(f"{API}/dogs/{dog.json()['id']}", headers=headers).status_code == 204
+    assert client.post(f"{API}/dogs/", headers=headers, json={"name": "Spill"}).status_code == 429
+
+
+def test_auth_routes_are_limited_per_ip(client, dataset, limits):
+    form = {"username": "nobody-here", "password": "wrong-password"}
+    for _ in range(2):
+        assert client.post(f"{API}/auth/login", data=form).status_code == 401
+    refused = client.post(f"{API}/auth/login", data=form)
+    assert refused.status_code == 429 and "retry-after" in refused.headers
+    # Register shares the IP's auth bucket.
+    assert client.post(f"{API}/auth/register", json={
+        "username": "late", "email": "late@example.com", "password": "latepass1",
+    }).status_code == 429
+
+
+def test_batch_sub_requests_each_take_a_token(client, dataset, limits):
+    batch = client.post(f"{API}/batch", headers=dataset.user_headers, json={
+        "requests": [{"method": "GET", "path": "/users/me"}] * 5,
+    })
+    assert batch.status_code == 200, batch.text
+    assert [item["status"] for item in batch.json()] == [200, 200, 200, 429, 429]
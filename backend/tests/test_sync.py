@@ -0,0 +1,47 @@
+"""
+Delta sync (services/sync.py): an idle sync sends nothing, and tombstones
+only report ids that aren't live again.
+"""
+
+API = "/api/v1"
+PARK = {"name": "Sync Park", "address": "1 Delta Road"}
+
+
+def _full_sync(client, headers) -> str:
+    page = {"token": None, "has_more": True}
+    while page["has_more"]:
+        page = client.get(f"{API}/sync/", headers=headers, params={"since": page["token"]}).json()
+    return page["token"]
+
+
+def test_first_page_is_limited(client, dataset):
+    first = client.get(f"{API}/sync/", headers=dataset.user_headers, params={"limit": 5}).json()
+    assert first["has_more"] and len(first["parks"] + first["dogs"] + first["visits"]) == 5
+
+
+def test_nothing_changed_nothing_sent(client, dataset):
+    token = _full_sync(client, dataset.user_headers)
+    idle = client.get(f"{API}/sync/", headers=dataset.user_headers, params={"since": token}).json()
+    assert idle["token"] == token and not (idle["parks"] or idle["dogs"] or idle["visits"])
+
+
+def test_tombstones_superseded_by_a_new_row(client, dataset):
+    headers = dataset.user_headers
+    token = _full_sync(client, headers)
+
+    def changes() -> dict:
+        return client.get(f"{API}/sync/", headers=headers, params={"since": token}).json()
+
+    park = client.post(f"{API}/parks/", headers=headers, json=PARK).json()
+    client.delete(f"{API}/parks/{park['id']}", headers=headers)
+    deleted = changes()
+    assert [p["id"] for p in deleted["parks"]] == []  # created, then deleted
+    assert deleted["deleted"]["parks"] == [park["id"]]
+
+    # Created again: SQLite hands out the same id, and the park is live.
+    again = client.post(f"{API}/parks/", headers=headers, json=PARK).json()
+    assert again["id"] == park["id"]
+    live = changes()
+    assert [p["id"] for p in live["parks"]] == [again["id"]]
+    assert live["deleted"]["parks"] == []
+    client.delete(f"{API}/parks/{again['id']}", headers=headers)
@@ -0,0 +1,76 @@
+"""
+The friends feed (services/timeline.py): backfill on follow, fan-out of new
+visits and their edits, removal on delete and on unfollow.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlmodel import Session, col, select
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.database import engine
+from app.models import User, Visit
+
+API = "/api/v1"
+
+
+@pytest.fixture
+def follower(dataset):
+    """A fresh user's headers; soft-deleted again afterwards."""
+    with Session(engine) as session:
+        user = User(email=f"fan-{dataset.visits}@example.com", username=f"fan-{dataset.visits}",
+                    hashed_password="-")
+        session.add(user)
+        session.commit()
+        user_id = user.id
+    yield {"Authorization": f"Bearer {create_access_token(user_id)}"}
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+        user.is_active = False
+        session.add(user)
+        session.commit()
+
+
+def _feed(client, headers) -> list[int]:
+    return [item["visit_id"] for item in
+            client.get(f"{API}/visits/feed", headers=headers, params={"limit": 100}).json()]
+
+
+def test_feed_follows_the_followed(client, dataset, follower):
+    bob = dataset.user_headers
+    assert _feed(client, follower) == []
+
+    # Following backfills bob's upcoming visits.
+    assert client.post(f"{API}/users/2/follow", headers=follower).status_code == 204
+    now = datetime.now(timezone.utc)
+    lookback = now - timedelta(hours=settings.FEED_LOOKBACK_HOURS)
+    with Session(engine) as session:  # what read_feed shows of them
+        upcoming = session.exec(
+            select(Visit.id)
+            .where(Visit.user_id == 2, Visit.end_time >= now, Visit.start_time >= lookback)
+            .order_by(col(Visit.start_time), col(Visit.id)).limit(100)
+        ).all()
+    assert sorted(_feed(client, follower)) == sorted(upcoming)
+
+    # A new visit of his is fanned out, and so are its new times.
+    start = now + timedelta(minutes=10)
+    visit = client.post(f"{API}/visits/", headers=bob, json={
+        "park_id": 1, "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(), "dog_ids": [],
+    }).json()["id"]
+    assert visit in _feed(client, follower)
+    later = start + timedelta(days=2)
+    client.patch(f"{API}/visits/{visit}", headers=bob, json={
+        "start_time": later.isoformat(), "end_time": (later + timedelta(hours=1)).isoformat(),
+    })
+    feed = client.get(f"{API}/visits/feed", headers=follower, params={"limit": 100}).json()
+    moved = next(item for item in feed if item["visit_id"] == visit)
+    assert datetime.fromisoformat(moved["start_time"]) == later
+
+    # Deleting it takes it out of the feed; unfollowing empties the feed.
+    assert client.delete(f"{API}/visits/{visit}", headers=bob).status_code == 204
+    assert visit not in _feed(client, follower)
+    assert client.delete(f"{API}/users/2/follow", headers=follower).status_code == 204
+    assert _feed(client, follower) == []
@@ -0,0 +1,134 @@
+"""
+Group commit (services/write_queue.py), with the queue actually running:
+a failing route in a group, a 409 from a queued route, and a transaction
+that can't even begin.
+
+The shared `client` fixture runs without the lifespan, so `@queued` routes
+run inline everywhere else; `running` starts the app's lifespan with the
+queue on and stops it again.
+"""
+
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, col, func, select
+
+from app.core.config import settings
+from app.database import engine
+from app.main import app
+from app.models import Dog, Visit
+from app.services import write_queue
+from conftest import count_queries
+
+API = "/api/v1"
+
+
+@pytest.fixture
+def running(monkeypatch, dataset):
+    monkeypatch.setattr(settings, "WRITE_QUEUE_ENABLED", True)
+    monkeypatch.setattr(settings, "WRITE_QUEUE_WINDOW_MS", 200.0)  # so submits group up
+    monkeypatch.setattr(settings, "JOB_WORKERS", 0)
+    with TestClient(app) as client:  # runs the lifespan: write_queue.start() ... stop()
+        assert write_queue._writer is not None
+        yield client
+    assert write_queue._writer is None
+
+
+def _add_dog(name: str, fail: bool = False):
+    def write(session: Session) -> int:
+        dog = Dog(name=name, owner_id=2)
+        session.add(dog)
+        session.flush()
+        if fail:  # written, but not committed: its savepoint is rolled back
+            raise ValueError(f"{name} failed")
+        session.commit()
+        return dog.id
+
+    return write
+
+
+def _dogs_named(prefix: str) -> list[str]:
+    with Session(engine) as session:
+        return sorted(session.exec(select(Dog.name).where(col(Dog.name).startswith(prefix))))
+
+
+def test_a_failing_route_only_rolls_back_itself(running):
+    with count_queries() as usage:
+        futures = [
+            write_queue._writer.submit(_add_dog("Group A")),
+            write_queue._writer.submit(_add_dog("Group B", fail=True)),
+            write_queue._writer.submit(_add_dog("Group C")),
+        ]
+        ids = [future.exception() or future.result() for future in futures]
+    assert isinstance(ids[1], ValueError)
+    assert _dogs_named("Group ") == ["Group A", "Group C"]
+    # All three ran in one transaction.
+    begins = [sql for sql, _ in usage.executed if sql == "BEGIN IMMEDIATE"]
+    assert len(begins) == 1
+
+    with Session(engine) as session:
+        for dog_id in (ids[0], ids[2]):
+            session.delete(session.get(Dog, dog_id))
+        session.commit()
+
+
+def test_conflict_409_through_the_queue(running, dataset):
+    headers = dataset.user_headers
+    dog = running.post(f"{API}/dogs/", headers=headers, json={"name": "Queued Dog"}).json()
+    start = datetime.now(timezone.utc) + timedelta(days=450)
+    visit = {
+        "park_id": 1,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=2)).isoformat(),
+        "dog_ids": [dog["id"]],
+    }
+    first = running.post(f"{API}/visits/", headers=headers, json=visit)
+    assert first.status_code == 201, first.text
+
+    clash = running.post(f"{API}/visits/", headers=headers, json={
+        **visit, "start_time": (start + timedelta(hours=1)).isoformat(),
+        "end_time": (start + timedelta(hours=3)).isoformat(),
+    })
+    assert clash.status_code == 409
+    assert [c["visit_id"] for c in clash.json()["detail"]["conflicts"]] == [first.json()["id"]]
+    with Session(engine) as session:  # the clash wrote nothing
+        assert session.exec(select(func.count()).where(
+            Visit.user_id == 2, Visit.start_time >= start,
+            Visit.start_time < start + timedelta(days=1),
+        )).one() == 1
+
+    # The writer is still serving.
+    assert running.delete(f"{API}/visits/{first.json()['id']}", headers=headers).status_code == 204
+    assert running.delete(f"{API}/dogs/{dog['id']}", headers=headers).status_code == 204
+
+
+class _LockedConnection:
+    """A connection whose BEGIN IMMEDIATE times out, as under another process's lock."""
+
+    def __init__(self) -> None:
+        self.rolled_back = False
+
+    def exec_driver_sql(self, sql: str):
+        raise OperationalError(sql, None, Exception("database is locked"))
+
+    def rollback(self) -> None:
+        self.rolled_back = True
+
+    def commit(self) -> None:
+        raise AssertionError("nothing to commit")
+
+
+def test_begin_failure_fails_every_future():
+    writer = write_queue.WriteQueue(window_ms=5, max_batch=8)
+    conn = _LockedConnection()
+    group = [(_add_dog(f"Never {i}"), Future()) for i in range(3)]
+    writer._commit(conn, group)
+
+    errors = [future.exception() for _, future in group]
+    assert all(isinstance(error, OperationalError) for error in errors)
+    assert errors[0] is errors[1] is errors[2]
+    assert conn.rolled_back
+    assert _dogs_named("Never ") == []
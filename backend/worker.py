@@ -0,0 +1,43 @@
+"""
+Background job workers as a standalone process.
+
+Run:  python worker.py [--workers 4]
+
+Processes the same `jobs` table as the workers inside the API.  When you
+run this, you can set JOB_WORKERS=0 for the API processes so requests
+never share CPU with background work.  Stop with Ctrl+C / SIGTERM; jobs in
+progress finish first.
+"""
+
+import argparse
+import logging
+import signal
+import threading
+
+from app.core.config import settings
+from app.database import create_db_and_tables
+from app.services.jobs import WorkerPool
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background job workers.")
+    parser.add_argument("--workers", type=int, default=max(settings.JOB_WORKERS, 1))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(threadName)s %(message)s")
+    create_db_and_tables()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    pool = WorkerPool(args.workers)
+    pool.start()
+    logging.info("Started %d job worker(s)", args.workers)
+    stop.wait()
+    logging.info("Stopping job workers…")
+    pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import api from "./client";
+import type { SyncChanges } from "../types";
+
+// Changes since `since` (the token from the previous call); omit it for everything.
+// Throws with status 410 when the token is too old: drop the local copy and start over.
+export async function getChanges(since?: string): Promise<SyncChanges> {
+  const { data } = await api.get<SyncChanges>("/sync/", { params: { since } });
+  return data;
+}
@@ -36,8 +36,21 @@ export interface AdminUserUpdatePayload {
   is_admin?: boolean;
 }
 
-export async function listUsers(): Promise<User[]> {
-  const { data } = await api.get<User[]>("/users/");
+export interface UserPage {
+  items: User[];
+  next_cursor: string | null;
+  total_estimate: number | null;
+  total_is_exact: boolean;
+}
+
+export async function listUsers(params?: {
+  q?: string;
+  is_active?: boolean;
+  is_admin?: boolean;
+  cursor?: string;
+  limit?: number;
+}): Promise<UserPage> {
+  const { data } = await api.get<UserPage>("/users/", { params });
   return data;
 }
 
@@ -1,6 +1,6 @@
 import { useState, useRef, useEffect } from "react";
 import { Navigate } from "react-router-dom";
-import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
+import { keepPreviousData, useInfiniteQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 import { useAuth } from "../../contexts/AuthContext";
 import {
   listUsers,
@@ -17,12 +17,25 @@ export default function AdminUsersPage() {
   const queryClient = useQueryClient();
   const [showCreate, setShowCreate] = useState(false);
   const [editingUser, setEditingUser] = useState<User | null>(null);
+  const [search, setSearch] = useState("");
 
-  const { data: users, isLoading } = useQuery({
-    queryKey: ["admin-users"],
-    queryFn: listUsers,
+  const {
+    data,
+    isLoading,
+    fetchNextPage,
+    hasNextPage,
+    isFetchingNextPage,
+  } = useInfiniteQuery({
+    queryKey: ["admin-users", search],
+    queryFn: ({ pageParam }) => listUsers({ q: search || undefined, cursor: pageParam }),
+    initialPageParam: undefined as string | undefined,
+    getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined,
+    placeholderData: keepPreviousData,
     enabled: !!user?.is_admin,
   });
+  const users = data?.pages.flatMap((page) => page.items);
+  const total = data?.pages[0]?.total_estimate;
+  const totalIsExact = data?.pages[0]?.total_is_exact;
 
   const createMutation = useMutation({
     mutationFn: createUser,
@@ -147,6 +160,21 @@ export default function AdminUsersPage() {
         </form>
       )}
 
+      <div className="flex items-center gap-4">
+        <input
+          type="search"
+          placeholder="Search username or email…"
+          className="input input-bordered w-full max-w-xs"
+          value={search}
+          onChange={(e) => setSearch(e.target.value)}
+        />
+        {users && total != null && (
+          <span className="text-sm text-base-content/70">
+            Showing {users.length} of {totalIsExact ? "" : "~"}{total}
+          </span>
+        )}
+      </div>
+
       {users && users.length > 0 ? (
         <div className="overflow-x-auto">
           <table className="table table-zebra">
@@ -179,6 +207,15 @@ export default function AdminUsersPage() {
               ))}
             </tbody>
           </table>
+          {hasNextPage && (
+            <button
+              className="btn btn-ghost w-full mt-2"
+              onClick={() => fetchNextPage()}
+              disabled={isFetchingNextPage}
+            >
+              {isFetchingNextPage ? <span className="loading loading-spinner loading-sm" /> : "Load more"}
+            </button>
+          )}
         </div>
       ) : (
         <p className="text-base-content/60">No users found.</p>
@@ -28,8 +28,10 @@ export interface Dog {
   good_with_others: boolean;
   personality_notes: string | null;
   photo_url: string | null;
+  photo_thumbnail_url: string | null;
   owner_id: number;
   created_at: string;
+  updated_at: string | null;
 }
 
 export interface DogCreate {
@@ -53,6 +55,7 @@ export interface Park {
   longitude: number | null;
   created_by_id: number;
   created_at: string;
+  updated_at: string | null;
 }
 
 export interface ParkCreate {
@@ -72,6 +75,7 @@ export interface Visit {
   user_id: number;
   park_id: number;
   created_at: string;
+  updated_at: string | null;
   dogs: Dog[];
 }
 
@@ -88,6 +92,20 @@ export interface VisitCreate {
   notes?: string;
 }
 
+// --- Delta sync ---
+export interface SyncVisit extends Omit<Visit, "dogs"> {
+  dog_ids: number[];
+}
+
+export interface SyncChanges {
+  token: string;
+  has_more: boolean;
+  parks: Park[];
+  dogs: Dog[];
+  visits: SyncVisit[];
+  deleted: { parks: number[]; dogs: number[]; visits: number[] };
+}
+
 // --- Dashboard ---
 export interface DashboardStats {
   upcoming_visit_count: number;